@@ -33,3 +33,29 @@ GO
 ALTER TABLE [dbo].[Data_sensor] ADD  CONSTRAINT [DF_Data_sensor_Fecha]  DEFAULT (getdate()) FOR [Fecha]
 GO
 
+/* Indice para la carga inicial acotada (ultimas N filas por sensor) */
+CREATE NONCLUSTERED INDEX [IX_Data_sensor_MAC_Fecha] ON [dbo].[Data_sensor]
+(
+	[MAC_Sensor] ASC,
+	[Fecha] DESC,
+	[Identificador] DESC
+) ON [PRIMARY]
+GO
+
+/* Indice para el sondeo por keyset (Fecha, Identificador) */
+CREATE NONCLUSTERED INDEX [IX_Data_sensor_Fecha_Identificador] ON [dbo].[Data_sensor]
+(
+	[Fecha] ASC,
+	[Identificador] ASC
+) ON [PRIMARY]
+GO
+
+/* Indice para el historico agregado por sensor (zoom hacia atras) */
+CREATE NONCLUSTERED INDEX [IX_Data_sensor_MAC_Identificador] ON [dbo].[Data_sensor]
+(
+	[MAC_Sensor] ASC,
+	[Identificador] ASC
+)
+INCLUDE ([Distancia_1], [Distancia_2], [Distancia_3], [Temperatura], [Humedad], [Q1], [Q2], [Q3], [Q4]) ON [PRIMARY]
+GO
+
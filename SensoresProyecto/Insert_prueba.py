@@ -1,36 +1,120 @@
-import pyodbc 
 import csv
+import gzip
+import os
+import sys
 import time
+import sqlite3
+import argparse
 
-cnxn = pyodbc.connect(
-    r"Driver={SQL Server Native Client 11.0};"
-    r"Server=DESKTOP-J4U2VS9\sqlexpress;"
-    r"Database=Sensores;"
-    r"Trusted_Connection=yes;"
-)
-
-cursor = cnxn.cursor()
-cursor.execute('SELECT * FROM dbo.Data_Sensor')
-#solo para visualizar los datos ya insertados de la DB
-for row in cursor:
-    print(' | '.join(str(field) for field in row))
-    
-filename = 'sensores.csv'
-datos = []
 try:
-    with open(filename, 'r') as infile:
-        #se usa el delimitador para separar los valores
-        reader = csv.reader(infile, delimiter=',')
-        for row in reader:
+    import pyodbc
+except ImportError:
+    pyodbc = None #solo hace falta para SQL Server, con --sqlite no se usa
+
+#la connection string y el esquema de SQLite son los mismos de las graficas
+#(Sensores/Logica/FuentesDatos.py), se cambian en un solo lugar
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Sensores'))
+from Logica.FuentesDatos import CONNECTION_STRING, ESQUEMA_SQLITE, SQLITE_INSERT
+
+#tomar como referencia para saber el orden de insercion
+"""
+@macSensor varchar(17),
+@capa tinyint,
+@no_paquete int,
+@distancia1 float,
+@distancia2 float,
+@distancia3 float,
+@temperatura float,
+@humedad float,
+@Q1 float,
+@Q2 float,
+@Q3 float,
+@Q4 float
+"""
+SQL_PROCEDIMIENTO = "EXEC dbo.usp_InsertDataSensor ?,?,?,?,?,?,?,?,?,?,?,?"
+
+#insercion directa en la tabla (mismas columnas y orden que el procedimiento)
+#para mandar lotes completos como arreglos de parametros
+SQL_INSERT_LOTE = """
+    INSERT INTO dbo.Data_sensor (
+        MAC_Sensor, Capa, No_paquete, Distancia_1, Distancia_2, Distancia_3,
+        Temperatura, Humedad, Q1, Q2, Q3, Q4
+    )
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+"""
+
+def MostrarTabla(cursor, tabla='dbo.Data_Sensor'):
+    #solo para visualizar los datos ya insertados de la DB
+    cursor.execute(f'SELECT * FROM {tabla}')
+    for row in cursor:
+        print(' | '.join(str(field) for field in row))
+
+def LeerFilas(filename, offset=0, seguir=False, espera=1.0):
+    #generador: lee el CSV linea por linea sin cargarlo completo en memoria
+    #devuelve (fila, offset) donde offset es el byte despues de esa fila,
+    #para poder guardar hasta donde se inserto y reanudar desde ahi.
+    #con seguir=True espera a que el archivo crezca (como tail -f) y
+    #devuelve None cada vez que no hay datos nuevos
+    #las exportaciones de las graficas (.csv.gz) se leen igual, descomprimiendo
+    comprimido = filename.lower().endswith('.gz')
+    try:
+        infile = gzip.open(filename, 'rb') if comprimido else open(filename, 'rb')
+    except FileNotFoundError:
+        print(f"Error: El archivo '{filename}' no fue encontrado.")
+        return
+    with infile:
+        infile.seek(offset)
+        while True:
+            inicio_linea = infile.tell()
+            linea = infile.readline()
+            if not linea.endswith(b'\n') and seguir:
+                #linea incompleta o fin de archivo: esperar a que crezca
+                infile.seek(inicio_linea)
+                if not comprimido and os.path.getsize(filename) < inicio_linea:
+                    print("El archivo se trunco, se lee desde el inicio.")
+                    infile.seek(0)
+                yield None
+                time.sleep(espera)
+                continue
+            if not linea:
+                break
+            #se usa el delimitador para separar los valores
+            row = next(csv.reader([linea.decode('utf-8', errors='replace')], delimiter=','), [])
             #si la fila tiene exactamente 12 datos entonces
-            #sabemos que son los que necesitamos 
+            #sabemos que son los que necesitamos
             if len(row) == 12:
-                datos.append(row)
-except FileNotFoundError:
-    print(f"Error: El archivo '{filename}' no fue encontrado.")
-i=0
-def InsertarDatos(datos):
-    params = (
+                yield row, infile.tell()
+
+def AgruparLotes(filas, tamano_lote):
+    #junta las filas del generador en lotes de tamano_lote
+    #un None (no hay datos nuevos) manda lo que haya aunque este incompleto
+    lote = []
+    for fila in filas:
+        if fila is not None:
+            lote.append(fila)
+        if lote and (fila is None or len(lote) >= tamano_lote):
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+def LeerOffset(filename):
+    #offset guardado de una corrida anterior (0 si no hay)
+    try:
+        with open(filename + '.offset', 'r') as f:
+            return int(f.read().strip() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def GuardarOffset(filename, offset):
+    #se escribe a un temporal y se reemplaza para no dejar el archivo a medias
+    temporal = filename + '.offset.tmp'
+    with open(temporal, 'w') as f:
+        f.write(str(offset))
+    os.replace(temporal, filename + '.offset')
+
+def ConvertirDatos(datos):
+    return (
         #no tienen ningun id o nombre porque en el archivo son secuenciales
         datos[0].strip(),              # @macSensor varchar(17)
         int(datos[1]),                 # @capa tinyint
@@ -45,25 +129,13 @@ def InsertarDatos(datos):
         float(datos[10]),              # @Q3 float
         float(datos[11])               # @Q4 float
     )
+
+def InsertarDatos(cnxn, cursor, datos, sql=SQL_PROCEDIMIENTO):
+    #una fila con el procedimiento, se usa en el modo replay
     try:
-        #tomar como referencia para saber el orden de insercion
-        """
-        @macSensor varchar(17), 
-	    @capa tinyint,
-	    @no_paquete int,
-	    @distancia1 float,
-	    @distancia2 float,
-	    @distancia3 float,
-	    @temperatura float,
-	    @humedad float,
-	    @Q1 float,
-	    @Q2 float,
-	    @Q3 float,
-	    @Q4 float
-        """
-     
+        params = ConvertirDatos(datos)
         cursor.execute(
-            "EXEC dbo.usp_InsertDataSensor ?,?,?,?,?,?,?,?,?,?,?,?",
+            sql,
             params#<----todos los parametros
 
         )
@@ -72,11 +144,109 @@ def InsertarDatos(datos):
     except Exception as e:
         cnxn.rollback()#si hay algun en algun punto se cancela la insercion
         print(f"Error al insertar -> {e}")
-    
-    
-for dato in datos:
-    time.sleep(3)#delay, puede quitarse
-    InsertarDatos(dato)
-
-            
-        
+
+def ConvertirLote(lote):
+    #convierte un lote completo por columnas (mucho mas rapido que fila por fila)
+    #si alguna columna trae un valor invalido se convierte fila por fila
+    #para descartar solo las filas malas
+    filas = [fila for fila, _ in lote]
+    try:
+        columnas = list(zip(*filas))
+        macs = [mac.strip() for mac in columnas[0]]
+        enteros = [list(map(int, columnas[i])) for i in (1, 2)]
+        flotantes = [list(map(float, columnas[i])) for i in range(3, 12)]
+        return list(zip(macs, *enteros, *flotantes))
+    except ValueError:
+        params = []
+        for fila in filas:
+            try:
+                params.append(ConvertirDatos(fila))
+            except ValueError as e:
+                print(f"Fila descartada {fila} -> {e}")
+        return params
+
+def InsertarLote(cnxn, cursor, params, sql=SQL_INSERT_LOTE):
+    #carga masiva: el lote se manda como un arreglo de parametros
+    #(fast_executemany) y se confirma con un solo commit
+    try:
+        if params:
+            cursor.executemany(sql, params)
+        cnxn.commit()
+        return True
+    except Exception as e:
+        cnxn.rollback()#se cancela solo el lote con error
+        print(f"Error al insertar lote -> {e}")
+        return False
+
+def main():
+    parser = argparse.ArgumentParser(description="Inserta los datos del CSV de sensores en la BD")
+    parser.add_argument('--archivo', default='sensores.csv')
+    parser.add_argument('--lote', type=int, default=1000, help="filas por lote (un commit por lote)")
+    parser.add_argument('--mostrar-tabla', action='store_true', help="imprime la tabla antes de insertar")
+    parser.add_argument('--replay', action='store_true',
+                        help="inserta fila por fila con un delay, como si llegaran en vivo")
+    parser.add_argument('--delay', type=float, default=3.0, help="segundos entre filas en modo replay")
+    parser.add_argument('--seguir', action='store_true',
+                        help="no terminar al final del archivo, esperar filas nuevas (tail -f)")
+    parser.add_argument('--desde-inicio', action='store_true',
+                        help="ignorar el offset guardado y leer el archivo desde el inicio")
+    parser.add_argument('--sqlite', metavar='RUTA',
+                        help="insertar en una base SQLite local (se crea con la tabla Data_sensor) "
+                             "en lugar de SQL Server; las graficas la leen con --fuente sqlite")
+    args = parser.parse_args()
+
+    if args.sqlite:
+        #misma tabla que en SQL Server, sin procedimiento: insercion directa
+        cnxn = sqlite3.connect(args.sqlite)
+        cnxn.execute("PRAGMA journal_mode = WAL")#las graficas pueden leer mientras se inserta
+        cnxn.executescript(ESQUEMA_SQLITE)
+        cursor = cnxn.cursor()
+        sql_fila = sql_lote = SQLITE_INSERT
+        tabla = 'Data_sensor'
+    else:
+        if pyodbc is None:
+            parser.error("pyodbc no esta instalado; usar --sqlite RUTA para una base local")
+        cnxn = pyodbc.connect(CONNECTION_STRING)
+        cursor = cnxn.cursor()
+        cursor.fast_executemany = True
+        sql_fila, sql_lote = SQL_PROCEDIMIENTO, SQL_INSERT_LOTE
+        tabla = 'dbo.Data_Sensor'
+
+    if args.mostrar_tabla:
+        MostrarTabla(cursor, tabla)
+
+    offset = 0 if args.desde_inicio else LeerOffset(args.archivo)
+    if offset:
+        print(f"Reanudando '{args.archivo}' desde el byte {offset}")
+    filas = LeerFilas(args.archivo, offset, seguir=args.seguir)
+
+    insertadas = 0
+    inicio = time.perf_counter()
+    try:
+        if args.replay:
+            for fila in filas:
+                if fila is None:
+                    continue
+                time.sleep(args.delay)#delay entre filas
+                InsertarDatos(cnxn, cursor, fila[0], sql_fila)
+                GuardarOffset(args.archivo, fila[1])
+                insertadas += 1
+        else:
+            for lote in AgruparLotes(filas, args.lote):
+                params = ConvertirLote(lote)
+                if not InsertarLote(cnxn, cursor, params, sql_lote):
+                    #no se avanza el offset: la proxima corrida reintenta este lote
+                    break
+                #el offset se guarda solo despues del commit
+                GuardarOffset(args.archivo, lote[-1][1])
+                insertadas += len(params)
+                print(f"Lote insertado: {insertadas} filas")
+    except KeyboardInterrupt:
+        print("Detenido. Lo insertado quedo guardado; se puede reanudar.")
+
+    duracion = time.perf_counter() - inicio
+    print(f"{insertadas} filas en {duracion:.1f} s ({insertadas / max(duracion, 1e-9):.0f} filas/s)")
+    cnxn.close()
+
+if __name__ == "__main__":
+    main()
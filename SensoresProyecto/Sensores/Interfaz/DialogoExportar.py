@@ -0,0 +1,124 @@
+import time
+from PySide6.QtWidgets import (QDialog, QFormLayout, QComboBox, QDateTimeEdit, QLineEdit, QLabel,
+                               QPushButton, QHBoxLayout, QDialogButtonBox, QFileDialog, QMessageBox)
+from PySide6.QtCore import QDateTime
+
+# Qué sensores se exportan: texto -> alcance que entiende la lógica
+ALCANCES = {
+    "Sensor buscado": 'sensor',
+    "Página actual": 'pagina',
+    "Sensores del filtro": 'filtro',
+    "Todos los sensores": 'todos',
+}
+
+# De dónde salen los datos: texto -> origen de ExportadorDatos
+ORIGENES_EXPORTACION = {
+    "Memoria (lo que tienen las gráficas)": 'memoria',
+    "Servidor (todo el rango)": 'servidor',
+}
+
+# Rango de fechas: texto -> segundos hacia atrás desde ahora (None = todo)
+RANGOS = {
+    "Última hora": 3600,
+    "Últimas 24 h": 24 * 3600,
+    "Última semana": 7 * 24 * 3600,
+    "Todo": None,
+    "Personalizado": 'personalizado',
+}
+
+# Formatos del diálogo de archivo (la extensión decide el escritor)
+FILTROS_ARCHIVO = "CSV comprimido (*.csv.gz);;CSV (*.csv);;NumPy por columnas (*.npz)"
+EXTENSIONES = ('.csv.gz', '.csv', '.npz')
+
+
+class DialogoExportar(QDialog):
+    """Opciones de una exportación: qué sensores, de dónde, qué rango y a qué archivo."""
+
+    def __init__(self, ruta_inicial='', permite_servidor=True, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Exportar datos")
+        formulario = QFormLayout(self)
+
+        self.combo_alcance = QComboBox()
+        for texto, alcance in ALCANCES.items():
+            self.combo_alcance.addItem(texto, alcance)
+        self.combo_alcance.setCurrentIndex(2) # Sensores del filtro
+
+        self.combo_origen = QComboBox()
+        for texto, origen in ORIGENES_EXPORTACION.items():
+            self.combo_origen.addItem(texto, origen)
+        if not permite_servidor:
+            # La fuente no se puede abrir desde otro hilo (replay en memoria)
+            self.combo_origen.model().item(1).setEnabled(False)
+
+        self.combo_rango = QComboBox()
+        for texto, segundos in RANGOS.items():
+            self.combo_rango.addItem(texto, segundos)
+        ahora = QDateTime.currentDateTime()
+        self.campo_desde = QDateTimeEdit(ahora.addSecs(-3600))
+        self.campo_hasta = QDateTimeEdit(ahora)
+        for campo in (self.campo_desde, self.campo_hasta):
+            campo.setCalendarPopup(True)
+            campo.setDisplayFormat("yyyy-MM-dd HH:mm:ss")
+            campo.setEnabled(False)
+        self.combo_rango.currentIndexChanged.connect(self.on_rango_cambiado)
+
+        self.campo_ruta = QLineEdit(ruta_inicial)
+        boton_ruta = QPushButton("...")
+        boton_ruta.clicked.connect(self.elegir_ruta)
+        fila_ruta = QHBoxLayout()
+        fila_ruta.addWidget(self.campo_ruta)
+        fila_ruta.addWidget(boton_ruta)
+
+        botones = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        botones.accepted.connect(self.validar)
+        botones.rejected.connect(self.reject)
+
+        formulario.addRow("Sensores:", self.combo_alcance)
+        formulario.addRow("Origen:", self.combo_origen)
+        formulario.addRow("Rango:", self.combo_rango)
+        formulario.addRow("Desde:", self.campo_desde)
+        formulario.addRow("Hasta:", self.campo_hasta)
+        formulario.addRow("Archivo:", fila_ruta)
+        # Igual con los dos orígenes (ver Exportacion.DESCRIPCION)
+        nota = QLabel("Las distancias se exportan corregidas, como en las gráficas:\n"
+                      "cada cero lleva el último valor válido del sensor.")
+        nota.setEnabled(False)
+        formulario.addRow(nota)
+        formulario.addRow(botones)
+
+    def on_rango_cambiado(self):
+        personalizado = self.combo_rango.currentData() == 'personalizado'
+        self.campo_desde.setEnabled(personalizado)
+        self.campo_hasta.setEnabled(personalizado)
+
+    def elegir_ruta(self):
+        ruta, _ = QFileDialog.getSaveFileName(self, "Exportar datos", self.campo_ruta.text(), FILTROS_ARCHIVO)
+        if ruta:
+            self.campo_ruta.setText(ruta)
+
+    def validar(self):
+        ruta = self.campo_ruta.text().strip()
+        if not ruta:
+            QMessageBox.warning(self, "Exportar datos", "Falta el archivo de destino.")
+            return
+        if not ruta.lower().endswith(EXTENSIONES):
+            self.campo_ruta.setText(ruta + EXTENSIONES[0])
+        if self.combo_rango.currentData() == 'personalizado' and \
+                self.campo_desde.dateTime() >= self.campo_hasta.dateTime():
+            QMessageBox.warning(self, "Exportar datos", "'Desde' debe ser anterior a 'Hasta'.")
+            return
+        self.accept()
+
+    def valores(self):
+        """(alcance, origen, desde, hasta, ruta); las fechas en segundos epoch o None."""
+        rango = self.combo_rango.currentData()
+        if rango == 'personalizado':
+            desde = self.campo_desde.dateTime().toSecsSinceEpoch()
+            hasta = self.campo_hasta.dateTime().toSecsSinceEpoch()
+        elif rango is None:
+            desde = hasta = None
+        else:
+            desde, hasta = time.time() - rango, None
+        return (self.combo_alcance.currentData(), self.combo_origen.currentData(),
+                desde, hasta, self.campo_ruta.text().strip())
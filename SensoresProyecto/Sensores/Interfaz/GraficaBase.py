@@ -0,0 +1,281 @@
+import logging
+import time
+from PySide6.QtWidgets import QGroupBox, QLabel
+from PySide6.QtCore import Slot, Signal
+import numpy as np
+
+from Logica.Decimacion import decimar
+from Logica.Historico import clave_historico
+from Logica.Metricas import metricas
+
+# Configurar logging
+logger = logging.getLogger(__name__)
+
+# Espacio libre que se deja a la derecha del eje X para que las muestras
+# nuevas quepan sin tener que recalcular los límites (fracción del rango)
+MARGEN_X = 0.1
+
+# Cada cuánto se actualiza el texto de estadísticas del encabezado (s)
+INTERVALO_ENCABEZADO_S = 0.5
+
+# Configuración de cada sección: textos, líneas y límites del eje Y.
+# Cada línea es (etiqueta, canal del buffer, columna o None, estilo).
+# 'ylim' es una tupla fija o el nombre del método que calcula los límites.
+SECCIONES = {
+    'distancias': {
+        'titulo': 'Mediciones de Distancia',
+        'ylabel': 'Distancia (metros)',
+        'lineas': [
+            ('D1', 'D1', None, {'color': 'blue', 'linewidth': 1.5}),
+            ('D2', 'D2', None, {'color': 'red', 'linewidth': 1.5}),
+            ('D3', 'D3', None, {'color': 'green', 'linewidth': 1.5}),
+        ],
+        'ylim': 'limites_distancias',
+    },
+    'temperatura': {
+        'titulo': 'Temperatura',
+        'ylabel': 'Temperatura (°C)',
+        'lineas': [
+            ('Temperatura', 'temperatura', None, {'color': 'red', 'linewidth': 2}),
+        ],
+        'ylim': 'limites_temperatura',
+    },
+    'humedad': {
+        'titulo': 'Humedad Relativa',
+        'ylabel': 'Humedad (%)',
+        'lineas': [
+            ('Humedad', 'humedad', None, {'color': 'blue', 'linewidth': 2}),
+        ],
+        'ylim': (0, 100), # Fijo
+    },
+    'quaterniones': {
+        'titulo': 'Orientacion (Quaterniones)',
+        'ylabel': 'Valor Quaternion',
+        'lineas': [
+            ('Q1 (W)', 'quaterniones', 0, {'linewidth': 1, 'alpha': 0.8}),
+            ('Q2 (X)', 'quaterniones', 1, {'linewidth': 1, 'alpha': 0.8}),
+            ('Q3 (Y)', 'quaterniones', 2, {'linewidth': 1, 'alpha': 0.8}),
+            ('Q4 (Z)', 'quaterniones', 3, {'linewidth': 1, 'alpha': 0.8}),
+        ],
+        'ylim': (-1.2, 1.2), # Fijo
+    },
+    'orientacion': {
+        'titulo': 'Orientacion (Roll / Pitch / Yaw)',
+        'ylabel': 'Ángulo (grados)',
+        'lineas': [
+            ('Roll (X)', 'orientacion', 0, {'color': 'red', 'linewidth': 1}),
+            ('Pitch (Y)', 'orientacion', 1, {'color': 'green', 'linewidth': 1}),
+            ('Yaw (Z)', 'orientacion', 2, {'color': 'blue', 'linewidth': 1}),
+        ],
+        'ylim': (-190, 190), # Fijo: roll y yaw van de -180° a 180°
+    },
+}
+
+
+class GraficaBase(QGroupBox):
+    """
+    Interfaz común de las gráficas de un sensor, independiente de cómo se
+    dibujen. Aquí vive todo lo que no depende del backend: la asignación de
+    sensor (pool de la lógica), el flujo de actualización, los límites
+    automáticos y la decimación al ancho en pixeles.
+
+    Cada backend implementa:
+    - preparar_seccion(seccion): crear líneas, leyenda y textos de la sección
+    - limites_x() / limites_y() y fijar_limites_x() / fijar_limites_y()
+    - ancho_px(): ancho del área de dibujo en pixeles
+    - poner_series(series): datos (x, y) de cada línea de la sección
+    - dibujar(completo): repintar (completo = también ejes y textos)
+    - mostrar_error(e)
+    Y opcionalmente limpiar_sensor() y mostrar_historico(datos).
+    El backend agrega 'encabezado' (estadísticas de la ventana) arriba de su dibujo.
+
+    Los límites y el encabezado salen de datos.estadisticas (O(1)), no de
+    recorrer los arreglos en cada cuadro.
+    """
+
+    # Pide el histórico agregado: MAC, desde, hasta, ancho en pixeles
+    solicitar_historico = Signal(str, object, object, object)
+
+    def __init__(self, mac=None, parent=None):
+        super().__init__(parent)
+        self.mac = None
+        self.seccion_dibujada = None # Sección para la que existen las líneas
+        self.cache_decimado = None   # (clave, series) de la última decimación
+        self.datos_actuales = None   # Último BufferSensor dibujado
+        self.vista_manual = False    # El usuario fijó la vista (zoom/paneo)
+
+        # Estadísticas de la ventana por línea (último, EWMA, media ± desviación, rango)
+        self.encabezado = QLabel()
+        self.encabezado.setWordWrap(True) # Que no ensanche la gráfica
+        self.encabezado.setToolTip("Por línea: último valor | EWMA | media ± desviación | [mínimo, máximo] "
+                                   "de las muestras en memoria")
+        self.ultimo_encabezado = 0.0
+
+    def asignar_sensor(self, mac):
+        """
+        Cambia el sensor que muestra el widget. Se descarta todo lo del
+        sensor anterior; la sección se reconstruye en el próximo dibujo.
+        """
+        self.mac = mac
+        # Usar los últimos 6 dígitos de la MAC para el título
+        if mac is None:
+            self.setTitle("Sensor: -")
+        else:
+            self.setTitle(f"Sensor: {sufijo_mac(mac)}")
+
+        self.datos_actuales = None
+        self.cache_decimado = None
+        self.seccion_dibujada = None
+        self.vista_manual = False
+        self.encabezado.clear()
+        self.ultimo_encabezado = 0.0
+        self.limpiar_sensor()
+
+    @Slot(dict, str)
+    def actualizar_grafica(self, datos_sensor: dict, seccion: str):
+        """
+        Función principal. Actualiza la gráfica basada en la sección y los
+        datos (BufferSensor) proporcionados.
+        """
+        if not datos_sensor:
+            logger.warning(f"No hay datos para {self.mac}")
+            return
+
+        self.datos_actuales = datos_sensor
+        inicio = metricas.reloj()
+        try:
+            completo = False
+            if seccion != self.seccion_dibujada:
+                self.preparar_seccion(seccion)
+                self.seccion_dibujada = seccion
+                completo = True
+
+            # Ajustar límites solo si los datos se salen del rango actual
+            if self.ajustar_limites(datos_sensor, SECCIONES[seccion]['ylim']):
+                completo = True
+
+            # Solo se cambian los datos de las líneas existentes
+            self.poner_series(self.series_decimadas(datos_sensor))
+
+        except Exception as e:
+            logger.error(f"Error al dibujar gráfica para {self.mac}: {e}")
+            self.mostrar_error(e)
+            self.seccion_dibujada = None # Forzar reconstrucción la próxima vez
+            completo = True
+
+        self.dibujar(completo)
+        self.actualizar_encabezado(datos_sensor, seccion)
+        metricas.observar_desde('dibujo_ms', inicio, (('seccion', seccion),))
+
+    def actualizar_encabezado(self, datos, seccion):
+        """Texto de estadísticas de la sección, a lo más cada INTERVALO_ENCABEZADO_S."""
+        ahora = time.monotonic()
+        if ahora - self.ultimo_encabezado < INTERVALO_ENCABEZADO_S:
+            return
+        self.ultimo_encabezado = ahora
+        self.encabezado.setText(texto_estadisticas(datos.estadisticas, seccion))
+
+    def series_decimadas(self, datos):
+        """
+        Devuelve (x, y) de cada línea reducidos al ancho en pixeles,
+        solo para el rango X visible. Se guardan en caché hasta que llegan
+        datos nuevos o cambia la vista (límites, tamaño o sección).
+        """
+        ancho_px = int(self.ancho_px())
+        x_min, x_max = self.limites_x()
+        clave = (datos.total, len(datos), ancho_px, x_min, x_max, self.seccion_dibujada)
+        if self.cache_decimado and self.cache_decimado[0] == clave:
+            return self.cache_decimado[1]
+
+        # Recortar al rango visible (con una muestra extra a cada lado)
+        muestras = datos['muestras']
+        inicio = max(np.searchsorted(muestras, x_min) - 1, 0)
+        fin = np.searchsorted(muestras, x_max, side='right') + 1
+        x = muestras[inicio:fin]
+
+        series = []
+        for _, canal, columna, _ in SECCIONES[self.seccion_dibujada]['lineas']:
+            valores = datos[canal][inicio:fin]
+            series.append(decimar(x, valores if columna is None else valores[:, columna], ancho_px))
+
+        self.cache_decimado = (clave, series)
+        return series
+
+    def ajustar_limites(self, datos, ylim):
+        """
+        Revisa si los datos caben en los límites actuales.
+        Devuelve True si hubo que cambiarlos (requiere redibujado completo).
+        """
+        if self.vista_manual:
+            return False # El usuario fijó la vista; no la movemos
+
+        cambio = False
+        estadisticas = datos.estadisticas
+        if len(datos):
+            x_min, x_max = estadisticas.minimo('muestras'), estadisticas.maximo('muestras')
+            actual_min, actual_max = self.limites_x()
+            rango = max(x_max - x_min, 1)
+            # Fuera de rango, o la ventana se recorrió y quedó espacio vacío a la izquierda
+            if x_min < actual_min or x_max > actual_max or x_min - actual_min > rango * MARGEN_X:
+                self.fijar_limites_x(x_min, x_max + rango * MARGEN_X)
+                cambio = True
+
+        if isinstance(ylim, str):
+            ylim = getattr(self, ylim)(datos)
+        if ylim is not None:
+            actual_min, actual_max = self.limites_y()
+            y_min, y_max = ylim
+            # Cambiar si no caben o si ocupan menos de la mitad del eje
+            if (y_min < actual_min or y_max > actual_max or
+                    (y_max - y_min) < (actual_max - actual_min) * 0.5):
+                self.fijar_limites_y(y_min, y_max)
+                cambio = True
+        return cambio
+
+    def limpiar_sensor(self):
+        """El backend descarta lo que tenga del sensor anterior."""
+
+    def mostrar_historico(self, datos):
+        """Histórico agregado; los backends sin zoom lo ignoran."""
+
+    #  Límites del eje Y por sección
+
+    def limites_distancias(self, datos):
+        # Ajustar límites Y automáticamente (solo distancias > 0)
+        estadisticas = datos.estadisticas
+        minimos = [m for m in (estadisticas.minimo(c) for c in ('D1', 'D2', 'D3')) if m is not None]
+        maximos = [m for m in (estadisticas.maximo(c) for c in ('D1', 'D2', 'D3')) if m is not None]
+        if minimos:
+            y_min = max(0, min(minimos) - 0.5)
+            y_max = max(maximos) + 0.5
+            return y_min, y_max
+        return 0, 10 # Default
+
+    def limites_temperatura(self, datos):
+        temp_min = datos.estadisticas.minimo('temperatura')
+        if temp_min is not None:
+            temp_max = datos.estadisticas.maximo('temperatura')
+            margen = max((temp_max - temp_min) * 0.1, 1.0)
+            return temp_min - margen, temp_max + margen
+        return None
+
+
+def sufijo_mac(mac):
+    """Los dos últimos bytes de la MAC (lo que distingue a los sensores en los títulos)."""
+    return f'{mac.split(":")[-2]}:{mac.split(":")[-1]}' if ':' in mac else mac
+
+
+def texto_estadisticas(estadisticas, seccion):
+    """Una entrada por línea de la sección: último | EWMA | media ± desviación | [mínimo, máximo]."""
+    def numero(valor):
+        return "-" if valor is None else f"{valor:.2f}"
+
+    partes = []
+    for etiqueta, canal, columna, _ in SECCIONES[seccion]['lineas']:
+        clave = clave_historico(canal, columna)
+        partes.append(
+            f"{etiqueta}: {numero(estadisticas.ultimo(clave))} | ~{numero(estadisticas.suavizado(clave))} | "
+            f"{numero(estadisticas.media(clave))} ± {numero(estadisticas.desviacion(clave))} | "
+            f"[{numero(estadisticas.minimo(clave))}, {numero(estadisticas.maximo(clave))}]"
+        )
+    return "    ".join(partes)
@@ -0,0 +1,179 @@
+import math
+from PySide6.QtWidgets import QVBoxLayout, QWidget, QSizePolicy
+from PySide6.QtCore import Qt, QPointF, QRectF
+from PySide6.QtGui import QPainter, QPen, QColor, QFont, QPolygonF
+import numpy as np
+import shiboken6
+
+from .GraficaBase import GraficaBase, SECCIONES
+from Logica.Metricas import metricas
+
+# Colores por defecto (los mismos del ciclo de matplotlib) para las
+# líneas que no traen 'color' en SECCIONES
+COLORES_DEFECTO = ['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd', '#8c564b']
+
+# Márgenes del área de dibujo dentro del lienzo (pixeles)
+MARGEN_IZQ, MARGEN_DER, MARGEN_SUP, MARGEN_INF = 60, 12, 24, 32
+DIVISIONES = 5 # Líneas de la cuadrícula por eje
+# Suavizado de las líneas de datos. Cuesta ~2x al pintar y con la serie
+# ya reducida a ~2 puntos por pixel casi no se nota
+SUAVIZADO_LINEAS = False
+
+
+def poligono_desde_arreglo(puntos):
+    """
+    Crea un QPolygonF con los puntos (N, 2) copiando el arreglo directo a
+    su memoria (QPointF son dos doubles), sin crear un QPointF por punto.
+    """
+    poligono = QPolygonF()
+    poligono.resize(len(puntos))
+    if len(puntos):
+        memoria = shiboken6.VoidPtr(poligono.data(), len(puntos) * 16, True)
+        np.frombuffer(memoria, dtype=np.float64).reshape(-1, 2)[:] = puntos
+    return poligono
+
+
+class LienzoQt(QWidget):
+    """Área de dibujo: ejes, cuadrícula, leyenda y líneas con QPainter."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent) # Pintamos todo el fondo
+        self.titulo = ""
+        self.ylabel = ""
+        self.xlim = (0.0, 1.0)
+        self.ylim = (0.0, 1.0)
+        self.lineas = []  # [(etiqueta, QPen)]
+        self.series = []  # [(x, y)] una por línea
+        self.error = None
+
+    def area(self):
+        return QRectF(MARGEN_IZQ, MARGEN_SUP,
+                      max(1, self.width() - MARGEN_IZQ - MARGEN_DER),
+                      max(1, self.height() - MARGEN_SUP - MARGEN_INF))
+
+    def paintEvent(self, event):
+        inicio = metricas.reloj()
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.GlobalColor.white)
+        area = self.area()
+        (x0, x1), (y0, y1) = self.xlim, self.ylim
+        escala_x = area.width() / ((x1 - x0) or 1)
+        escala_y = area.height() / ((y1 - y0) or 1)
+
+        # Cuadrícula y etiquetas de los ejes
+        painter.setFont(QFont(painter.font().family(), 8))
+        rejilla = QPen(QColor(0, 0, 0, 60), 1, Qt.PenStyle.DashLine)
+        for i in range(DIVISIONES + 1):
+            fx = area.left() + area.width() * i / DIVISIONES
+            fy = area.bottom() - area.height() * i / DIVISIONES
+            painter.setPen(rejilla)
+            painter.drawLine(QPointF(fx, area.top()), QPointF(fx, area.bottom()))
+            painter.drawLine(QPointF(area.left(), fy), QPointF(area.right(), fy))
+            painter.setPen(Qt.GlobalColor.black)
+            painter.drawText(QRectF(fx - 40, area.bottom() + 2, 80, 14), Qt.AlignmentFlag.AlignHCenter,
+                             f"{x0 + (x1 - x0) * i / DIVISIONES:.0f}")
+            painter.drawText(QRectF(0, fy - 7, MARGEN_IZQ - 4, 14), Qt.AlignmentFlag.AlignRight,
+                             f"{y0 + (y1 - y0) * i / DIVISIONES:.3g}")
+        painter.drawRect(area)
+        painter.drawText(QRectF(0, 0, self.width(), MARGEN_SUP), Qt.AlignmentFlag.AlignCenter,
+                         self.error or self.titulo)
+        painter.drawText(QRectF(0, self.height() - 16, self.width(), 16), Qt.AlignmentFlag.AlignCenter,
+                         f"Identificador de Muestra    |    {self.ylabel}")
+
+        # Líneas: se transforman a pixeles con NumPy y se dibujan como
+        # segmentos sueltos. Con drawPolyline y pluma de más de 1 px Qt
+        # calcula las uniones de toda la línea (con la serie min/max en
+        # zigzag es ~100 veces más lento)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing, SUAVIZADO_LINEAS)
+        painter.setClipRect(area)
+        for (_, pluma), (x, y) in zip(self.lineas, self.series):
+            puntos = np.empty((len(x), 2))
+            puntos[:, 0] = area.left() + (np.asarray(x, dtype=np.float64) - x0) * escala_x
+            puntos[:, 1] = area.bottom() - (np.asarray(y, dtype=np.float64) - y0) * escala_y
+            # QPainter no acepta NaN: se omiten los segmentos que lo tocan
+            validos = np.isfinite(puntos).all(axis=1)
+            segmentos = validos[:-1] & validos[1:]
+            extremos = np.stack((puntos[:-1][segmentos], puntos[1:][segmentos]), axis=1).reshape(-1, 2)
+            if len(extremos):
+                painter.setPen(pluma)
+                painter.drawLines(poligono_desde_arreglo(extremos))
+        painter.setClipping(False)
+        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+
+        # Leyenda (arriba a la derecha)
+        y = area.top() + 4
+        for etiqueta, pluma in self.lineas:
+            painter.setPen(QPen(pluma.color(), 2))
+            painter.drawLine(QPointF(area.right() - 90, y + 6), QPointF(area.right() - 70, y + 6))
+            painter.setPen(Qt.GlobalColor.black)
+            painter.drawText(QRectF(area.right() - 66, y, 64, 12), Qt.AlignmentFlag.AlignLeft, etiqueta)
+            y += 13
+        painter.end()
+        # El dibujo real de este backend ocurre aquí, no en actualizar_grafica
+        metricas.observar_desde('pintado_qt_ms', inicio)
+
+
+class GraficaQt(GraficaBase):
+    """
+    Backend ligero: dibuja directamente con QPainter, sin figura de
+    matplotlib. Cada repintado cuesta poco más que transformar los puntos
+    decimados a pixeles, así se pueden tener muchos sensores en vivo.
+
+    Solo modo en vivo: sin barra de herramientas, zoom ni histórico.
+    """
+
+    def __init__(self, mac=None, parent=None):
+        super().__init__(mac, parent)
+        self.setMinimumHeight(220)
+        self.lienzo = LienzoQt(self)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.encabezado)
+        layout.addWidget(self.lienzo)
+        self.asignar_sensor(mac)
+
+    def limpiar_sensor(self):
+        self.lienzo.series = []
+        self.lienzo.error = None
+        self.lienzo.update()
+
+    def preparar_seccion(self, seccion):
+        config = SECCIONES[seccion]
+        lienzo = self.lienzo
+        lienzo.titulo = config['titulo']
+        lienzo.ylabel = config['ylabel']
+        lienzo.error = None
+        lienzo.series = []
+        lienzo.xlim, lienzo.ylim = (0.0, 1.0), (0.0, 1.0)
+        lienzo.lineas = []
+        for i, (etiqueta, _, _, estilo) in enumerate(config['lineas']):
+            color = QColor(estilo.get('color', COLORES_DEFECTO[i % len(COLORES_DEFECTO)]))
+            color.setAlphaF(estilo.get('alpha', 1.0))
+            lienzo.lineas.append((etiqueta, QPen(color, estilo.get('linewidth', 1))))
+
+    def poner_series(self, series):
+        self.lienzo.series = series
+
+    def ancho_px(self):
+        return self.lienzo.area().width()
+
+    def limites_x(self):
+        return self.lienzo.xlim
+
+    def limites_y(self):
+        return self.lienzo.ylim
+
+    def fijar_limites_x(self, x_min, x_max):
+        self.lienzo.xlim = (float(x_min), float(x_max))
+
+    def fijar_limites_y(self, y_min, y_max):
+        if math.isfinite(y_min) and math.isfinite(y_max):
+            self.lienzo.ylim = (float(y_min), float(y_max))
+
+    def mostrar_error(self, e):
+        self.lienzo.error = f"Error al dibujar: {e}"
+
+    def dibujar(self, completo):
+        # update() agrupa los repintados; Qt pinta una vez por ciclo de eventos
+        self.lienzo.update()
@@ -2,18 +2,39 @@ import logging
 from PySide6.QtWidgets import (QMainWindow, QVBoxLayout, QWidget, 
                              QLabel, QPushButton, QRadioButton,
                              QGroupBox, QScrollArea, QHBoxLayout, QStatusBar,
-                             QButtonGroup)
+                             QButtonGroup, QLineEdit, QComboBox, QStackedWidget,
+                             QProgressBar)
 from PySide6.QtCore import Qt
 
-# Importamos el widget de gráfica
+# Importamos los widgets de gráfica (uno por backend de dibujo)
+from .GraficaBase import GraficaBase
 from .WidgetGrafica import GraficaWidget
+from .GraficaQt import GraficaQt
+from .VistaGeneral import VistaGeneral
+from .DialogoExportar import DialogoExportar
+
+# Backends de dibujo que se pueden elegir al iniciar
+RENDERIZADORES = {
+    'matplotlib': GraficaWidget, # Completo: barra de herramientas, zoom e histórico
+    'qt': GraficaQt,             # Ligero (QPainter): para muchos sensores en vivo
+}
+
+# Filtro por antigüedad de la última muestra: texto -> segundos (None = todos)
+FILTROS_ACTIVIDAD = {
+    "Todos": None,
+    "Activos (1 min)": 60,
+    "Activos (10 min)": 600,
+    "Activos (1 h)": 3600,
+}
 
 class SensorMonitorUI(QMainWindow):
     """
     Ventana Principal y todos los componentes.
     """
-    def __init__(self):
+    def __init__(self, render='matplotlib', sensores_por_pagina=3):
         super().__init__()
+        self.clase_grafica = RENDERIZADORES[render]
+        self.sensores_por_pagina = sensores_por_pagina
         
         self.setWindowTitle("Sistema de Monitoreo de Sensores")
         self.setGeometry(100, 100, 900, 700)
@@ -30,6 +51,19 @@ class SensorMonitorUI(QMainWindow):
         self.statusbar = QStatusBar()
         self.setStatusBar(self.statusbar)
         self.statusbar.showMessage("Listo.")
+        # Estado del sondeo (permanente, a la derecha de la barra)
+        self.label_sondeo = QLabel("Sondeo: -")
+        self.statusbar.addPermanentWidget(self.label_sondeo)
+        # Resumen de métricas (solo visible si están habilitadas)
+        self.label_metricas = QLabel()
+        self.label_metricas.hide()
+        self.statusbar.addPermanentWidget(self.label_metricas)
+        # Avance de la exportación (solo visible mientras corre)
+        self.barra_exportacion = QProgressBar()
+        self.barra_exportacion.setRange(0, 1000)
+        self.barra_exportacion.setMaximumWidth(200)
+        self.barra_exportacion.hide()
+        self.statusbar.addPermanentWidget(self.barra_exportacion)
 
     def setup_controles(self):
         """Crea la sección superior de controles (paginas y secciones)"""
@@ -46,7 +80,8 @@ class SensorMonitorUI(QMainWindow):
             "Distancias": "distancias",
             "Temperatura": "temperatura",
             "Humedad": "humedad",
-            "Quaterniones": "quaterniones"
+            "Quaterniones": "quaterniones",
+            "Orientacion": "orientacion"
         }
         
         self.grupo_radios_seccion = QButtonGroup(self)
@@ -59,19 +94,56 @@ class SensorMonitorUI(QMainWindow):
                 radio.setChecked(True) # Default
         
         #Grupo de Paginación 
-        grupo_paginacion = QGroupBox("Navegación de Sensores (3 por pág)")
+        grupo_paginacion = QGroupBox(f"Navegación de Sensores ({self.sensores_por_pagina} por pág)")
         layout_paginacion = QHBoxLayout(grupo_paginacion)
         
         self.btn_anterior = QPushButton("<- Anterior")
         self.label_pagina = QLabel("Página 1 / 1")
         self.btn_siguiente = QPushButton("Siguiente ->")
+        # Todos los sensores del filtro a la vez, en miniatura
+        self.btn_vista_general = QPushButton("Vista general")
+        self.btn_vista_general.setCheckable(True)
+        self.btn_vista_general.setToolTip("Todos los sensores en gráficas mínimas; click en uno para abrirlo")
         
         layout_paginacion.addWidget(self.btn_anterior)
         layout_paginacion.addWidget(self.label_pagina)
         layout_paginacion.addWidget(self.btn_siguiente)
+        layout_paginacion.addWidget(self.btn_vista_general)
         
+        #Grupo de Búsqueda / filtro de sensores
+        grupo_busqueda = QGroupBox("Buscar Sensor")
+        layout_busqueda = QHBoxLayout(grupo_busqueda)
+
+        self.campo_busqueda = QLineEdit()
+        self.campo_busqueda.setPlaceholderText("MAC (parte o inicio)")
+        self.campo_busqueda.setClearButtonEnabled(True)
+        self.campo_busqueda.setToolTip("Filtra por MAC mientras se escribe; Enter salta a la página del sensor")
+        self.combo_capa = QComboBox()
+        self.combo_capa.addItem("Todas las capas", None)
+        self.combo_actividad = QComboBox()
+        for texto, segundos in FILTROS_ACTIVIDAD.items():
+            self.combo_actividad.addItem(texto, segundos)
+
+        layout_busqueda.addWidget(self.campo_busqueda)
+        layout_busqueda.addWidget(self.combo_capa)
+        layout_busqueda.addWidget(self.combo_actividad)
+
+        #Grupo de Exportación
+        grupo_exportacion = QGroupBox("Datos")
+        layout_exportacion = QHBoxLayout(grupo_exportacion)
+
+        self.btn_exportar = QPushButton("Exportar...")
+        self.btn_exportar.setToolTip("Guarda los datos de uno, varios o todos los sensores en .csv.gz, .csv o .npz")
+        self.btn_cancelar_exportacion = QPushButton("Cancelar")
+        self.btn_cancelar_exportacion.hide()
+
+        layout_exportacion.addWidget(self.btn_exportar)
+        layout_exportacion.addWidget(self.btn_cancelar_exportacion)
+
         layout_controles.addWidget(grupo_seccion)
         layout_controles.addWidget(grupo_paginacion)
+        layout_controles.addWidget(grupo_busqueda)
+        layout_controles.addWidget(grupo_exportacion)
         layout_controles.addStretch() 
         
         self.layout_principal.addWidget(grupo_controles)
@@ -88,7 +160,18 @@ class SensorMonitorUI(QMainWindow):
         self.layout_graficas.setAlignment(Qt.AlignmentFlag.AlignTop) 
         
         scroll.setWidget(self.widget_contenedor_graficas)
-        self.layout_principal.addWidget(scroll)
+
+        # Vista general: un solo widget con los mosaicos de todos los sensores
+        scroll_general = QScrollArea()
+        scroll_general.setWidgetResizable(True)
+        self.vista_general = VistaGeneral()
+        scroll_general.setWidget(self.vista_general)
+
+        # Solo se muestra una de las dos (ver mostrar_vista_general)
+        self.areas_graficas = QStackedWidget()
+        self.areas_graficas.addWidget(scroll)
+        self.areas_graficas.addWidget(scroll_general)
+        self.layout_principal.addWidget(self.areas_graficas)
 
     # Funciones de Ayuda (Llamadas por la Lógica) 
 
@@ -102,15 +185,27 @@ class SensorMonitorUI(QMainWindow):
             if child.widget():
                 child.widget().deleteLater() # Borrar el widget de memoria
 
-    def crear_grafica_real(self, mac) -> GraficaWidget:
+    def crear_grafica_real(self, mac=None) -> GraficaBase:
         """
-        Crea el widget de gráfica real
+        Crea el widget de gráfica real (del backend elegido)
         y lo añade al layout. Devuelve la instancia.
         """
-        logging.info(f"UI: Creando GraficaWidget real para {mac}")
-        widget = GraficaWidget(mac) # Usa la clase
+        logging.info(f"UI: Creando {self.clase_grafica.__name__} real para {mac}")
+        widget = self.clase_grafica(mac) # Usa la clase
         self.layout_graficas.addWidget(widget)
         return widget
+
+    def crear_pool_graficas(self, cantidad) -> list:
+        """
+        Crea 'cantidad' widgets de gráfica sin sensor asignado (ocultos).
+        La lógica los reutiliza para las MACs de la página actual.
+        """
+        pool = []
+        for _ in range(cantidad):
+            widget = self.crear_grafica_real()
+            widget.hide()
+            pool.append(widget)
+        return pool
         
     def actualizar_estado_paginacion(self, pagina_actual_cero_index, total_paginas, hay_anterior, hay_siguiente):
         """Actualiza la etiqueta de página y habilita/deshabilita botones"""
@@ -118,6 +213,72 @@ class SensorMonitorUI(QMainWindow):
         self.btn_anterior.setEnabled(hay_anterior)
         self.btn_siguiente.setEnabled(hay_siguiente)
 
+    def mostrar_vista_general(self, activa):
+        """Cambia entre las gráficas de la página y la vista general"""
+        self.areas_graficas.setCurrentIndex(1 if activa else 0)
+        if activa:
+            self.btn_anterior.setEnabled(False)
+            self.btn_siguiente.setEnabled(False)
+
+    def actualizar_estado_vista_general(self, cantidad):
+        self.label_pagina.setText(f"Todos ({cantidad})")
+
+    def agregar_capa(self, capa):
+        """Agrega una capa al filtro (en orden) cuando aparece la primera vez."""
+        posicion = 1
+        while posicion < self.combo_capa.count() and self.combo_capa.itemData(posicion) < capa:
+            posicion += 1
+        self.combo_capa.insertItem(posicion, f"Capa {capa}", capa)
+
+    def obtener_filtro(self):
+        """Filtro de sensores elegido: (texto de MAC, capa o None, antigüedad máxima en s o None)"""
+        return (self.campo_busqueda.text(), self.combo_capa.currentData(),
+                self.combo_actividad.currentData())
+
+    def limpiar_filtro(self, solo_texto=False):
+        """Vuelve el filtro a 'todos' (o solo borra el texto) sin disparar sus señales."""
+        controles = (self.campo_busqueda,) if solo_texto else (self.campo_busqueda, self.combo_capa, self.combo_actividad)
+        for control in controles:
+            control.blockSignals(True)
+        self.campo_busqueda.clear()
+        if not solo_texto:
+            self.combo_capa.setCurrentIndex(0)
+            self.combo_actividad.setCurrentIndex(0)
+        for control in controles:
+            control.blockSignals(False)
+
+    def pedir_exportacion(self, ruta_inicial, permite_servidor=True):
+        """Muestra el diálogo de exportación. Devuelve sus valores o None si se canceló."""
+        dialogo = DialogoExportar(ruta_inicial, permite_servidor, self)
+        if dialogo.exec() != DialogoExportar.DialogCode.Accepted:
+            return None
+        return dialogo.valores()
+
+    def exportacion_en_curso(self, activa):
+        """Muestra la barra de avance y el botón de cancelar mientras se exporta"""
+        self.btn_exportar.setEnabled(not activa)
+        self.btn_cancelar_exportacion.setVisible(activa)
+        self.barra_exportacion.setValue(0)
+        self.barra_exportacion.setVisible(activa)
+
+    def actualizar_progreso_exportacion(self, filas, fraccion):
+        self.barra_exportacion.setValue(int(fraccion * 1000))
+        self.statusbar.showMessage(f"Exportando: {fraccion:.0%} ({filas:,} filas)")
+
+    def actualizar_estado_sondeo(self, intervalo_ms, latencia_s):
+        """Muestra cada cuánto se sondea la BD y la latencia de los datos"""
+        self.label_sondeo.setText(f"Sondeo: {intervalo_ms} ms | Latencia: {latencia_s:.1f} s")
+
+    def actualizar_metricas(self, consulta_p50_ms, cola_p99_ms, dibujo_p99_ms):
+        """Resumen de las métricas (percentiles aproximados por bucket)"""
+        def texto(valor):
+            return "-" if valor is None else f"{valor:g}"
+        self.label_metricas.setText(
+            f"BD p50 ≤{texto(consulta_p50_ms)} ms | Cola p99 ≤{texto(cola_p99_ms)} ms | "
+            f"Dibujo p99 ≤{texto(dibujo_p99_ms)} ms"
+        )
+        self.label_metricas.show()
+
     def obtener_seccion_seleccionada(self) -> str:
         """Devuelve el ID de la sección seleccionada (ej: 'distancias')"""
         boton_chequeado = self.grupo_radios_seccion.checkedButton()
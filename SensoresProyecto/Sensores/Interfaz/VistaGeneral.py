@@ -0,0 +1,194 @@
+import time
+from PySide6.QtWidgets import QWidget, QSizePolicy, QToolTip
+from PySide6.QtCore import Qt, QRect, QRectF, Signal
+from PySide6.QtGui import QPainter, QPen, QColor, QFont, QImage
+import numpy as np
+
+from Logica.Decimacion import decimar
+from .GraficaBase import SECCIONES, sufijo_mac
+from .GraficaQt import COLORES_DEFECTO, poligono_desde_arreglo
+
+# Tamaño de cada mosaico (un sensor) en pixeles
+ANCHO_MOSAICO, ALTO_MOSAICO = 160, 48
+ALTO_ETIQUETA = 12 # Franja de arriba con la MAC
+MARGEN_MOSAICO = 3
+
+
+class VistaGeneral(QWidget):
+    """
+    Todos los sensores (los del filtro del directorio) a la vez, como
+    gráficas mínimas de la sección actual, en una sola imagen (QImage)
+    dividida en mosaicos.
+
+    La imagen se conserva entre cuadros: solo se vuelve a pintar el
+    mosaico de un sensor cuando llegan datos suyos (dibujar_mosaicos), y
+    paintEvent solo copia a pantalla la parte visible. Un click en un
+    mosaico emite 'sensor_elegido' con su MAC.
+    """
+
+    sensor_elegido = Signal(str)
+    # Cambió la cantidad de columnas (al cambiar el ancho): hay que repintar todo
+    mosaicos_invalidos = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Minimum)
+        self.setAttribute(Qt.WidgetAttribute.WA_OpaquePaintEvent)
+        self.setMouseTracking(True) # Para el tooltip con la MAC
+
+        self.macs = []      # Sensor de cada mosaico, en orden
+        self.indices = {}   # {mac: índice del mosaico}
+        self.datos = {}     # {mac: BufferSensor} (el de la lógica, no una copia)
+        self.lineas = []    # [(canal, columna, QPen)] de la sección
+        self.ylim = None    # Límites fijos de la sección, o None para sacarlos de la serie reducida
+        self.columnas = 1
+        self.atlas = QImage()
+
+    # --- Disposición ---
+
+    def asignar(self, macs, seccion, datos):
+        """Cambia los sensores y la sección. Deja los mosaicos vacíos (solo con la MAC)."""
+        self.macs = list(macs)
+        self.indices = {mac: i for i, mac in enumerate(self.macs)}
+        self.datos = datos
+
+        config = SECCIONES[seccion]
+        self.ylim = config['ylim'] if isinstance(config['ylim'], tuple) else None
+        self.lineas = []
+        for i, (_, canal, columna, estilo) in enumerate(config['lineas']):
+            color = QColor(estilo.get('color', COLORES_DEFECTO[i % len(COLORES_DEFECTO)]))
+            self.lineas.append((canal, columna, QPen(color, 1)))
+        self.rearmar()
+
+    def rearmar(self):
+        """Crea la imagen para la cantidad de columnas que caben en el ancho actual."""
+        self.columnas = max(1, self.width() // ANCHO_MOSAICO)
+        filas = max(1, -(-len(self.macs) // self.columnas))
+        self.setMinimumHeight(filas * ALTO_MOSAICO)
+        self.atlas = QImage(self.columnas * ANCHO_MOSAICO, filas * ALTO_MOSAICO, QImage.Format.Format_RGB32)
+        self.atlas.fill(Qt.GlobalColor.white)
+
+        painter = QPainter(self.atlas)
+        painter.setFont(QFont(painter.font().family(), 7))
+        for i, mac in enumerate(self.macs):
+            self._pintar_marco(painter, self.rect_mosaico(i), mac)
+        painter.end()
+        self.update()
+
+    def rect_mosaico(self, i):
+        fila, columna = divmod(i, self.columnas)
+        return QRect(columna * ANCHO_MOSAICO, fila * ALTO_MOSAICO, ANCHO_MOSAICO, ALTO_MOSAICO)
+
+    def indice_en(self, punto):
+        """Índice del mosaico bajo el punto (coordenadas del widget), o None."""
+        columna = int(punto.x()) // ANCHO_MOSAICO
+        if columna >= self.columnas:
+            return None
+        i = (int(punto.y()) // ALTO_MOSAICO) * self.columnas + columna
+        return i if 0 <= i < len(self.macs) else None
+
+    # --- Dibujo de mosaicos ---
+
+    def dibujar_mosaicos(self, macs, presupuesto_ms=None):
+        """
+        Repinta en la imagen los mosaicos de 'macs'. Si se pasa el
+        presupuesto de tiempo se detiene y devuelve las MACs que faltaron.
+        """
+        inicio = time.perf_counter()
+        painter = QPainter(self.atlas)
+        painter.setFont(QFont(painter.font().family(), 7))
+        macs = list(macs)
+        faltan = []
+        for n, mac in enumerate(macs):
+            if presupuesto_ms is not None and (time.perf_counter() - inicio) * 1000 > presupuesto_ms:
+                faltan = macs[n:]
+                break
+            i = self.indices.get(mac)
+            if i is None:
+                continue
+            rect = self.rect_mosaico(i)
+            self._pintar_mosaico(painter, rect, mac, self.datos.get(mac))
+            self.update(rect)
+        painter.end()
+        return faltan
+
+    def _pintar_marco(self, painter, rect, mac):
+        painter.fillRect(rect, Qt.GlobalColor.white)
+        painter.setPen(QColor(0, 0, 0, 50))
+        painter.drawRect(rect.adjusted(0, 0, -1, -1))
+        painter.setPen(Qt.GlobalColor.black)
+        painter.drawText(QRectF(rect.left() + MARGEN_MOSAICO, rect.top(), rect.width(), ALTO_ETIQUETA),
+                         Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter, sufijo_mac(mac))
+
+    def _pintar_mosaico(self, painter, rect, mac, datos):
+        self._pintar_marco(painter, rect, mac)
+        if not datos or not len(datos):
+            return
+
+        # La serie reducida (min/max por bucket) conserva los extremos, así
+        # que los límites salen de ella sin recorrer el buffer completo
+        area = QRectF(rect.left() + MARGEN_MOSAICO, rect.top() + ALTO_ETIQUETA,
+                      rect.width() - 2 * MARGEN_MOSAICO, rect.height() - ALTO_ETIQUETA - MARGEN_MOSAICO)
+        x = datos['muestras']
+        series = []
+        for canal, columna, pluma in self.lineas:
+            valores = datos[canal] if columna is None else datos[canal][:, columna]
+            xd, yd = decimar(x, valores, area.width())
+            series.append((np.asarray(xd, dtype=np.float64), np.asarray(yd, dtype=np.float64), pluma))
+
+        x0, x1 = float(x[0]), float(x[-1])
+        if self.ylim is not None:
+            y0, y1 = self.ylim
+        else:
+            finitos = [yd[np.isfinite(yd)] for _, yd, _ in series]
+            finitos = [f for f in finitos if len(f)]
+            if not finitos:
+                return
+            y0 = min(f.min() for f in finitos)
+            y1 = max(f.max() for f in finitos)
+
+        escala_x = area.width() / ((x1 - x0) or 1)
+        escala_y = area.height() / ((y1 - y0) or 1)
+        painter.setClipRect(area)
+        for xd, yd, pluma in series:
+            puntos = np.empty((len(xd), 2))
+            puntos[:, 0] = area.left() + (xd - x0) * escala_x
+            puntos[:, 1] = area.bottom() - (yd - y0) * escala_y
+            painter.setPen(pluma)
+            validos = np.isfinite(puntos).all(axis=1)
+            if validos.all():
+                # Con pluma de 1 px la polilínea es ~5 veces más rápida que los segmentos sueltos
+                painter.drawPolyline(poligono_desde_arreglo(puntos))
+                continue
+            # QPainter no acepta NaN: se omiten los segmentos que lo tocan
+            segmentos = validos[:-1] & validos[1:]
+            extremos = np.stack((puntos[:-1][segmentos], puntos[1:][segmentos]), axis=1).reshape(-1, 2)
+            if len(extremos):
+                painter.drawLines(poligono_desde_arreglo(extremos))
+        painter.setClipping(False)
+
+    # --- Eventos ---
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(event.rect(), Qt.GlobalColor.white)
+        painter.drawImage(event.rect(), self.atlas, event.rect())
+        painter.end()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if max(1, self.width() // ANCHO_MOSAICO) != self.columnas:
+            self.rearmar()
+            self.mosaicos_invalidos.emit()
+
+    def mousePressEvent(self, event):
+        i = self.indice_en(event.position())
+        if i is not None and event.button() == Qt.MouseButton.LeftButton:
+            self.sensor_elegido.emit(self.macs[i])
+
+    def mouseMoveEvent(self, event):
+        i = self.indice_en(event.position())
+        if i is not None:
+            QToolTip.showText(event.globalPosition().toPoint(), f"{self.macs[i]} (click para abrir)", self)
+        else:
+            QToolTip.hideText()
@@ -1,6 +1,6 @@
 import logging
-from PySide6.QtWidgets import QWidget, QVBoxLayout, QGroupBox
-from PySide6.QtCore import Slot
+from PySide6.QtWidgets import QVBoxLayout
+from PySide6.QtCore import Signal, Slot, QTimer
 
 # --- Importaciones de Matplotlib ---
 from matplotlib.figure import Figure
@@ -8,145 +8,223 @@ from matplotlib.backends.backend_qtagg import (
     FigureCanvasQTAgg as FigureCanvas,
     NavigationToolbar2QT as NavigationToolbar
 )
-from collections import deque
+from Logica.Historico import clave_historico
+from .GraficaBase import GraficaBase, SECCIONES
 
 # Configurar logging
 logger = logging.getLogger(__name__)
 
-class GraficaWidget(QGroupBox):
+# Espera después del último zoom/paneo antes de pedir el histórico (ms)
+ESPERA_HISTORICO_MS = 300
+
+
+class BarraHerramientas(NavigationToolbar):
+    """Barra de matplotlib que avisa cuando se pulsa "Home"."""
+
+    inicio_pulsado = Signal()
+
+    def home(self, *args):
+        super().home(*args)
+        self.inicio_pulsado.emit()
+
+
+class GraficaWidget(GraficaBase):
     """
-    widget que contiene una figura, canvas y
+    Backend de matplotlib: widget que contiene una figura, canvas y
     barra de herramientas de Matplotlib. Sabe cómo dibujarse a sí mismo.
+
+    Dibuja en modo retenido: las líneas, la leyenda y los ejes se crean una
+    vez por sección; cada actualización solo cambia los datos de las líneas
+    y repinta el eje con blitting. El dibujo completo solo se hace cuando
+    cambia la sección o los datos se salen de los límites actuales.
+
+    Si el usuario hace zoom o paneo con la barra de herramientas, la vista
+    queda fija (modo histórico). Si la vista llega antes de la primera
+    muestra del buffer, se pide al servidor el histórico agregado de ese
+    rango. El botón "Home" vuelve al modo en vivo.
+
+    Los widgets se reutilizan entre páginas: asignar_sensor cambia la MAC
+    que muestra sin crear otra figura.
     """
-    def __init__(self, mac, parent=None):
-        
-        # Usar los últimos 6 dígitos de la MAC para el título
-        mac_suffix = f'{mac.split(":")[-2]}:{mac.split(":")[-1]}' if ':' in mac else mac
-        super().__init__(f"Sensor: {mac_suffix}", parent)
-        
-        self.mac = mac
+
+    def __init__(self, mac=None, parent=None):
+        super().__init__(mac, parent)
         self.setMinimumHeight(350) # Darle tamaño
-        
-        #  Configuracion 
+
+        #  Configuracion
         self.figura = Figure(figsize=(10, 4))
         self.canvas = FigureCanvas(self.figura)
         self.ax = self.figura.add_subplot(111)
-        self.toolbar = NavigationToolbar(self.canvas, self) # Barra de herramientas
-        
-        #  layout 
+        self.toolbar = BarraHerramientas(self.canvas, self) # Barra de herramientas
+
+        #  Estado del modo retenido
+        self.lineas = []             # [(Line2D, canal, columna)]
+        self.fondo = None            # Imagen del eje sin las líneas (para blitting)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.canvas.mpl_connect('resize_event', self.on_resize)
+
+        #  Modo histórico (vista fijada por el usuario)
+        self.ajustando_limites = False # True mientras nosotros cambiamos los límites
+        self.artistas_historico = []
+        self.timer_historico = QTimer(self)
+        self.timer_historico.setSingleShot(True)
+        self.timer_historico.setInterval(ESPERA_HISTORICO_MS)
+        self.timer_historico.timeout.connect(self.pedir_historico_visible)
+        # "Home" de la barra regresa al modo en vivo
+        self.toolbar.inicio_pulsado.connect(self.volver_a_vivo)
+
+        #  layout
         layout = QVBoxLayout(self)
+        layout.addWidget(self.encabezado)
         layout.addWidget(self.toolbar)
         layout.addWidget(self.canvas)
 
-    @Slot(dict, str)
-    def actualizar_grafica(self, datos_sensor: dict, seccion: str):
-        """
-        Función principal. Borra y redibuja el lienzo (canvas)
-        basado en la sección y los datos (deques) proporcionados.
-        """
-        if not datos_sensor:
-            logger.warning(f"No hay datos para {self.mac}")
-            return
-            
+        self.asignar_sensor(mac)
+
+    def limpiar_sensor(self):
+        self.timer_historico.stop()
+        self.limpiar_historico()
+        for linea, _, _ in self.lineas:
+            linea.set_data([], []) # No dejar arreglos del sensor anterior
+
+    def mostrar_error(self, e):
+        self.ax.set_title(f"Error al dibujar: {e}")
+
+    def dibujar(self, completo):
+        if completo or self.fondo is None:
+            # Redibujado completo; on_draw guarda el nuevo fondo
+            self.canvas.draw()
+        else:
+            self.blit_lineas()
+
+    #  Modo retenido
+
+    def preparar_seccion(self, seccion):
+        """Crea los ejes, líneas y leyenda de la sección (una sola vez)."""
+        config = SECCIONES[seccion]
         self.ax.clear() # Limpiar el eje
-        
-        try:
-            # Seleccionar la función de dibujo apropiada
-            if seccion == 'distancias':
-                self.dibujar_distancias(datos_sensor)
-            elif seccion == 'temperatura':
-                self.dibujar_temperatura(datos_sensor)
-            elif seccion == 'humedad':
-                self.dibujar_humedad(datos_sensor)
-            elif seccion == 'quaterniones':
-                self.dibujar_quaterniones(datos_sensor)
-            
-            # Configuración común
-            self.ax.legend(loc='upper right', fontsize=8)
-            self.ax.grid(True, linestyle='--', alpha=0.5)
-            self.ax.set_xlabel('Identificador de Muestra', fontsize=10)
-            
-            # Ajustar límites X (eje horizontal)
-            muestras = list(datos_sensor.get('muestras', []))
-            if muestras:
-                # Mostrar solo las últimas N muestras si hay muchas
-                # O simplemente dejar que Matplotlib lo ajuste
-                self.ax.set_xlim(min(muestras), max(muestras))
-
-        except Exception as e:
-            logger.error(f"Error al dibujar gráfica para {self.mac}: {e}")
-            self.ax.set_title(f"Error al dibujar: {e}")
-
-        # Redibujar el lienzo
+        self.lineas = []
+        self.artistas_historico = []
+        self.vista_manual = False
+        # Sin autoescala: los límites los pone ajustar_limites. Si no, el
+        # autoescalado diferido de matplotlib cambia xlim al dibujar y se
+        # confunde con un zoom del usuario
+        self.ax.set_autoscale_on(False)
+        # clear() reinicia los callbacks del eje; hay que volver a conectarlos
+        self.ax.callbacks.connect('xlim_changed', self.on_xlim_changed)
+
+        for etiqueta, canal, columna, estilo in config['lineas']:
+            # 'animated': las líneas no forman parte del fondo guardado
+            linea, = self.ax.plot([], [], label=etiqueta, animated=True, **estilo)
+            self.lineas.append((linea, canal, columna))
+
+        self.ax.set_ylabel(config['ylabel'], fontsize=10)
+        self.ax.set_title(config['titulo'], fontsize=12)
+
+        # Configuración común
+        self.ax.legend(loc='upper right', fontsize=8)
+        self.ax.grid(True, linestyle='--', alpha=0.5)
+        self.ax.set_xlabel('Identificador de Muestra', fontsize=10)
+
         self.figura.tight_layout()
+
+    def poner_series(self, series):
+        for (linea, _, _), (x, y) in zip(self.lineas, series):
+            linea.set_data(x, y)
+
+    def ancho_px(self):
+        return self.ax.bbox.width
+
+    def limites_x(self):
+        return self.ax.get_xlim()
+
+    def limites_y(self):
+        return self.ax.get_ylim()
+
+    def fijar_limites_x(self, x_min, x_max):
+        self.ax.set_xlim(x_min, x_max)
+
+    def fijar_limites_y(self, y_min, y_max):
+        self.ax.set_ylim(y_min, y_max)
+
+    def ajustar_limites(self, datos, ylim):
+        # Marcar que el cambio de límites es nuestro (ver on_xlim_changed)
+        self.ajustando_limites = True
+        try:
+            return super().ajustar_limites(datos, ylim)
+        finally:
+            self.ajustando_limites = False
+
+    #  Modo histórico
+
+    def on_xlim_changed(self, ax):
+        """Si el cambio de límites no fue nuestro, lo hizo el usuario (zoom/paneo)."""
+        if self.ajustando_limites:
+            return
+        self.vista_manual = True
+        self.timer_historico.start() # Reinicia la espera en cada movimiento
+
+    @Slot()
+    def pedir_historico_visible(self):
+        """Pide el histórico si la vista empieza antes de los datos en memoria."""
+        if not self.vista_manual or not self.datos_actuales:
+            return
+        x_min, x_max = self.ax.get_xlim()
+        primera = self.datos_actuales['muestras'][0]
+        if x_min >= primera:
+            return
+        # Solo el tramo que no está en memoria, con la resolución de la vista
+        ancho_px = int(self.ax.bbox.width * (min(x_max, primera) - x_min) / (x_max - x_min))
+        self.solicitar_historico.emit(self.mac, int(x_min), int(min(x_max, primera)), max(ancho_px, 1))
+
+    def mostrar_historico(self, datos):
+        """
+        Dibuja el histórico agregado: el promedio como línea punteada y el
+        rango mínimo-máximo como banda, con el color de cada línea.
+        """
+        if not self.vista_manual:
+            return # El usuario ya volvió al modo en vivo
+        self.limpiar_historico()
+
+        x = datos['muestras']
+        for linea, canal, columna in self.lineas:
+            valores = datos[clave_historico(canal, columna)]
+            color = linea.get_color()
+            banda = self.ax.fill_between(x, valores[:, 0], valores[:, 2], color=color, alpha=0.15, linewidth=0)
+            promedio, = self.ax.plot(x, valores[:, 1], color=color, linewidth=0.8, linestyle='--')
+            self.artistas_historico += [banda, promedio]
         self.canvas.draw()
 
-    #  Funciones de Dibujo 
-    
-    def dibujar_distancias(self, datos):
-        muestras = list(datos['muestras'])
-        d1 = list(datos['D1'])
-        d2 = list(datos['D2'])
-        d3 = list(datos['D3'])
-        
-        if muestras:
-            self.ax.plot(muestras, d1, label='D1', color='blue', linewidth=1.5)
-            self.ax.plot(muestras, d2, label='D2', color='red', linewidth=1.5)
-            self.ax.plot(muestras, d3, label='D3', color='green', linewidth=1.5)
-        
-        self.ax.set_ylabel('Distancia (metros)', fontsize=10)
-        self.ax.set_title('Mediciones de Distancia', fontsize=12)
-        
-        # Ajustar límites Y automáticamente
-        todos_datos = d1 + d2 + d3
-        datos_validos = [d for d in todos_datos if d > 0]
-        if datos_validos:
-            y_min = max(0, min(datos_validos) - 0.5)
-            y_max = max(datos_validos) + 0.5
-            self.ax.set_ylim(y_min, y_max)
-        else:
-            self.ax.set_ylim(0, 10) # Default
-
-    def dibujar_temperatura(self, datos):
-        muestras = list(datos['muestras'])
-        temp = list(datos['temperatura'])
-        if muestras:
-            self.ax.plot(muestras, temp, label='Temperatura', color='red', linewidth=2)
-        
-        self.ax.set_ylabel('Temperatura (°C)', fontsize=10)
-        self.ax.set_title('Temperatura', fontsize=12)
-        if temp:
-            temp_min = min(temp); temp_max = max(temp)
-            margen = max((temp_max - temp_min) * 0.1, 1.0)
-            
-            self.ax.set_ylim(temp_min - margen, temp_max + margen)
-
-    def dibujar_humedad(self, datos):
-        muestras = list(datos['muestras'])
-        humedad = list(datos['humedad'])
-        if muestras:
-            self.ax.plot(muestras, humedad, label='Humedad', color='blue', linewidth=2)
-        
-        self.ax.set_ylabel('Humedad (%)', fontsize=10)
-        self.ax.set_title('Humedad Relativa', fontsize=12)
-        self.ax.set_ylim(0, 100) # Fijo
-
-    def dibujar_quaterniones(self, datos):
-        muestras = list(datos['muestras'])
-        quats = list(datos['quaterniones'])
-        if muestras and quats:
-            q1 = [q[0] for q in quats]
-            
-            q2 = [q[1] for q in quats]
-            q3 = [q[2] for q in quats]
-            q4 = [q[3] for q in quats]
-            
-            self.ax.plot(muestras, q1, label='Q1 (W)', linewidth=1, alpha=0.8)
-            
-            self.ax.plot(muestras, q2, label='Q2 (X)', linewidth=1, alpha=0.8)
-            self.ax.plot(muestras, q3, label='Q3 (Y)', linewidth=1, alpha=0.8)
-            self.ax.plot(muestras, q4, label='Q4 (Z)', linewidth=1, alpha=0.8)
-        
-        self.ax.set_ylabel('Valor Quaternion', fontsize=10)
-        self.ax.set_title('Orientacion (Quaterniones)', fontsize=12)
-        self.ax.set_ylim(-1.2, 1.2) # Fijo
\ No newline at end of file
+    def limpiar_historico(self):
+        for artista in self.artistas_historico:
+            artista.remove()
+        self.artistas_historico = []
+
+    @Slot()
+    def volver_a_vivo(self):
+        """Regresa a los límites automáticos y quita el histórico."""
+        self.vista_manual = False
+        self.timer_historico.stop()
+        self.limpiar_historico()
+        if self.datos_actuales and self.seccion_dibujada:
+            self.actualizar_grafica(self.datos_actuales, self.seccion_dibujada)
+            self.canvas.draw()
+
+    def on_draw(self, event):
+        """Después de un dibujo completo: guardar el fondo y pintar las líneas."""
+        self.fondo = self.canvas.copy_from_bbox(self.ax.bbox)
+        for linea, _, _ in self.lineas:
+            self.ax.draw_artist(linea)
+
+    def on_resize(self, event):
+        """Al cambiar de tamaño se recalcula el layout en el próximo dibujo."""
+        self.fondo = None
+        if self.seccion_dibujada:
+            self.figura.tight_layout()
+
+    def blit_lineas(self):
+        """Restaura el fondo guardado y repinta solo las líneas del eje."""
+        self.canvas.restore_region(self.fondo)
+        for linea, _, _ in self.lineas:
+            self.ax.draw_artist(linea)
+        self.canvas.blit(self.ax.bbox)
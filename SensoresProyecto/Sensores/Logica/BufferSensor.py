@@ -0,0 +1,173 @@
+import numpy as np
+
+from .Estadisticas import EstadisticasSensor
+from .Orientacion import cuaterniones_a_euler
+
+# Canales que guarda cada sensor: nombre -> (dtype, forma de cada muestra)
+CANALES = {
+    'muestras': (np.int64, ()),           # Identificador (Eje X)
+    'fecha': (np.float64, ()),            # Fecha como segundos epoch
+    'paquete': (np.int64, ()),            # No_paquete (para exportar las filas completas)
+    'D1': (np.float64, ()),
+    'D2': (np.float64, ()),
+    'D3': (np.float64, ()),
+    'temperatura': (np.float64, ()),
+    'humedad': (np.float64, ()),
+    'quaterniones': (np.float64, (4,)),   # (Q1, Q2, Q3, Q4) por fila
+    'orientacion': (np.float64, (3,)),    # (roll, pitch, yaw) en grados
+}
+
+# Canales que no vienen en las columnas: se calculan al insertar a partir
+# de otro canal, solo para las muestras nuevas. nombre -> (origen, función)
+CANALES_DERIVADOS = {
+    'orientacion': ('quaterniones', cuaterniones_a_euler),
+}
+
+# Espacio extra al final de los arreglos. Cuando se llena se compacta
+# (se mueven los últimos valores al inicio), así las vistas siempre son
+# contiguas y el costo de mover se reparte entre muchas inserciones.
+FACTOR_HOLGURA = 0.25
+
+
+def tamano_fisico(capacidad):
+    """Largo de los arreglos de un buffer de 'capacidad' muestras (con la holgura)."""
+    return capacidad + max(1, int(capacidad * FACTOR_HOLGURA))
+
+
+class BufferSensor:
+    """
+    Buffer circular de tamaño fijo para los datos de UN sensor.
+    Guarda cada canal en un arreglo de NumPy (float64/int64) y devuelve
+    vistas ordenadas (de la más vieja a la más nueva) sin copiar datos.
+
+    Se usa como el dict de deques que tenía antes AppLogica:
+    datos['D1'], datos['muestras'], len(datos), etc.
+
+    'estadisticas' (EstadisticasSensor) da mínimo, máximo, media,
+    desviación y EWMA por canal de la ventana sin recorrer los arreglos.
+    """
+
+    def __init__(self, capacidad):
+        if capacidad < 1:
+            raise ValueError("La capacidad del buffer debe ser mayor a 0")
+        self.capacidad = capacidad
+        self.tamano = tamano_fisico(capacidad)
+
+        self.arreglos = self._crear_arreglos()
+        self.inicio = 0 # Posición física de la muestra más vieja
+        self.fin = 0    # Posición física después de la más nueva
+        self.total = 0  # Muestras agregadas desde que se creó (nunca baja)
+        self._estadisticas = EstadisticasSensor(capacidad)
+
+    def _crear_arreglos(self):
+        """Un arreglo por canal; BufferCompartido los pone en memoria compartida."""
+        return {
+            canal: np.zeros((self.tamano,) + forma, dtype=dtype)
+            for canal, (dtype, forma) in CANALES.items()
+        }
+
+    # --- Acceso tipo dict ---
+
+    def __len__(self):
+        return self.fin - self.inicio
+
+    def __contains__(self, canal):
+        return canal in self.arreglos
+
+    def __getitem__(self, canal):
+        """Vista ordenada (solo lectura) del canal, sin copiar."""
+        vista = self.arreglos[canal][self.inicio:self.fin]
+        vista.flags.writeable = False
+        return vista
+
+    def get(self, canal, default=None):
+        if canal not in self.arreglos:
+            return default
+        return self[canal]
+
+    def keys(self):
+        return self.arreglos.keys()
+
+    def copiar(self, desde=None, hasta=None):
+        """
+        Copia (no vistas) de los canales que llegan en las columnas, solo de
+        las muestras con 'fecha' (epoch) en [desde, hasta); None = sin límite.
+        Para sacar los datos a otro hilo (p. ej. al exportar).
+        """
+        fecha = self['fecha']
+        seleccion = np.ones(len(fecha), dtype=bool)
+        if desde is not None:
+            seleccion &= fecha >= desde
+        if hasta is not None:
+            seleccion &= fecha < hasta
+        return {canal: self[canal][seleccion] for canal in self.arreglos if canal not in CANALES_DERIVADOS}
+
+    @property
+    def estadisticas(self):
+        """Estadísticas de la ventana, al día con lo agregado hasta ahora."""
+        self._estadisticas.sincronizar(self)
+        return self._estadisticas
+
+    @property
+    def nbytes(self):
+        """Memoria reservada por todos los canales."""
+        return sum(arr.nbytes for arr in self.arreglos.values())
+
+    # --- Inserción ---
+
+    def _reservar(self, cantidad):
+        """
+        Asegura espacio para 'cantidad' muestras al final y devuelve la
+        posición física donde escribirlas. Compacta si hace falta.
+        """
+        if self.fin + cantidad > self.tamano:
+            # Conservar solo lo que seguirá dentro de la ventana
+            conservar = min(self.fin - self.inicio, self.capacidad - cantidad)
+            for arr in self.arreglos.values():
+                arr[0:conservar] = arr[self.fin - conservar:self.fin]
+            self.inicio = 0
+            self.fin = conservar
+        return self.fin
+
+    def _avanzar(self, cantidad):
+        self.fin += cantidad
+        if self.fin - self.inicio > self.capacidad:
+            self.inicio = self.fin - self.capacidad
+        self.total += cantidad
+
+    def agregar(self, valores):
+        """Agrega UNA muestra. 'valores' es un dict {canal: valor}. O(1) amortizado."""
+        self.agregar_lote({canal: [valor] for canal, valor in valores.items()})
+
+    def agregar_lote(self, columnas):
+        """
+        Agrega varias muestras de una vez.
+        'columnas' es un dict {canal: arreglo/lista} con la misma longitud
+        (sin los CANALES_DERIVADOS, que se calculan aquí).
+        """
+        cantidad = len(columnas['muestras'])
+        if cantidad == 0:
+            return
+
+        # Si el lote es más grande que el buffer solo sirven las últimas
+        descartadas = max(0, cantidad - self.capacidad)
+        cantidad -= descartadas
+
+        # Las más viejas que salen de la ventana se descuentan de las
+        # estadísticas antes de que _reservar las pueda mover o pisar
+        salen = max(0, len(self) + cantidad - self.capacidad)
+        if salen and self._estadisticas.procesado > self.total - len(self):
+            self._estadisticas.salen(
+                {canal: arr[self.inicio:self.inicio + salen] for canal, arr in self.arreglos.items()},
+                self.total - len(self)
+            )
+
+        pos = self._reservar(cantidad)
+        for canal, arr in self.arreglos.items():
+            if canal not in CANALES_DERIVADOS:
+                arr[pos:pos + cantidad] = np.asarray(columnas[canal])[descartadas:]
+        for canal, (origen, funcion) in CANALES_DERIVADOS.items():
+            self.arreglos[canal][pos:pos + cantidad] = funcion(self.arreglos[origen][pos:pos + cantidad])
+
+        self.total += descartadas
+        self._avanzar(cantidad)
@@ -0,0 +1,249 @@
+import datetime
+import hashlib
+import logging
+import os
+import sqlite3
+
+# Configurar logging para este módulo
+logger = logging.getLogger(__name__)
+
+# Si cambia el esquema se sube la versión y las cachés viejas se descartan
+VERSION_ESQUEMA = 1
+
+# Cada cuántas confirmaciones se recortan los sensores y se revisa el tamaño
+CONFIRMACIONES_ENTRE_RECORTES = 100
+
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS meta (
+        clave TEXT PRIMARY KEY,
+        valor TEXT
+    );
+    CREATE TABLE IF NOT EXISTS filas (
+        identificador INTEGER PRIMARY KEY,
+        mac TEXT NOT NULL,
+        capa INTEGER, no_paquete INTEGER,
+        d1 REAL, d2 REAL, d3 REAL,
+        temperatura REAL, humedad REAL,
+        q1 REAL, q2 REAL, q3 REAL, q4 REAL,
+        fecha TEXT NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS ix_filas_mac_fecha ON filas (mac, fecha DESC, identificador DESC);
+    CREATE INDEX IF NOT EXISTS ix_filas_fecha ON filas (fecha, identificador);
+"""
+
+# Mismo orden de columnas que las filas de Data_sensor
+COLUMNAS = "mac, capa, no_paquete, d1, d2, d3, temperatura, humedad, q1, q2, q3, q4, identificador, fecha"
+
+# Errores al leer la caché: de SQLite o una fecha guardada que no se puede leer
+ERRORES_LECTURA = (sqlite3.Error, ValueError)
+
+
+class ErrorCache(Exception):
+    """La caché no se pudo leer; ya se borró y se desactivó (ver CacheLocal._fallo)."""
+
+
+class CursorCache:
+    """
+    Envuelve el cursor de SQLite para devolver filas iguales a las del
+    servidor. Un error al leer descarta la caché y sale como ErrorCache.
+    """
+
+    def __init__(self, cursor, cache):
+        self.cursor = cursor
+        self.cache = cache
+
+    def fetchmany(self, cantidad):
+        try:
+            return [
+                list(row[:13]) + [datetime.datetime.fromisoformat(row[13])]
+                for row in self.cursor.fetchmany(cantidad)
+            ]
+        except ERRORES_LECTURA as e:
+            self.cache._fallo(e)
+            raise ErrorCache(str(e)) from e
+
+
+class CacheLocal:
+    """
+    Caché local en SQLite del histórico reciente de cada sensor, para que
+    el arranque llene los buffers sin esperar al servidor y solo pida las
+    filas posteriores a la marca guardada.
+
+    Se usa solo desde el hilo del DatabaseWorker.
+    - Límites: 'max_filas_por_sensor' filas por MAC y 'max_mb' en disco.
+    - Corrupción: PRAGMA quick_check al abrir; si falla (o falla cualquier
+      operación) el archivo se borra y se vuelve a llenar desde el servidor.
+    - Invalidación: invalidar(), o automática si cambia la versión del
+      esquema o el origen (connection string).
+    """
+
+    def __init__(self, ruta, origen, max_filas_por_sensor, max_mb=500):
+        self.ruta = ruta
+        # Solo un hash: la connection string puede traer credenciales
+        self.origen = hashlib.sha1(origen.encode()).hexdigest()
+        self.max_filas_por_sensor = max_filas_por_sensor
+        self.max_bytes = max_mb * 1024 * 1024
+        self.conn = None
+        self.confirmaciones = 0
+
+    # --- Apertura / invalidación ---
+
+    def abrir(self):
+        """Abre (o crea) la caché. Devuelve False si no se pudo usar."""
+        try:
+            if not self._es_valida():
+                logger.warning("Caché local inválida o de otra versión/origen, se reconstruye.")
+                self.invalidar()
+                self._abrir()
+            self.conn.executescript(ESQUEMA)
+            self._escribir_meta('version', VERSION_ESQUEMA)
+            self._escribir_meta('origen', self.origen)
+            self.conn.commit()
+            return True
+        except sqlite3.Error as e:
+            logger.error(f"Caché local: no se pudo abrir ({e}), se desactiva.")
+            self.cerrar()
+            return False
+
+    def _abrir(self):
+        self.conn = sqlite3.connect(self.ruta)
+        # auto_vacuum solo aplica al crear el archivo; permite liberar espacio sin VACUUM completo
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+
+    def _es_valida(self):
+        try:
+            self._abrir()
+            if self.conn.execute("PRAGMA quick_check").fetchone()[0] != 'ok':
+                return False
+            tablas = {row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            if 'meta' not in tablas:
+                return not tablas # Archivo nuevo (vacío) = válido
+            return (self._leer_meta('version') == str(VERSION_ESQUEMA) and
+                    self._leer_meta('origen') == self.origen)
+        except sqlite3.DatabaseError as e:
+            logger.warning(f"Caché local dañada: {e}")
+            return False
+
+    def invalidar(self):
+        """Borra la caché del disco."""
+        self.cerrar()
+        for sufijo in ('', '-wal', '-shm'):
+            try:
+                os.remove(self.ruta + sufijo)
+            except FileNotFoundError:
+                pass
+        logger.info(f"Caché local borrada: {self.ruta}")
+
+    def cerrar(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except sqlite3.Error:
+                pass
+        self.conn = None
+
+    def _fallo(self, e):
+        """Cualquier error de SQLite: se descarta la caché para no usar datos malos."""
+        logger.error(f"Caché local: error ({e}), se borra y se desactiva.")
+        self.invalidar()
+
+    # --- Lectura ---
+
+    def marca(self):
+        """(Fecha, Identificador) de la última fila guardada, o None."""
+        try:
+            fecha = self._leer_meta('marca_fecha')
+            identificador = self._leer_meta('marca_id')
+            if fecha is None or identificador is None:
+                return None
+            return datetime.datetime.fromisoformat(fecha), int(identificador)
+        except ERRORES_LECTURA as e:
+            self._fallo(e)
+            return None
+
+    def cargar(self):
+        """
+        Cursor (con fetchmany) sobre todas las filas guardadas, en orden.
+        Si falla la consulta o la lectura sale ErrorCache (la caché ya se borró).
+        """
+        try:
+            cursor = self.conn.execute(f"SELECT {COLUMNAS} FROM filas ORDER BY fecha, identificador")
+        except sqlite3.Error as e:
+            self._fallo(e)
+            raise ErrorCache(str(e)) from e
+        return CursorCache(cursor, self)
+
+    # --- Escritura ---
+
+    def guardar(self, filas):
+        """Agrega filas del servidor (sin confirmar; ver confirmar)."""
+        if self.conn is None or not filas:
+            return
+        try:
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO filas ({COLUMNAS}) VALUES ({','.join('?' * 14)})",
+                [tuple(row[:13]) + (row[13].isoformat(sep=' '),) for row in filas]
+            )
+        except sqlite3.Error as e:
+            self._fallo(e)
+
+    def confirmar(self, marca_fecha, marca_id):
+        """Confirma lo guardado junto con la marca, en la misma transacción."""
+        if self.conn is None:
+            return
+        try:
+            self._escribir_meta('marca_fecha', marca_fecha.isoformat(sep=' '))
+            self._escribir_meta('marca_id', marca_id)
+            self.conn.commit()
+
+            self.confirmaciones += 1
+            if self.confirmaciones % CONFIRMACIONES_ENTRE_RECORTES == 1:
+                self.recortar()
+        except sqlite3.Error as e:
+            self._fallo(e)
+
+    def recortar(self):
+        """Aplica los límites: filas por sensor y tamaño del archivo."""
+        self.conn.execute("""
+            DELETE FROM filas WHERE identificador IN (
+                SELECT identificador FROM (
+                    SELECT identificador, ROW_NUMBER() OVER (
+                        PARTITION BY mac ORDER BY fecha DESC, identificador DESC
+                    ) AS fila
+                    FROM filas
+                ) WHERE fila > ?
+            )
+        """, (self.max_filas_por_sensor,))
+
+        # Si aún excede el tamaño, borrar la quinta parte más vieja
+        while self._tamano_bytes() > self.max_bytes:
+            total = self.conn.execute("SELECT COUNT(*) FROM filas").fetchone()[0]
+            if total == 0:
+                break
+            self.conn.execute("""
+                DELETE FROM filas WHERE identificador IN (
+                    SELECT identificador FROM filas ORDER BY fecha, identificador LIMIT ?
+                )
+            """, (max(1, total // 5),))
+            self.conn.commit()
+            self.conn.execute("PRAGMA incremental_vacuum")
+        self.conn.commit()
+
+    def _tamano_bytes(self):
+        paginas = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        libres = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        tamano = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        return (paginas - libres) * tamano
+
+    # --- Meta ---
+
+    def _leer_meta(self, clave):
+        row = self.conn.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+        return row[0] if row else None
+
+    def _escribir_meta(self, clave, valor):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (clave, valor) VALUES (?, ?)", (clave, str(valor))
+        )
@@ -1,135 +1,366 @@
 from PySide6.QtCore import QObject, Signal, Slot
 import logging
-import pyodbc
 import datetime
+import time
+from collections import deque
+
+from .CacheLocal import ErrorCache
+from .FuentesDatos import ErrorFuenteDatos
+from .Historico import filas_a_historico
+from .Metricas import metricas
 
 # Configurar logging para este módulo
 logger = logging.getLogger(__name__)
 
+# Filas tardías: ids por consulta al traerlas completas
+MAX_IDS_POR_CONSULTA = 500
+
 class DatabaseWorker(QObject):
     """
     Se ejecuta en un QThread separado.
     Maneja las interacciones con la base de datos
     para evitar que la GUI se congele.
+
+    Las filas salen de una FuenteDatos (SQL Server, SQLite o replay de una
+    captura); el worker lleva la marca, los lotes y la caché local.
     """
     
     # Señales (signals) que este worker emite:
     new_data_row = Signal(list)       # Emite una fila de datos nueva+
+    new_data_batch = Signal(list, float) # Emite un lote de filas (lista de listas) y cuándo se envió (monotonic)
     initial_load_finished = Signal(int) # Emite cuando la carga termina (con el # de sensores)
+    poll_finished = Signal(int, bool, float) # Filas del sondeo, si quedó al día, retraso (s)
+    historical_data_ready = Signal(str, object, object, object, object) # MAC, desde, hasta, bucket, datos
     status_update = Signal(str)       # Emite mensajes de estado/error
 
-    def __init__(self, connection_string):
+    def __init__(self, fuente, tamano_lote=500, tiempo_max_lote=0.1,
+                 ventana_inicial=None, tamano_pagina=5000, paginas_por_sondeo=10,
+                 margen_tardias_s=2.0, cache=None):
         super().__init__()
-        self.connection_string = connection_string
+        self.fuente = fuente
+        self.fuente.avisar = self.status_update.emit
         self.running = True
+
+        # Entrega por lotes: se emite un lote cuando junta 'tamano_lote' filas
+        # o cuando pasan 'tiempo_max_lote' segundos desde el último envío.
+        # Con tamano_lote=None se usa el modo anterior (una señal por fila).
+        self.tamano_lote = tamano_lote
+        self.tiempo_max_lote = tiempo_max_lote
+
+        # Carga inicial acotada: solo las últimas 'ventana_inicial' filas por
+        # sensor. Con None se carga la tabla completa (modo anterior).
+        self.ventana_inicial = ventana_inicial
         
-        # Rastrea la última fecha/hora consultada para obtener solo datos nuevos
+        # Marca de agua (keyset): última (Fecha, Identificador) entregada.
+        # Con el Identificador se desempatan filas con la misma Fecha.
         self.last_timestamp_queried = datetime.datetime.min 
+        self.last_id_queried = 0
+
+        # Sondeo en páginas de 'tamano_pagina' filas; como máximo
+        # 'paginas_por_sondeo' por tick para que cada tick dure algo predecible
+        # (lo que falte se trae en el siguiente)
+        self.tamano_pagina = tamano_pagina
+        self.paginas_por_sondeo = paginas_por_sondeo
+
+        # Filas que se confirman tarde (con Fecha anterior a la marca) se
+        # buscan dentro de este margen; los ids ya entregados se recuerdan
+        # para no volver a enviarlos. Solo los del margen: las cargas
+        # iniciales entregan decenas de miles de filas por sensor
+        self.margen_tardias_s = margen_tardias_s
+        self.margen_tardias = datetime.timedelta(seconds=margen_tardias_s or 0)
+        self.ids_recientes = set()
+        self.orden_ids_recientes = deque() # (Fecha, Identificador) en orden de entrega
+
+        # Caché local (CacheLocal) para arrancar sin esperar al servidor;
+        # se abre en el hilo del worker. None = sin caché.
+        self.cache = cache
+
+        # Resultado del último sondeo
+        self.filas_ultimo_sondeo = 0
+        self.retraso_sondeo_s = 0.0 # Ahora menos la Fecha más reciente recibida
+
+    @Slot()
+    def cerrar(self):
+        """Cierra la fuente de datos y la caché local al terminar el hilo."""
+        self.fuente.cerrar()
+        if self.cache is not None:
+            self.cache.cerrar()
 
     @Slot()
     def load_initial_data(self):
         """
-        Carga TODOS los datos
+        Carga los datos iniciales: las últimas 'ventana_inicial' filas de
+        cada sensor, o TODOS los datos si no hay ventana configurada.
+        Si hay caché local se entrega primero lo guardado y del servidor
+        solo se pide lo posterior a su marca.
         Se ejecuta una vez cuando el hilo arranca.
         """
         logger.info("Worker: Iniciando carga inicial de datos...")
         sensor_count = set() # Usamos un set para contar MACs únicas
         try:
-            # Usamos 'with' para asegurar que la conexión se cierre
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                
-                # Seleccionar todas las columnas necesarias, ordenadas por fecha
-                query = """
-                    SELECT
-                        [MAC_Sensor], [Capa], [No_paquete], 
-                        [Distancia_1], [Distancia_2], [Distancia_3], 
-                        [Temperatura], [Humedad], 
-                        [Q1], [Q2], [Q3], [Q4], 
-                        [Identificador], [Fecha]
-                    FROM [Sensores].[dbo].[Data_sensor]
-                    ORDER BY [Fecha] ASC
-                """
-                cursor.execute(query)
-                
-                for row in cursor:
-                    if not self.running:
-                        logger.info("Worker: Carga inicial detenida.")
-                        break
-                    
-                    # Convertimos la fila a lista y la emitimos
-                    row_data = list(row)
-                    self.new_data_row.emit(row_data)
-                    
-                    sensor_count.add(row[0]) # Añadir MAC al set
-                    
-                    # Guardar la última marca de tiempo (índice 13)
-                    self.last_timestamp_queried = row[13] 
-
-                if self.running:
-                    logger.info(f"Worker: Carga inicial completada. {len(sensor_count)} sensores únicos.")
-                    # Emitir la señal de finalización con el conteo
-                    self.initial_load_finished.emit(len(sensor_count))
-                    self.status_update.emit("Carga inicial completada. Listo.")
+            if self.cache is not None:
+                self._cargar_cache(sensor_count)
+
+            if self.ventana_inicial is None:
+                # Todas las filas posteriores a la marca, ordenadas por fecha
+                self._cargar_consulta(self.fuente.posteriores(self._marca()), sensor_count)
+            else:
+                self._cargar_ventana(sensor_count)
+            self._confirmar_cache()
+
+            if not self.running:
+                logger.info("Worker: Carga inicial detenida.")
+            else:
+                logger.info(f"Worker: Carga inicial completada. {len(sensor_count)} sensores únicos.")
+                # Emitir la señal de finalización con el conteo
+                self.initial_load_finished.emit(len(sensor_count))
+                self.status_update.emit("Carga inicial completada. Listo.")
                     
-        except pyodbc.Error as e:
-            logger.error(f"Worker: Error de PyODBC en carga inicial: {e}")
+        except ErrorFuenteDatos as e:
+            logger.error(f"Worker: Error de la fuente de datos en carga inicial: {e}")
             self.status_update.emit(f"Error de BD (Carga): {e}")
         except Exception as e:
             logger.error(f"Worker: Error inesperado en carga inicial: {e}")
             self.status_update.emit(f"Error (Carga): {e}")
 
+    def _cargar_ventana(self, sensor_count):
+        """
+        Pide al servidor solo las últimas N filas por MAC. Si el servidor no
+        soporta funciones de ventana, hace una consulta TOP (N) por sensor.
+        """
+        try:
+            cursor = self.fuente.ventana_inicial(self._marca(), self.ventana_inicial)
+        except ErrorFuenteDatos as e:
+            logger.warning(f"Worker: Consulta con ROW_NUMBER falló ({e}), usando TOP (N) por sensor.")
+            for mac in self.fuente.sensores():
+                if not self.running:
+                    break
+                cursor = self.fuente.ventana_sensor(mac, self._marca(), self.ventana_inicial)
+                self._cargar_consulta(cursor, sensor_count)
+            return
+
+        self._cargar_consulta(cursor, sensor_count)
+
+    def _cargar_cache(self, sensor_count):
+        """Entrega las filas de la caché local y toma su marca como punto de partida."""
+        if not self.cache.abrir():
+            self.cache = None
+            return
+        marca = self.cache.marca()
+        if marca is None:
+            logger.info("Worker: Caché local vacía, se carga todo del servidor.")
+            return
+
+        inicio = time.perf_counter()
+        try:
+            self._cargar_consulta(self.cache.cargar(), sensor_count, guardar=False)
+        except ErrorCache as e:
+            # La caché es opcional: se sigue con la carga completa del
+            # servidor. Las filas que alcanzaron a salir vuelven a llegar y
+            # las gráficas descartan las repetidas (Identificador ya pasado)
+            logger.warning(f"Worker: No se pudo leer la caché local ({e}), se carga todo del servidor.")
+            if not self.cache.abrir(): # Ya se borró: se vuelve a llenar desde cero
+                self.cache = None
+            self.last_timestamp_queried = datetime.datetime.min
+            self.last_id_queried = 0
+            self.ids_recientes.clear()
+            self.orden_ids_recientes.clear()
+            self.status_update.emit("Caché local dañada, se carga todo del servidor...")
+            return
+        # La marca guardada puede ser posterior a la última fila que quedó
+        # (p. ej. si se recortó), es la que vale para pedir el resto
+        if marca > (self.last_timestamp_queried, self.last_id_queried):
+            self.last_timestamp_queried, self.last_id_queried = marca
+        logger.info(
+            f"Worker: Caché local entregada en {(time.perf_counter() - inicio) * 1000:.0f} ms "
+            f"({len(sensor_count)} sensores, marca {marca[0]} / {marca[1]})."
+        )
+        self.status_update.emit("Datos de la caché local cargados, pidiendo los nuevos al servidor...")
+
+    def _confirmar_cache(self):
+        """Confirma en la caché local las filas guardadas junto con la marca actual."""
+        if self.cache is not None and self.last_timestamp_queried > datetime.datetime.min:
+            self.cache.confirmar(self.last_timestamp_queried, self.last_id_queried)
+
+    def _marca(self):
+        """Marca (Fecha, Identificador) del filtro por keyset."""
+        return (self.last_timestamp_queried, self.last_id_queried)
+
+    def _cargar_consulta(self, cursor, sensor_count, guardar=True):
+        """Emite las filas del cursor y actualiza el conteo y la marca de tiempo."""
+        for row in self._leer_filas(cursor, guardar):
+            sensor_count.add(row[0]) # Añadir MAC al set
+            self._avanzar_marca(row)
+
+    def _avanzar_marca(self, row):
+        """
+        Actualiza la marca (Fecha, Identificador) y recuerda el id entregado
+        si cae dentro del margen de tardías; los que ya quedaron fuera del
+        margen se olvidan aquí mismo.
+        """
+        fecha, identificador = row[13], row[12]
+        if (fecha, identificador) > (self.last_timestamp_queried, self.last_id_queried):
+            self.last_timestamp_queried = fecha
+            self.last_id_queried = identificador
+        if self.margen_tardias_s and fecha is not None:
+            desde = self.last_timestamp_queried - self.margen_tardias
+            if fecha >= desde:
+                self.ids_recientes.add(identificador)
+                self.orden_ids_recientes.append((fecha, identificador))
+            self._olvidar_ids(desde)
+
+    def _olvidar_ids(self, desde):
+        """Descarta los ids entregados con Fecha anterior a 'desde'."""
+        while self.orden_ids_recientes and self.orden_ids_recientes[0][0] < desde:
+            self.ids_recientes.discard(self.orden_ids_recientes.popleft()[1])
+
     @Slot()
     def check_for_updates(self):
         """
-        Busca NUEVOS datos (por el timestamp).
+        Busca NUEVOS datos a partir de la marca (Fecha, Identificador).
+        Trae páginas de TOP (N) hasta quedar al día o llegar al máximo
+        de páginas por sondeo.
         Llamado por el QTimer de la lógica principal.
         """
         if not self.running:
             return
             
+        nuevos_registros = 0
+        al_dia = True
         try:
-            with pyodbc.connect(self.connection_string) as conn:
-                cursor = conn.cursor()
-                
-                # filas recientes que la última que vimos
-                query = """
-                    SELECT
-                        [MAC_Sensor], [Capa], [No_paquete], 
-                        [Distancia_1], [Distancia_2], [Distancia_3], 
-                        [Temperatura], [Humedad], 
-                        [Q1], [Q2], [Q3], [Q4], 
-                        [Identificador], [Fecha]
-                    FROM [Sensores].[dbo].[Data_sensor]
-                    WHERE [Fecha] > ?
-                    ORDER BY [Fecha] ASC
-                """
-                
-                #ultima marca de tiempo como parámetro
-                cursor.execute(query, (self.last_timestamp_queried,))
-                
-                nuevos_registros = 0
-                for row in cursor:
-                    if not self.running:
-                        logger.info("Worker: Búsqueda de actualizaciones detenida.")
-                        break
-                        
-                    row_data = list(row)
-                    self.new_data_row.emit(row_data)
-                    self.last_timestamp_queried = row[13] # Actualizar marca de tiempo
-                    nuevos_registros += 1
-                
-                if nuevos_registros > 0:
-                     logger.info(f"Worker: {nuevos_registros} nuevos registros encontrados.")
-                     self.status_update.emit(f"{nuevos_registros} nuevos registros procesados.")
-
-        except pyodbc.Error as e:
-            logger.error(f"Worker: Error de PyODBC en actualización: {e}")
+            for _ in range(self.paginas_por_sondeo):
+                # filas posteriores a la última que vimos
+                cursor = self.fuente.posteriores(self._marca(), self.tamano_pagina)
+                filas_pagina = 0
+                for row in self._leer_filas(cursor):
+                    self._avanzar_marca(row) # Actualizar marca de tiempo
+                    filas_pagina += 1
+                nuevos_registros += filas_pagina
+
+                # Página incompleta: ya no hay más filas
+                al_dia = filas_pagina < self.tamano_pagina
+                if al_dia or not self.running:
+                    break
+
+            if al_dia and self.running:
+                nuevos_registros += self._revisar_tardias()
+            if nuevos_registros > 0:
+                self._confirmar_cache()
+
+            if not self.running:
+                logger.info("Worker: Búsqueda de actualizaciones detenida.")
+
+            if self.last_timestamp_queried > datetime.datetime.min:
+                self.retraso_sondeo_s = (datetime.datetime.now() - self.last_timestamp_queried).total_seconds()
+            self.filas_ultimo_sondeo = nuevos_registros
+            
+            if nuevos_registros > 0:
+                 logger.info(f"Worker: {nuevos_registros} nuevos registros encontrados "
+                             f"(retraso {self.retraso_sondeo_s:.1f} s{'' if al_dia else ', quedan pendientes'}).")
+                 self.status_update.emit(f"{nuevos_registros} nuevos registros procesados. "
+                                         f"Retraso: {self.retraso_sondeo_s:.1f} s")
+
+        except ErrorFuenteDatos as e:
+            logger.error(f"Worker: Error de la fuente de datos en actualización: {e}")
             self.status_update.emit(f"Error de BD (Actualización): {e}")
         except Exception as e:
             logger.error(f"Worker: Error inesperado en actualización: {e}")
             self.status_update.emit(f"Error (Actualización): {e}")
 
+        self.poll_finished.emit(nuevos_registros, al_dia, self.retraso_sondeo_s)
+
+    def _revisar_tardias(self):
+        """
+        Busca filas con Fecha dentro del margen de la marca que no se han
+        entregado (se confirmaron después de que el keyset las pasó).
+        Primero solo pide los ids (consulta angosta) y trae completas solo
+        las que faltan. Devuelve cuántas filas entregó.
+        Las gráficas descartan las que llegan con un Identificador anterior
+        al final de su buffer (Procesamiento.descartar_desordenadas).
+        """
+        if not self.margen_tardias_s or self.last_timestamp_queried == datetime.datetime.min:
+            return 0
+
+        desde = self.last_timestamp_queried - self.margen_tardias
+        self._olvidar_ids(desde)
+
+        ids = self.fuente.ids_entre(desde, self.last_timestamp_queried)
+        faltantes = [identificador for identificador in ids if identificador not in self.ids_recientes]
+        if not faltantes:
+            return 0
+
+        logger.info(f"Worker: {len(faltantes)} filas confirmadas tarde, recuperándolas.")
+        entregadas = 0
+        for i in range(0, len(faltantes), MAX_IDS_POR_CONSULTA):
+            ids = faltantes[i:i + MAX_IDS_POR_CONSULTA]
+            for row in self._leer_filas(self.fuente.filas_por_id(ids)):
+                self._avanzar_marca(row)
+                entregadas += 1
+        return entregadas
+
+    @Slot(str, object, object, object)
+    def consultar_historico(self, mac, desde, hasta, bucket):
+        """
+        Trae el histórico de un sensor agregado por buckets de 'bucket'
+        Identificadores (min/avg/max por canal), para el zoom hacia atrás.
+        """
+        try:
+            inicio = time.perf_counter()
+            datos = filas_a_historico(self.fuente.historico(mac, desde, hasta, bucket), bucket)
+            logger.info(
+                f"Worker: Histórico de {mac} [{desde}, {hasta}) bucket={bucket}: "
+                f"{len(datos['muestras'])} buckets en {(time.perf_counter() - inicio) * 1000:.0f} ms"
+            )
+            self.historical_data_ready.emit(mac, desde, hasta, bucket, datos)
+        except ErrorFuenteDatos as e:
+            logger.error(f"Worker: Error de la fuente de datos en histórico: {e}")
+            self.status_update.emit(f"Error de BD (Histórico): {e}")
+        except Exception as e:
+            logger.error(f"Worker: Error inesperado en histórico: {e}")
+            self.status_update.emit(f"Error (Histórico): {e}")
+
+    def _leer_filas(self, cursor, guardar=True):
+        """
+        Lee el resultado con fetchmany y lo emite hacia la GUI.
+        En modo lotes junta las filas y emite 'new_data_batch' por tamaño
+        o por tiempo; si no, emite 'new_data_row' fila por fila.
+        Con 'guardar' las filas también se agregan a la caché local.
+        Devuelve (yield) cada fila para que el llamador lleve sus cuentas.
+        """
+        por_fetch = max(1, (self.tamano_lote or 1) // 4)
+        pendientes = []
+        ultimo_envio = time.monotonic()
+
+        try:
+            while self.running:
+                inicio = metricas.reloj()
+                filas = cursor.fetchmany(por_fetch)
+                metricas.observar_desde('bd_fetch_ms', inicio)
+                if not filas:
+                    break
+                if guardar and self.cache is not None:
+                    self.cache.guardar(filas)
+
+                for row in filas:
+                    row_data = list(row)
+                    if self.tamano_lote:
+                        pendientes.append(row_data)
+                    else:
+                        self.new_data_row.emit(row_data)
+                    yield row
+
+                if pendientes and (len(pendientes) >= self.tamano_lote or
+                                   time.monotonic() - ultimo_envio >= self.tiempo_max_lote):
+                    self.new_data_batch.emit(pendientes, time.monotonic())
+                    pendientes = []
+                    ultimo_envio = time.monotonic()
+        finally:
+            # Lo que quede pendiente se envía aunque el lote no esté completo,
+            # también si fetchmany falló a la mitad: esas filas ya movieron
+            # la marca y no se vuelven a pedir
+            if pendientes:
+                self.new_data_batch.emit(pendientes, time.monotonic())
+
     def stop(self):
         """Permite detener el worker de forma segura desde el hilo principal."""
         self.running = False
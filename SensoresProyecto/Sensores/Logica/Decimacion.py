@@ -0,0 +1,92 @@
+import math
+import numpy as np
+
+# Con hasta PUNTOS_POR_PIXEL puntos por pixel se dibujan los datos tal cual
+PUNTOS_POR_PIXEL = 2
+# Con más de FACTOR_LTTB puntos por pixel se usa min/max por bucket
+# (vectorizado, conserva los picos). Entre los dos se usa LTTB, que
+# respeta mejor la forma pero es secuencial: solo conviene cuando la
+# reducción es moderada.
+FACTOR_LTTB = 4
+
+
+def decimar(x, y, ancho_px):
+    """
+    Reduce la serie (x, y) a unos pocos puntos por pixel del ancho dado.
+    Devuelve (x, y) listos para dibujar; si no hace falta reducir
+    devuelve las mismas vistas.
+    """
+    n = len(x)
+    ancho_px = max(1, int(ancho_px))
+    if n <= ancho_px * PUNTOS_POR_PIXEL:
+        return x, y
+    if n > ancho_px * FACTOR_LTTB:
+        return minmax_por_bucket(x, y, ancho_px)
+    return lttb(x, y, ancho_px * PUNTOS_POR_PIXEL)
+
+
+def minmax_por_bucket(x, y, buckets):
+    """
+    Divide la serie en 'buckets' grupos de muestras consecutivas y deja el
+    mínimo y el máximo de cada uno (en su orden original). Así un pico de
+    una sola muestra sigue apareciendo en la gráfica.
+    """
+    n = len(y)
+    por_bucket = math.ceil(n / buckets)
+    buckets = math.ceil(n / por_bucket)
+    relleno = buckets * por_bucket - n
+
+    # Rellenar con el último valor para poder acomodar en una matriz
+    valores = np.concatenate((y, np.repeat(y[-1:], relleno))) if relleno else y
+    bloques = valores.reshape(buckets, por_bucket)
+    i_min = bloques.argmin(axis=1)
+    i_max = bloques.argmax(axis=1)
+
+    base = np.arange(buckets) * por_bucket
+    indices = np.empty(buckets * 2, dtype=np.int64)
+    indices[0::2] = base + np.minimum(i_min, i_max)
+    indices[1::2] = base + np.maximum(i_min, i_max)
+    np.minimum(indices, n - 1, out=indices)
+    return x[indices], y[indices]
+
+
+def lttb(x, y, puntos):
+    """
+    Largest-Triangle-Three-Buckets: elige en cada bucket el punto que forma
+    el triángulo más grande con el punto elegido antes y el promedio del
+    bucket siguiente. Costo O(n); se usa solo para reducciones moderadas.
+    """
+    n = len(x)
+    if puntos >= n or puntos < 3:
+        return x, y
+
+    xs = x.tolist()
+    ys = y.tolist()
+    tam = (n - 2) / (puntos - 2) # Muestras por bucket (sin el primero y el último)
+
+    indices = [0]
+    a = 0
+    for i in range(puntos - 2):
+        inicio = int(i * tam) + 1
+        fin = int((i + 1) * tam) + 1
+
+        # Promedio del bucket siguiente (el último bucket usa el punto final)
+        if i == puntos - 3:
+            prom_x, prom_y = xs[n - 1], ys[n - 1]
+        else:
+            sig_fin = min(int((i + 2) * tam) + 1, n - 1)
+            cantidad = sig_fin - fin
+            prom_x = sum(xs[fin:sig_fin]) / cantidad
+            prom_y = sum(ys[fin:sig_fin]) / cantidad
+
+        ax, ay = xs[a], ys[a]
+        mejor, area_max = inicio, -1.0
+        for j in range(inicio, fin):
+            area = abs((ax - prom_x) * (ys[j] - ay) - (ax - xs[j]) * (prom_y - ay))
+            if area > area_max:
+                mejor, area_max = j, area
+        indices.append(mejor)
+        a = mejor
+
+    indices.append(n - 1)
+    return x[indices], y[indices]
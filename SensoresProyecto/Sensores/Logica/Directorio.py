@@ -0,0 +1,142 @@
+import bisect
+import time
+
+# Cada cuánto se vuelve a evaluar el filtro de antigüedad (los sensores
+# dejan de ser recientes con el tiempo aunque no llegue nada)
+REFRESCO_RECIENTES_S = 5.0
+
+
+class DirectorioSensores:
+    """
+    Índice de las MACs conocidas, ordenado, para paginar y buscar entre
+    miles de sensores sin reordenar ni recorrer listas en cada cambio.
+
+    - 'macs' se mantiene ordenada con inserción por bisect (O(log n) para
+      buscar la posición, en lugar de sort() en cada sensor nuevo)
+    - 'visibles' son las MACs que pasan el filtro actual (texto, capa y
+      antigüedad), también ordenadas; una página es un slice de esa lista.
+      'claves_visibles' es su paralela en mayúsculas, para el bisect
+    - la búsqueda por prefijo usa bisect sobre las MACs en mayúsculas; la
+      de subcadena y el filtro recorren la lista, pero solo al buscar o al
+      cambiar el filtro, no al cambiar de página
+    """
+
+    def __init__(self):
+        self.macs = []      # Ordenadas por 'claves'
+        self.claves = []    # mac.upper(), paralela a 'macs' (búsqueda sin mayúsculas)
+        self.capas = {}     # {mac: capa}
+        self.capas_vistas = set()
+        self.ultima_vez = {} # {mac: fecha epoch de la última muestra}
+
+        # Filtro actual
+        self.texto = ''
+        self.capa = None
+        self.max_antiguedad_s = None
+        self.visibles = []
+        self.claves_visibles = [] # mac.upper(), paralela a 'visibles'
+        self.filtrado_en = 0.0 # time.monotonic() de la última evaluación del filtro
+
+    def __len__(self):
+        return len(self.macs)
+
+    def __contains__(self, mac):
+        return mac in self.capas
+
+    # --- Altas y actividad ---
+
+    def agregar(self, mac, capa=None):
+        """Registra una MAC nueva en su posición."""
+        if mac in self.capas:
+            return
+        clave = mac.upper()
+        i = bisect.bisect_left(self.claves, clave)
+        self.claves.insert(i, clave)
+        self.macs.insert(i, mac)
+        self.capas[mac] = capa
+        if capa is not None:
+            self.capas_vistas.add(capa)
+        if self._pasa_filtro(mac, time.time()):
+            i = bisect.bisect_left(self.claves_visibles, clave)
+            self.claves_visibles.insert(i, clave)
+            self.visibles.insert(i, mac)
+
+    def visto(self, mac, fecha):
+        """Fecha (epoch) de la muestra más nueva del sensor."""
+        self.ultima_vez[mac] = fecha
+
+    def capas_conocidas(self):
+        return sorted(self.capas_vistas)
+
+    # --- Filtro ---
+
+    def filtrar(self, texto=None, capa=None, max_antiguedad_s=None):
+        """
+        Cambia el filtro y recalcula 'visibles'. 'texto' busca en la MAC
+        (sin distinguir mayúsculas); None en cualquiera deja pasar todo.
+        """
+        self.texto = (texto or '').strip().upper()
+        self.capa = capa
+        self.max_antiguedad_s = max_antiguedad_s
+        self._refiltrar()
+
+    def _refiltrar(self):
+        ahora = time.time()
+        pasan = [i for i, mac in enumerate(self.macs) if self._pasa_filtro(mac, ahora)]
+        self.visibles = [self.macs[i] for i in pasan]
+        self.claves_visibles = [self.claves[i] for i in pasan]
+        self.filtrado_en = time.monotonic()
+
+    def _pasa_filtro(self, mac, ahora):
+        if self.texto and self.texto not in mac.upper():
+            return False
+        if self.capa is not None and self.capas.get(mac) != self.capa:
+            return False
+        if self.max_antiguedad_s is not None:
+            # Sin fecha todavía = se acaba de registrar porque llegaron datos
+            fecha = self.ultima_vez.get(mac)
+            if fecha is not None and ahora - fecha > self.max_antiguedad_s:
+                return False
+        return True
+
+    # --- Búsqueda y páginas ---
+
+    def buscar(self, texto):
+        """
+        MACs que contienen 'texto' (sin distinguir mayúsculas): primero las
+        que empiezan con él (rango por bisect), luego las que lo tienen en
+        medio. Cada grupo en orden.
+        """
+        texto = texto.strip().upper()
+        inicio = bisect.bisect_left(self.claves, texto)
+        fin = bisect.bisect_left(self.claves, texto + '\uffff', lo=inicio)
+        en_medio = [mac for mac, clave in zip(self.macs, self.claves)
+                    if texto in clave and not clave.startswith(texto)]
+        return self.macs[inicio:fin] + en_medio
+
+    def total_paginas(self, por_pagina):
+        self._refrescar_recientes()
+        return max(1, -(-len(self.visibles) // por_pagina))
+
+    def pagina(self, numero, por_pagina):
+        """MACs de la página 'numero' (desde 0) del filtro actual."""
+        self._refrescar_recientes()
+        inicio = numero * por_pagina
+        return self.visibles[inicio:inicio + por_pagina]
+
+    def filtrados(self):
+        """Todas las MACs del filtro actual (la vista general las muestra juntas)."""
+        self._refrescar_recientes()
+        return self.visibles
+
+    def pagina_de(self, mac, por_pagina):
+        """Página (desde 0) donde queda 'mac' en el filtro actual, o None."""
+        self._refrescar_recientes()
+        i = bisect.bisect_left(self.claves_visibles, mac.upper())
+        if i < len(self.visibles) and self.visibles[i] == mac:
+            return i // por_pagina
+        return None
+
+    def _refrescar_recientes(self):
+        if (self.max_antiguedad_s is not None and
+                time.monotonic() - self.filtrado_en > REFRESCO_RECIENTES_S):
+            self._refiltrar()
@@ -0,0 +1,309 @@
+import math
+from collections import deque
+import numpy as np
+
+# Canales con estadísticas, en el orden de las columnas de la matriz.
+# Las claves de cuaterniones y orientación son las del histórico (clave_historico).
+CLAVES = ('muestras', 'D1', 'D2', 'D3', 'temperatura', 'humedad', 'Q1', 'Q2', 'Q3', 'Q4',
+          'roll', 'pitch', 'yaw')
+INDICE = {clave: i for i, clave in enumerate(CLAVES)}
+# Las distancias <= 0 son lecturas fallidas: no cuentan (como en limites_distancias)
+SOLO_POSITIVOS = np.array([clave in ('D1', 'D2', 'D3') for clave in CLAVES])
+
+ALFA_EWMA = 0.05 # Peso de cada muestra nueva en el promedio exponencial
+
+# Filas de resumen(): todas las consultas en una matriz (para copiarlas a otro proceso)
+CONSULTAS = ('minimo', 'maximo', 'media', 'desviacion', 'suavizado', 'ultimo')
+
+
+def columnas_a_matriz(columnas):
+    """Matriz (N, len(CLAVES)) con los canales de 'columnas' (dict de BufferSensor)."""
+    q = np.asarray(columnas['quaterniones'], dtype=np.float64).reshape(-1, 4)
+    angulos = np.asarray(columnas['orientacion'], dtype=np.float64).reshape(-1, 3)
+    return np.column_stack([
+        np.asarray(columnas[canal], dtype=np.float64)
+        for canal in ('muestras', 'D1', 'D2', 'D3', 'temperatura', 'humedad')
+    ] + [q, angulos])
+
+
+def _validos(matriz):
+    """Máscara de los valores que cuentan (finitos y, en distancias, > 0)."""
+    with np.errstate(invalid='ignore'):
+        return np.isfinite(matriz) & ~(SOLO_POSITIVOS & (matriz <= 0))
+
+
+class ColaMonotonica:
+    """
+    Cola monotónica para el mínimo de una ventana deslizante: guarda
+    (índice, clave) con claves estrictamente crecientes, así el frente es
+    el mínimo. Para el máximo se usa con la clave negada.
+
+    Se guarda en trozos de arreglos (uno por bloque agregado) en lugar de
+    una tupla por muestra: con una señal monótona la cola llega a tener
+    toda la ventana, y así ocupa 16 bytes por muestra y las operaciones en
+    Python son por trozo, no por muestra.
+    """
+
+    def __init__(self):
+        self.trozos = deque() # [(índices, claves)], cada uno creciente
+
+    def extender(self, indices, claves):
+        """Agrega la cadena de un bloque (claves crecientes, índices posteriores a todo lo guardado)."""
+        primero = claves[0]
+        if self.trozos and self.trozos[-1][1][-1] < primero: # Caso común: no se quita nada
+            self.trozos.append((indices, claves))
+            return
+        # Lo que ya estaba y no es menor que el mínimo del bloque ya no puede ser el mínimo
+        while self.trozos:
+            trozo_indices, trozo_claves = self.trozos[-1]
+            if trozo_claves[0] >= primero:
+                self.trozos.pop()
+                continue
+            corte = trozo_claves.searchsorted(primero)
+            if corte < len(trozo_claves):
+                self.trozos[-1] = (trozo_indices[:corte], trozo_claves[:corte])
+            break
+        self.trozos.append((indices, claves))
+
+    def expirar(self, primer_indice):
+        """Saca las entradas con índice menor a 'primer_indice'."""
+        while self.trozos and self.trozos[0][0][0] < primer_indice:
+            trozo_indices, trozo_claves = self.trozos[0]
+            if trozo_indices[-1] < primer_indice:
+                self.trozos.popleft()
+                continue
+            corte = trozo_indices.searchsorted(primer_indice)
+            self.trozos[0] = (trozo_indices[corte:], trozo_claves[corte:])
+            break
+
+    def frente(self):
+        return float(self.trozos[0][1][0]) if self.trozos else None
+
+
+class EstadisticasSensor:
+    """
+    Estadísticas de la ventana de UN sensor (las muestras que hay en su
+    BufferSensor), mantenidas de forma incremental sin recorrer la ventana:
+
+    - mínimo/máximo: colas monotónicas (ColaMonotonica) por canal; se
+      sacan por el frente las que salen de la ventana
+    - media/varianza: sumas deslizantes (desplazadas por una referencia
+      para no perder precisión); se suma lo que entra y se resta lo que sale
+    - EWMA: promedio exponencial por muestra (ALFA_EWMA)
+
+    Lo que entra se procesa en sincronizar(), que BufferSensor llama al
+    pedir sus estadísticas: así los sensores que no se dibujan no pagan
+    nada al recibir datos, y los visibles procesan de una vez todo lo que
+    llegó desde el cuadro anterior. Lo que sale se resta al momento (antes
+    de que el buffer lo pise), solo si ya se había procesado.
+
+    Las consultas son O(1). Las sumas se recalculan completas una vez cada
+    'capacidad' muestras que salen (costo amortizado O(1) por muestra) para
+    que el error de redondeo no se acumule.
+    """
+
+    def __init__(self, capacidad, alfa=ALFA_EWMA):
+        self.capacidad = capacidad
+        self.alfa = alfa
+        columnas = len(CLAVES)
+        # Una cola por canal para el mínimo y otra para el máximo (clave negada)
+        self.colas = [ColaMonotonica() for _ in range(2 * columnas)]
+        self.cuenta = np.zeros(columnas, dtype=np.int64)
+        self.referencia = np.full(columnas, math.nan)
+        self.suma = np.zeros(columnas)
+        self.suma_cuadrados = np.zeros(columnas)
+        self.ewma = np.full(columnas, math.nan)
+        self.ultimos = np.full(columnas, math.nan)
+        self.salidas = 0   # Muestras que salieron desde el último recálculo
+        self.procesado = 0 # Índice global hasta donde se procesaron las muestras
+
+    # --- Sincronización con el buffer ---
+
+    def sincronizar(self, buffer):
+        """Procesa las muestras agregadas al buffer desde la última vez."""
+        if self.procesado >= buffer.total:
+            return
+        # Las que ya salieron de la ventana sin procesarse se saltan: no
+        # cuentan para mínimo, máximo ni sumas (en la EWMA su peso ya sería ~0)
+        inicio_ventana = buffer.total - len(buffer)
+        desde = max(self.procesado, inicio_ventana)
+        self.agregar({canal: buffer[canal][desde - inicio_ventana:] for canal in buffer.keys()}, desde)
+        self.expirar(inicio_ventana)
+        self.procesado = buffer.total
+        if self.salidas >= self.capacidad:
+            self.recalcular(buffer)
+
+    def salen(self, columnas, primer_indice):
+        """
+        Muestras que salen de la ventana (desde 'primer_indice'); se restan
+        de las sumas solo las que ya se habían procesado.
+        """
+        procesadas = min(self.procesado - primer_indice, len(columnas['muestras']))
+        if procesadas > 0:
+            self.quitar({canal: valores[:procesadas] for canal, valores in columnas.items()})
+
+    # --- Actualización ---
+
+    def agregar(self, columnas, primer_indice):
+        """Agrega un bloque; 'primer_indice' es el índice global de su primera muestra."""
+        matriz = columnas_a_matriz(columnas)
+        validos = _validos(matriz)
+
+        # Mínimos y máximos juntos: las columnas de máximos llevan la clave
+        # negada. Dentro del bloque solo sobreviven los valores menores que
+        # todos los posteriores (la cadena de mínimos hacia el final).
+        clave = np.where(np.hstack((validos, validos)), np.hstack((matriz, -matriz)), math.inf)
+        posteriores = np.minimum.accumulate(clave[::-1], axis=0)[::-1]
+        cadena = np.empty(clave.shape, dtype=bool)
+        cadena[-1] = clave[-1] < math.inf
+        cadena[:-1] = clave[:-1] < posteriores[1:]
+        columnas_cadena, filas_cadena = np.nonzero(cadena.T)
+        claves_cadena = clave.T[columnas_cadena, filas_cadena]
+        indices_cadena = filas_cadena + primer_indice
+        cortes = np.searchsorted(columnas_cadena, np.arange(len(self.colas) + 1)).tolist()
+        for c, cola in enumerate(self.colas):
+            a, b = cortes[c], cortes[c + 1]
+            if a < b:
+                cola.extender(indices_cadena[a:b], claves_cadena[a:b])
+
+        hay_validos = validos.any(axis=0)
+        ultima_valida = len(matriz) - 1 - validos[::-1].argmax(axis=0)
+        self.ultimos = np.where(hay_validos, matriz[ultima_valida, np.arange(len(CLAVES))], self.ultimos)
+
+        # Referencia: el primer valor válido de cada canal
+        sin_referencia = np.isnan(self.referencia) & hay_validos
+        if sin_referencia.any():
+            primeros = matriz[validos.argmax(axis=0), np.arange(len(CLAVES))]
+            self.referencia[sin_referencia] = primeros[sin_referencia]
+        self._sumar(matriz, validos, 1)
+        self._actualizar_ewma(matriz, validos)
+
+    def quitar(self, columnas):
+        """Descuenta de las sumas las muestras que salen de la ventana."""
+        matriz = columnas_a_matriz(columnas)
+        self._sumar(matriz, _validos(matriz), -1)
+        self.salidas += len(matriz)
+
+    def expirar(self, primer_indice):
+        """Saca de las colas las muestras con índice global menor a 'primer_indice'."""
+        for cola in self.colas:
+            cola.expirar(primer_indice)
+
+    def recalcular(self, columnas):
+        """Sumas exactas desde la ventana completa (tomando la media como referencia)."""
+        matriz = columnas_a_matriz(columnas)
+        validos = _validos(matriz)
+        self.cuenta[:] = 0
+        self.suma[:] = 0
+        self.suma_cuadrados[:] = 0
+        with np.errstate(invalid='ignore', divide='ignore'):
+            medias = np.where(validos, matriz, 0).sum(axis=0) / validos.sum(axis=0)
+        self.referencia = np.where(np.isfinite(medias), medias, self.referencia)
+        self._sumar(matriz, validos, 1)
+        self.salidas = 0
+
+    def _sumar(self, matriz, validos, signo):
+        desplazados = np.where(validos, matriz - self.referencia, 0.0)
+        self.cuenta += signo * validos.sum(axis=0)
+        self.suma += signo * desplazados.sum(axis=0)
+        self.suma_cuadrados += signo * (desplazados * desplazados).sum(axis=0)
+
+    def _actualizar_ewma(self, matriz, validos):
+        """
+        EWMA de todo el bloque de una vez: cada valor pesa alfa*(1-alfa)^k,
+        con k las muestras válidas que vienen después de él en el bloque.
+        """
+        sin_valor = np.isnan(self.ewma) & validos.any(axis=0)
+        if sin_valor.any():
+            # Se arranca con el primer valor válido
+            primeros = matriz[validos.argmax(axis=0), np.arange(len(CLAVES))]
+            self.ewma[sin_valor] = primeros[sin_valor]
+
+        despues = validos[::-1].cumsum(axis=0)[::-1] - validos # Válidas posteriores
+        factor = 1 - self.alfa
+        pesos = np.where(validos, self.alfa * factor ** despues, 0.0)
+        nuevos = validos.sum(axis=0)
+        aporte = (pesos * np.where(validos, matriz, 0.0)).sum(axis=0)
+        self.ewma = np.where(nuevos > 0, self.ewma * factor ** nuevos + aporte, self.ewma)
+
+    def resumen(self):
+        """Matriz (len(CONSULTAS), len(CLAVES)) con todas las consultas (NaN = sin valor)."""
+        columnas = len(CLAVES)
+        matriz = np.full((len(CONSULTAS), columnas), math.nan)
+        for i in range(columnas):
+            minimo, maximo = self.colas[i].frente(), self.colas[columnas + i].frente()
+            if minimo is not None:
+                matriz[0, i] = minimo
+                matriz[1, i] = -maximo
+        with np.errstate(invalid='ignore', divide='ignore'):
+            matriz[2] = np.where(self.cuenta > 0, self.referencia + self.suma / self.cuenta, math.nan)
+            varianza = (self.suma_cuadrados - self.suma ** 2 / self.cuenta) / (self.cuenta - 1)
+            matriz[3] = np.where(self.cuenta >= 2, np.sqrt(np.maximum(varianza, 0.0)), math.nan)
+        matriz[4] = self.ewma
+        matriz[5] = self.ultimos
+        return matriz
+
+    # --- Consultas O(1) (None si no hay valores válidos) ---
+
+    def minimo(self, clave):
+        return self.colas[INDICE[clave]].frente()
+
+    def maximo(self, clave):
+        frente = self.colas[len(CLAVES) + INDICE[clave]].frente()
+        return None if frente is None else -frente
+
+    def media(self, clave):
+        i = INDICE[clave]
+        if self.cuenta[i] <= 0:
+            return None
+        return float(self.referencia[i] + self.suma[i] / self.cuenta[i])
+
+    def desviacion(self, clave):
+        i = INDICE[clave]
+        n = self.cuenta[i]
+        if n < 2:
+            return None
+        varianza = (self.suma_cuadrados[i] - self.suma[i] ** 2 / n) / (n - 1)
+        return math.sqrt(max(varianza, 0.0))
+
+    def suavizado(self, clave):
+        """Promedio exponencial (EWMA)."""
+        valor = self.ewma[INDICE[clave]]
+        return None if math.isnan(valor) else float(valor)
+
+    def ultimo(self, clave):
+        valor = self.ultimos[INDICE[clave]]
+        return None if math.isnan(valor) else float(valor)
+
+
+class ResumenEstadisticas:
+    """
+    Las mismas consultas que EstadisticasSensor, leídas de una matriz de
+    resumen() (por ejemplo la que publica el proceso de ingesta en la
+    memoria compartida).
+    """
+
+    def __init__(self, matriz=None):
+        self.matriz = np.full((len(CONSULTAS), len(CLAVES)), math.nan) if matriz is None else matriz
+
+    def _valor(self, consulta, clave):
+        valor = self.matriz[consulta, INDICE[clave]]
+        return None if math.isnan(valor) else float(valor)
+
+    def minimo(self, clave):
+        return self._valor(0, clave)
+
+    def maximo(self, clave):
+        return self._valor(1, clave)
+
+    def media(self, clave):
+        return self._valor(2, clave)
+
+    def desviacion(self, clave):
+        return self._valor(3, clave)
+
+    def suavizado(self, clave):
+        return self._valor(4, clave)
+
+    def ultimo(self, clave):
+        return self._valor(5, clave)
@@ -0,0 +1,352 @@
+import csv
+import datetime
+import gzip
+import logging
+import os
+import time
+import zipfile
+import numpy as np
+from PySide6.QtCore import QObject, Signal, Slot
+
+from .FuentesDatos import ErrorFuenteDatos
+from .Procesamiento import filas_a_columnas, corregir_ceros, COL_MAC, COL_CAPA, COL_IDENTIFICADOR, COL_FECHA
+
+# Configurar logging para este módulo
+logger = logging.getLogger(__name__)
+
+FILAS_POR_PAGINA = 5000        # Filas por consulta (TOP N) al exportar del servidor
+FILAS_POR_FRAGMENTO = 100000   # Filas por fragmento del .npz (lo que se junta en memoria)
+FILAS_POR_ESCRITURA = 2000     # Filas por writerows: entre uno y otro se suelta el GIL (la GUI sigue)
+NIVEL_GZIP = 3                 # Con 6 el archivo queda ~8% más chico pero tarda el doble
+INTERVALO_PROGRESO_S = 0.25    # Cada cuánto se avisa el avance a la barra de estado
+
+# De dónde salen los datos: lo que hay en los buffers o todo el rango del servidor
+ORIGENES = ('memoria', 'servidor')
+
+# Columnas de los archivos exportados, en el orden de Data_sensor:
+# nombre -> (canal de las columnas, columna o None)
+COLUMNAS = {
+    'mac': ('mac', None),
+    'capa': ('capa', None),
+    'no_paquete': ('paquete', None),
+    'distancia_1': ('D1', None),
+    'distancia_2': ('D2', None),
+    'distancia_3': ('D3', None),
+    'temperatura': ('temperatura', None),
+    'humedad': ('humedad', None),
+    'q1': ('quaterniones', 0),
+    'q2': ('quaterniones', 1),
+    'q3': ('quaterniones', 2),
+    'q4': ('quaterniones', 3),
+    'identificador': ('muestras', None),
+    'fecha': ('fecha', None), # Segundos epoch
+}
+# El CSV lleva solo las 12 primeras, las de la captura que lee Insert_prueba.py
+COLUMNAS_CSV = tuple(COLUMNAS)[:12]
+
+# Las distancias salen como las muestran las gráficas, venga de memoria o
+# del servidor. Va en la primera línea del CSV (sin comas: la captura la
+# ignora) y en la entrada 'descripcion' del .npz. Corregir es idempotente,
+# así que reproducir el archivo da las mismas gráficas.
+DESCRIPCION = "# SensoresDB: distancias corregidas (los ceros llevan el ultimo valor valido del sensor)"
+
+
+def _columna(columnas, nombre):
+    canal, indice = COLUMNAS[nombre]
+    valores = columnas[canal]
+    return valores if indice is None else valores[:, indice]
+
+
+def columnas_de_filas(filas, ultimos):
+    """
+    Filas de Data_sensor (de varios sensores) a columnas para exportar:
+    las de filas_a_columnas más 'mac' y 'capa', con las distancias
+    corregidas por sensor como en los buffers (corregir_ceros), siguiendo
+    desde 'ultimos' ({mac: {canal: último válido}}, se actualiza aquí).
+    """
+    columnas = filas_a_columnas(filas)
+    if len(columnas['muestras']) != len(filas):
+        # filas_a_columnas descartó filas dañadas: quedarse con las mismas
+        filas = [row for row in filas if len(filas_a_columnas([row])['muestras'])]
+    columnas['mac'] = np.array([row[COL_MAC] for row in filas], dtype=str)
+    columnas['capa'] = np.array([row[COL_CAPA] or 0 for row in filas], dtype=np.int64)
+
+    for mac in np.unique(columnas['mac']):
+        seleccion = columnas['mac'] == mac
+        ultimos_sensor = ultimos.setdefault(mac, {'D1': None, 'D2': None, 'D3': None})
+        for canal in ('D1', 'D2', 'D3'):
+            columnas[canal][seleccion], ultimos_sensor[canal] = corregir_ceros(
+                columnas[canal][seleccion], ultimos_sensor[canal])
+    return columnas
+
+
+class EscritorCSV:
+    """
+    Filas de 12 columnas como la captura, con DESCRIPCION en la primera
+    línea en lugar de encabezado. Con .gz se comprime.
+    """
+
+    def __init__(self, ruta, comprimir=False):
+        if comprimir:
+            self.archivo = gzip.open(ruta, 'wt', compresslevel=NIVEL_GZIP, encoding='utf-8', newline='')
+        else:
+            self.archivo = open(ruta, 'w', encoding='utf-8', newline='')
+        self.archivo.write(DESCRIPCION + '\n')
+        self.escritor = csv.writer(self.archivo, lineterminator='\n')
+
+    def escribir(self, columnas):
+        # writerows no suelta el GIL mientras da formato: por partes, para
+        # que el hilo de la GUI no se quede esperando
+        valores = [_columna(columnas, nombre) for nombre in COLUMNAS_CSV]
+        for inicio in range(0, len(valores[0]), FILAS_POR_ESCRITURA):
+            self.escritor.writerows(zip(*(v[inicio:inicio + FILAS_POR_ESCRITURA].tolist() for v in valores)))
+
+    def cerrar(self):
+        self.archivo.close()
+
+
+class EscritorNPZ:
+    """
+    Archivo .npz (un zip de .npy) escrito por fragmentos: cada
+    FILAS_POR_FRAGMENTO filas se agrega una entrada por columna
+    ('distancia_1.00003'), así nunca se tiene toda la exportación en
+    memoria. cargar_npz() une los fragmentos. La entrada 'descripcion'
+    lleva DESCRIPCION.
+    """
+
+    def __init__(self, ruta):
+        self.zip = zipfile.ZipFile(ruta, 'w', compression=zipfile.ZIP_DEFLATED,
+                                   compresslevel=NIVEL_GZIP, allowZip64=True)
+        with self.zip.open('descripcion.npy', 'w') as entrada:
+            np.lib.format.write_array(entrada, np.array(DESCRIPCION), allow_pickle=False)
+        self.pendientes = []
+        self.filas_pendientes = 0
+        self.fragmentos = 0
+
+    def escribir(self, columnas):
+        self.pendientes.append(columnas)
+        self.filas_pendientes += len(columnas['muestras'])
+        if self.filas_pendientes >= FILAS_POR_FRAGMENTO:
+            self._vaciar()
+
+    def _vaciar(self):
+        if not self.pendientes:
+            return
+        for nombre in COLUMNAS:
+            arreglo = np.concatenate([_columna(columnas, nombre) for columnas in self.pendientes])
+            with self.zip.open(f'{nombre}.{self.fragmentos:05d}.npy', 'w', force_zip64=True) as entrada:
+                np.lib.format.write_array(entrada, arreglo, allow_pickle=False)
+        self.fragmentos += 1
+        self.pendientes = []
+        self.filas_pendientes = 0
+
+    def cerrar(self):
+        self._vaciar()
+        self.zip.close()
+
+
+def crear_escritor(ruta, archivo=None):
+    """
+    Escritor según la extensión de 'ruta' (.csv, .csv.gz o .npz), que
+    escribe en 'archivo' (por defecto la misma ruta).
+    """
+    nombre = ruta.lower()
+    archivo = archivo or ruta
+    if nombre.endswith('.npz'):
+        return EscritorNPZ(archivo)
+    if nombre.endswith('.csv') or nombre.endswith('.csv.gz'):
+        return EscritorCSV(archivo, comprimir=nombre.endswith('.gz'))
+    raise ValueError(f"Formato de exportación desconocido: {ruta} (se usa .csv, .csv.gz o .npz)")
+
+
+def cargar_npz(ruta):
+    """Lee un .npz exportado: {columna: arreglo} con los fragmentos unidos en orden."""
+    with np.load(ruta) as npz:
+        entradas = sorted(npz.files)
+        return {
+            nombre: np.concatenate([npz[e] for e in entradas if e.rsplit('.', 1)[0] == nombre] or [np.array([])])
+            for nombre in COLUMNAS
+        }
+
+
+class ExportadorDatos(QObject):
+    """
+    Escribe una exportación en su propio QThread, sin pasar por el hilo de
+    la GUI más que para copiar los buffers.
+
+    - origen 'memoria': pide a la lógica la copia de un sensor a la vez
+      (pedir_sensor -> agregar_sensor), porque los buffers solo se tocan en
+      el hilo principal; en memoria queda a lo más un sensor
+    - origen 'servidor': lee el rango en páginas de FILAS_POR_PAGINA por
+      keyset con su propia conexión (fuente.duplicar()), así no ocupa la del
+      DatabaseWorker ni carga al servidor con una sola consulta enorme
+
+    Los dos orígenes escriben las distancias corregidas (DESCRIPCION): las
+    de memoria ya lo están y las del servidor se corrigen al leerlas. Al
+    inicio del rango la corrección del servidor no conoce el valor válido
+    anterior a 'desde' (los ceros del principio quedan en 0).
+
+    Se escribe en 'ruta.parcial' y se renombra al terminar; si se cancela o
+    falla se borra.
+    """
+
+    # Pide la copia de un sensor a la lógica: MAC, desde, hasta (epoch o None)
+    pedir_sensor = Signal(str, object, object)
+    progreso = Signal(int, float)   # Filas escritas, fracción terminada (0 a 1)
+    terminado = Signal(str, int)    # Ruta, filas escritas
+    fallo = Signal(str)             # Mensaje (también al cancelar)
+
+    def __init__(self, ruta, origen, macs, desde=None, hasta=None, capas=None, fuente=None):
+        """
+        'macs' son los sensores a exportar; con origen 'servidor' None es
+        toda la tabla. 'desde'/'hasta' en segundos epoch (None = sin límite).
+        'capas' ({mac: capa}) completa las filas de memoria.
+        """
+        super().__init__()
+        if origen not in ORIGENES:
+            raise ValueError(f"Origen de exportación desconocido: {origen}")
+        if origen == 'servidor' and fuente is None:
+            raise ValueError("Exportar del servidor necesita una fuente propia (fuente.duplicar())")
+        self.ruta = ruta
+        self.origen = origen
+        self.macs = macs
+        self.desde = desde
+        self.hasta = hasta
+        self.capas = capas or {}
+        self.fuente = fuente
+        self.escritor = None
+        self.cancelado = False
+
+        self.filas = 0
+        self.siguiente = 0 # Índice del próximo sensor a pedir (memoria)
+        self.ultimo_aviso = 0.0
+
+    @property
+    def ruta_parcial(self):
+        return self.ruta + '.parcial'
+
+    @Slot()
+    def iniciar(self):
+        """Se ejecuta cuando arranca el hilo."""
+        logger.info(f"Exportación: {self.origen} -> {self.ruta}")
+        try:
+            self.escritor = crear_escritor(self.ruta, self.ruta_parcial)
+        except (OSError, ValueError) as e:
+            self._fallar(f"No se pudo crear el archivo: {e}")
+            return
+
+        if self.origen == 'memoria':
+            self._pedir_siguiente()
+        else:
+            self._exportar_servidor()
+
+    def cancelar(self):
+        """Llamado desde la GUI: se detiene en el próximo sensor o página."""
+        self.cancelado = True
+
+    # --- Desde los buffers en memoria ---
+
+    def _pedir_siguiente(self):
+        if self.cancelado:
+            self._fallar("Exportación cancelada.")
+        elif self.siguiente >= len(self.macs):
+            self._terminar()
+        else:
+            self.pedir_sensor.emit(self.macs[self.siguiente], self.desde, self.hasta)
+
+    @Slot(str, object)
+    def agregar_sensor(self, mac, columnas):
+        """Copia de un sensor que mandó la lógica (None si ya no está)."""
+        self.siguiente += 1
+        if columnas is not None and len(columnas['muestras']) and not self.cancelado:
+            cantidad = len(columnas['muestras'])
+            columnas['mac'] = np.full(cantidad, mac)
+            columnas['capa'] = np.full(cantidad, self.capas.get(mac) or 0, dtype=np.int64)
+            if not self._escribir(columnas):
+                return
+        self._avisar(self.siguiente / max(1, len(self.macs)))
+        self._pedir_siguiente()
+
+    # --- Desde el servidor ---
+
+    def _exportar_servidor(self):
+        desde = (datetime.datetime.fromtimestamp(self.desde) if self.desde is not None
+                 else datetime.datetime.min)
+        # Sin límite = hasta el momento de empezar (lo que llegue después no entra)
+        hasta = (datetime.datetime.fromtimestamp(self.hasta) if self.hasta is not None
+                 else datetime.datetime.now())
+        macs = [None] if self.macs is None else self.macs
+        ultimos = {} # Último valor válido de cada sensor, entre páginas
+        try:
+            for i, mac in enumerate(macs):
+                marca = (desde, 0)
+                inicio_rango = None # Fecha de la primera fila, para el avance
+                while not self.cancelado:
+                    filas = self.fuente.rango(marca, hasta, FILAS_POR_PAGINA, mac).fetchmany(FILAS_POR_PAGINA)
+                    if not filas:
+                        break
+                    if not self._escribir(columnas_de_filas(filas, ultimos)):
+                        return
+                    marca = (filas[-1][COL_FECHA], filas[-1][COL_IDENTIFICADOR])
+                    if inicio_rango is None:
+                        inicio_rango = filas[0][COL_FECHA]
+                    parte = (marca[0] - inicio_rango) / ((hasta - inicio_rango) or datetime.timedelta(seconds=1))
+                    self._avisar((i + min(1.0, parte)) / len(macs))
+                    if len(filas) < FILAS_POR_PAGINA:
+                        break
+                if self.cancelado:
+                    self._fallar("Exportación cancelada.")
+                    return
+        except ErrorFuenteDatos as e:
+            self._fallar(f"Error de BD al exportar: {e}")
+            return
+        finally:
+            self.fuente.cerrar()
+        self._terminar()
+
+    # --- Escritura ---
+
+    def _escribir(self, columnas):
+        try:
+            self.escritor.escribir(columnas)
+        except (OSError, ValueError) as e:
+            self._fallar(f"Error al escribir {self.ruta}: {e}")
+            return False
+        self.filas += len(columnas['muestras'])
+        return True
+
+    def _avisar(self, fraccion):
+        ahora = time.monotonic()
+        if ahora - self.ultimo_aviso >= INTERVALO_PROGRESO_S:
+            self.ultimo_aviso = ahora
+            self.progreso.emit(self.filas, fraccion)
+
+    def _terminar(self):
+        try:
+            self.escritor.cerrar()
+            self.escritor = None
+            os.replace(self.ruta_parcial, self.ruta)
+        except OSError as e:
+            self._fallar(f"Error al cerrar {self.ruta}: {e}")
+            return
+        logger.info(f"Exportación terminada: {self.filas} filas en {self.ruta}")
+        self.progreso.emit(self.filas, 1.0)
+        self.terminado.emit(self.ruta, self.filas)
+
+    def _fallar(self, mensaje):
+        logger.warning(f"Exportación: {mensaje}")
+        self.descartar()
+        self.fallo.emit(mensaje)
+
+    def descartar(self):
+        """Cierra y borra el archivo a medias (también al salir con el hilo ya detenido)."""
+        if self.escritor is not None:
+            try:
+                self.escritor.cerrar()
+            except (OSError, ValueError):
+                pass
+            self.escritor = None
+        try:
+            os.remove(self.ruta_parcial)
+        except OSError:
+            pass
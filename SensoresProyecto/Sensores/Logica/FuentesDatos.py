@@ -0,0 +1,768 @@
+from abc import ABC, abstractmethod
+import bisect
+import csv
+import datetime
+import gzip
+import logging
+import os
+import re
+import sqlite3
+import time
+
+import numpy as np
+
+try:
+    import pyodbc
+except ImportError: # Solo hace falta para la fuente ODBC (SQL Server)
+    pyodbc = None
+
+from .Metricas import metricas
+
+# Configurar logging para este módulo
+logger = logging.getLogger(__name__)
+
+# Connection string de SQL Server, la usan las gráficas e Insert_prueba.py.
+# Se puede cambiar sin tocar el código con la variable de entorno
+# SENSORES_CONNECTION_STRING
+CONNECTION_STRING = os.environ.get('SENSORES_CONNECTION_STRING', (
+    r"Driver={SQL Server Native Client 11.0};"
+    r"Server=DESKTOP-J4U2VS9\sqlexpress;"
+    r"Database=Sensores;"
+    r"Trusted_Connection=yes;"
+))
+
+# Si la conexión lleva más de este tiempo sin usarse se verifica antes de usarla
+INTERVALO_VERIFICACION_S = 30
+
+# Replay: filas/s si la captura no trae marcas de tiempo del ESP, y tope de
+# filas que se conservan en memoria (las más viejas se borran)
+TASA_REPLAY_DEFECTO = 20.0
+MAX_FILAS_REPLAY = 1_000_000
+
+# Líneas de log del ESP en la captura: "I (531195) Mesh: ..." (ms desde el arranque)
+MARCA_LOG_ESP = re.compile(r'^I \((\d+)\)')
+
+# --- Consultas de SQL Server ---
+
+TABLA_SQL_SERVER = "[Sensores].[dbo].[Data_sensor]"
+
+# Consulta de sondeo por keyset (Fecha, Identificador), en páginas de TOP (N).
+# Se ejecuta siempre con el mismo texto y el mismo cursor para que el
+# driver la prepare una sola vez y la reutilice.
+# Parámetros: N, fecha, fecha, identificador
+CONSULTA_ACTUALIZACIONES = """
+    SELECT TOP (?)
+        [MAC_Sensor], [Capa], [No_paquete],
+        [Distancia_1], [Distancia_2], [Distancia_3],
+        [Temperatura], [Humedad],
+        [Q1], [Q2], [Q3], [Q4],
+        [Identificador], [Fecha]
+    FROM [Sensores].[dbo].[Data_sensor]
+    WHERE [Fecha] >= ?
+      AND ([Fecha] > ? OR [Identificador] > ?)
+    ORDER BY [Fecha] ASC, [Identificador] ASC
+"""
+
+# Tabla completa a partir de la marca (carga inicial sin ventana)
+# Parámetros: fecha, fecha, identificador
+CONSULTA_TODAS = """
+    SELECT
+        [MAC_Sensor], [Capa], [No_paquete],
+        [Distancia_1], [Distancia_2], [Distancia_3],
+        [Temperatura], [Humedad],
+        [Q1], [Q2], [Q3], [Q4],
+        [Identificador], [Fecha]
+    FROM [Sensores].[dbo].[Data_sensor]
+    WHERE [Fecha] >= ?
+      AND ([Fecha] > ? OR [Identificador] > ?)
+    ORDER BY [Fecha] ASC, [Identificador] ASC
+"""
+
+# Filas que se confirmaron tarde: ids dentro del margen de tiempo de la marca
+CONSULTA_IDS_RECIENTES = """
+    SELECT [Identificador]
+    FROM [Sensores].[dbo].[Data_sensor]
+    WHERE [Fecha] >= ? AND [Fecha] <= ?
+"""
+CONSULTA_FILAS_POR_ID = """
+    SELECT
+        [MAC_Sensor], [Capa], [No_paquete],
+        [Distancia_1], [Distancia_2], [Distancia_3],
+        [Temperatura], [Humedad],
+        [Q1], [Q2], [Q3], [Q4],
+        [Identificador], [Fecha]
+    FROM [Sensores].[dbo].[Data_sensor]
+    WHERE [Identificador] IN ({})
+    ORDER BY [Fecha] ASC, [Identificador] ASC
+"""
+
+# Histórico agregado por buckets de Identificador (el eje X de las gráficas).
+# Las distancias <= 0 se ignoran (quedan NULL) como en la corrección de ceros.
+# Parámetros: bucket, MAC, desde, hasta
+_AGREGADOS = ",\n        ".join(
+    f"MIN({col}), AVG({col}), MAX({col})" for col in (
+        "[D1]", "[D2]", "[D3]", "[Temperatura]", "[Humedad]", "[Q1]", "[Q2]", "[Q3]", "[Q4]"
+    )
+)
+CONSULTA_HISTORICO = f"""
+    SELECT [Bucket],
+        {_AGREGADOS}
+    FROM (
+        SELECT
+            [Identificador] / ? AS [Bucket],
+            CASE WHEN [Distancia_1] > 0 THEN [Distancia_1] END AS [D1],
+            CASE WHEN [Distancia_2] > 0 THEN [Distancia_2] END AS [D2],
+            CASE WHEN [Distancia_3] > 0 THEN [Distancia_3] END AS [D3],
+            [Temperatura], [Humedad], [Q1], [Q2], [Q3], [Q4]
+        FROM [Sensores].[dbo].[Data_sensor]
+        WHERE [MAC_Sensor] = ? AND [Identificador] >= ? AND [Identificador] < ?
+    ) AS [Filas]
+    GROUP BY [Bucket]
+    ORDER BY [Bucket]
+"""
+
+# Carga inicial acotada: solo las últimas N filas de cada sensor posteriores
+# a la marca (la de la caché local, o la mínima si no hay caché)
+# Parámetros: fecha, fecha, identificador, N
+CONSULTA_VENTANA_INICIAL = """
+    SELECT
+        [MAC_Sensor], [Capa], [No_paquete],
+        [Distancia_1], [Distancia_2], [Distancia_3],
+        [Temperatura], [Humedad],
+        [Q1], [Q2], [Q3], [Q4],
+        [Identificador], [Fecha]
+    FROM (
+        SELECT *,
+            ROW_NUMBER() OVER (
+                PARTITION BY [MAC_Sensor]
+                ORDER BY [Fecha] DESC, [Identificador] DESC
+            ) AS [Fila]
+        FROM [Sensores].[dbo].[Data_sensor]
+        WHERE [Fecha] >= ?
+          AND ([Fecha] > ? OR [Identificador] > ?)
+    ) AS [Ventana]
+    WHERE [Fila] <= ?
+    ORDER BY [Fecha] ASC, [Identificador] ASC
+"""
+
+# Alternativa sin funciones de ventana: una consulta TOP (N) por sensor
+# Parámetros: N, MAC, fecha, fecha, identificador
+CONSULTA_SENSORES = "SELECT DISTINCT [MAC_Sensor] FROM [Sensores].[dbo].[Data_sensor]"
+CONSULTA_VENTANA_SENSOR = """
+    SELECT * FROM (
+        SELECT TOP (?)
+            [MAC_Sensor], [Capa], [No_paquete],
+            [Distancia_1], [Distancia_2], [Distancia_3],
+            [Temperatura], [Humedad],
+            [Q1], [Q2], [Q3], [Q4],
+            [Identificador], [Fecha]
+        FROM [Sensores].[dbo].[Data_sensor]
+        WHERE [MAC_Sensor] = ?
+          AND [Fecha] >= ?
+          AND ([Fecha] > ? OR [Identificador] > ?)
+        ORDER BY [Fecha] DESC, [Identificador] DESC
+    ) AS [Ultimas]
+    ORDER BY [Fecha] ASC, [Identificador] ASC
+"""
+
+# Exportación de un rango de fechas en páginas de TOP (N) por keyset, de
+# todos los sensores (índice por Fecha, Identificador) o de uno (por MAC).
+# Parámetros: N, fecha, fecha, identificador, hasta[, MAC]
+CONSULTA_RANGO = """
+    SELECT TOP (?)
+        [MAC_Sensor], [Capa], [No_paquete],
+        [Distancia_1], [Distancia_2], [Distancia_3],
+        [Temperatura], [Humedad],
+        [Q1], [Q2], [Q3], [Q4],
+        [Identificador], [Fecha]
+    FROM [Sensores].[dbo].[Data_sensor]
+    WHERE [Fecha] >= ?
+      AND ([Fecha] > ? OR [Identificador] > ?)
+      AND [Fecha] < ?
+    ORDER BY [Fecha] ASC, [Identificador] ASC
+"""
+CONSULTA_RANGO_SENSOR = CONSULTA_RANGO.replace(
+    "AND [Fecha] < ?", "AND [Fecha] < ?\n      AND [MAC_Sensor] = ?"
+)
+
+# --- SQLite: misma tabla Data_sensor ---
+
+# Mismas columnas, orden e índices que Data_sensor.sql. La Fecha se guarda
+# como texto 'AAAA-MM-DD HH:MM:SS.mmm' (así se compara en orden)
+ESQUEMA_SQLITE = """
+    CREATE TABLE IF NOT EXISTS [Data_sensor] (
+        [MAC_Sensor] TEXT NOT NULL,
+        [Capa] INTEGER NOT NULL,
+        [No_paquete] INTEGER NOT NULL,
+        [Distancia_1] REAL NOT NULL,
+        [Distancia_2] REAL NOT NULL,
+        [Distancia_3] REAL NOT NULL,
+        [Temperatura] REAL NOT NULL,
+        [Humedad] REAL NOT NULL,
+        [Q1] REAL NOT NULL,
+        [Q2] REAL NOT NULL,
+        [Q3] REAL NOT NULL,
+        [Q4] REAL NOT NULL,
+        [Identificador] INTEGER PRIMARY KEY AUTOINCREMENT,
+        [Fecha] TEXT NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+    );
+    CREATE INDEX IF NOT EXISTS [IX_Data_sensor_MAC_Fecha]
+        ON [Data_sensor] ([MAC_Sensor], [Fecha] DESC, [Identificador] DESC);
+    CREATE INDEX IF NOT EXISTS [IX_Data_sensor_Fecha_Identificador]
+        ON [Data_sensor] ([Fecha], [Identificador]);
+    CREATE INDEX IF NOT EXISTS [IX_Data_sensor_MAC_Identificador]
+        ON [Data_sensor] ([MAC_Sensor], [Identificador]);
+"""
+
+# Inserción de una fila (sin Identificador ni Fecha, como el procedimiento)
+SQLITE_INSERT = """
+    INSERT INTO [Data_sensor] (
+        [MAC_Sensor], [Capa], [No_paquete], [Distancia_1], [Distancia_2], [Distancia_3],
+        [Temperatura], [Humedad], [Q1], [Q2], [Q3], [Q4]
+    )
+    VALUES (?,?,?,?,?,?,?,?,?,?,?,?)
+"""
+
+
+def _a_sqlite(consulta):
+    """SQLite acepta los corchetes; solo cambia el nombre de la tabla."""
+    return consulta.replace(TABLA_SQL_SERVER, "[Data_sensor]")
+
+
+# SQLite no tiene TOP: LIMIT al final (el parámetro N va al último)
+SQLITE_ACTUALIZACIONES = _a_sqlite(CONSULTA_TODAS).rstrip() + "\n    LIMIT ?\n"
+SQLITE_RANGO = _a_sqlite(CONSULTA_RANGO).replace("TOP (?)", "").rstrip() + "\n    LIMIT ?\n"
+SQLITE_RANGO_SENSOR = _a_sqlite(CONSULTA_RANGO_SENSOR).replace("TOP (?)", "").rstrip() + "\n    LIMIT ?\n"
+SQLITE_VENTANA_SENSOR = """
+    SELECT * FROM (
+        SELECT
+            [MAC_Sensor], [Capa], [No_paquete],
+            [Distancia_1], [Distancia_2], [Distancia_3],
+            [Temperatura], [Humedad],
+            [Q1], [Q2], [Q3], [Q4],
+            [Identificador], [Fecha]
+        FROM [Data_sensor]
+        WHERE [MAC_Sensor] = ?
+          AND [Fecha] >= ?
+          AND ([Fecha] > ? OR [Identificador] > ?)
+        ORDER BY [Fecha] DESC, [Identificador] DESC
+        LIMIT ?
+    ) AS [Ultimas]
+    ORDER BY [Fecha] ASC, [Identificador] ASC
+"""
+
+
+class ErrorFuenteDatos(Exception):
+    """Error de conexión o de consulta de una fuente, sin importar el driver."""
+
+
+class CursorFuente:
+    """
+    Envuelve el cursor del driver: traduce sus errores a ErrorFuenteDatos y,
+    si hace falta, convierte cada fila al formato de Data_sensor del servidor.
+    """
+
+    def __init__(self, cursor, errores, convertir=None):
+        self.cursor = cursor
+        self.errores = errores
+        self.convertir = convertir
+
+    def fetchmany(self, cantidad):
+        try:
+            filas = self.cursor.fetchmany(cantidad)
+        except self.errores as e:
+            raise ErrorFuenteDatos(str(e)) from e
+        if self.convertir is not None:
+            filas = [self.convertir(row) for row in filas]
+        return filas
+
+
+class FuenteDatos(ABC):
+    """
+    Origen de las filas de Data_sensor para el DatabaseWorker. Se usa solo
+    desde el hilo del worker; las conexiones se abren ahí al primer uso.
+
+    Las filas salen como las del servidor: 12 columnas de la captura,
+    Identificador y Fecha (datetime). 'marca' es la tupla (Fecha,
+    Identificador) del keyset. Los métodos que devuelven un cursor solo
+    garantizan fetchmany(). Cualquier error sale como ErrorFuenteDatos.
+    """
+
+    # Texto que identifica el origen (la caché local se invalida si cambia)
+    descripcion = ""
+    # Si la caché local sirve con esta fuente (los Identificadores persisten)
+    admite_cache = True
+
+    # 'avisar(mensaje)' muestra un mensaje de estado; lo asigna el worker
+    def avisar(self, mensaje):
+        pass
+
+    @abstractmethod
+    def ventana_inicial(self, marca, n):
+        """Cursor: las últimas N filas de cada sensor posteriores a la marca."""
+
+    @abstractmethod
+    def sensores(self):
+        """Lista de MACs distintas."""
+
+    @abstractmethod
+    def ventana_sensor(self, mac, marca, n):
+        """Cursor: las últimas N filas de un sensor posteriores a la marca."""
+
+    @abstractmethod
+    def posteriores(self, marca, n=None):
+        """Cursor: filas posteriores a la marca en orden (todas, o las primeras N)."""
+
+    @abstractmethod
+    def ids_entre(self, desde, hasta):
+        """Lista de Identificadores con Fecha en [desde, hasta]."""
+
+    @abstractmethod
+    def filas_por_id(self, ids):
+        """Cursor: las filas de esos Identificadores, en orden."""
+
+    @abstractmethod
+    def historico(self, mac, desde, hasta, bucket):
+        """Filas agregadas (Bucket, min, avg, max por canal) como las usa filas_a_historico."""
+
+    @abstractmethod
+    def rango(self, marca, hasta, n, mac=None):
+        """Cursor: las primeras N filas posteriores a la marca con Fecha < hasta (de un sensor o de todos)."""
+
+    def duplicar(self):
+        """
+        Otra instancia sin abrir del mismo origen, para consultar desde otro
+        hilo sin usar la conexión del worker. None si el origen no lo permite.
+        """
+        return None
+
+    @abstractmethod
+    def cerrar(self):
+        """Cierra la conexión (desde el hilo que la abrió)."""
+
+
+class FuenteSQL(FuenteDatos):
+    """
+    Implementación común para bases con la tabla Data_sensor. Las subclases
+    dan las consultas, las excepciones de su driver y _ejecutar_driver.
+    """
+
+    ERRORES = ()
+    CONSULTA_ACTUALIZACIONES = CONSULTA_ACTUALIZACIONES
+    CONSULTA_TODAS = CONSULTA_TODAS
+    CONSULTA_IDS_RECIENTES = CONSULTA_IDS_RECIENTES
+    CONSULTA_FILAS_POR_ID = CONSULTA_FILAS_POR_ID
+    CONSULTA_HISTORICO = CONSULTA_HISTORICO
+    CONSULTA_VENTANA_INICIAL = CONSULTA_VENTANA_INICIAL
+    CONSULTA_SENSORES = CONSULTA_SENSORES
+    CONSULTA_VENTANA_SENSOR = CONSULTA_VENTANA_SENSOR
+    CONSULTA_RANGO = CONSULTA_RANGO
+    CONSULTA_RANGO_SENSOR = CONSULTA_RANGO_SENSOR
+
+    @abstractmethod
+    def _ejecutar_driver(self, consulta, params, usar_cursor_sondeo):
+        """Cursor del driver con la consulta ya ejecutada (errores del driver sin traducir)."""
+
+    def _parametros(self, params):
+        """Adapta los parámetros al driver (p. ej. fechas como texto)."""
+        return params
+
+    def _con_limite(self, n, params):
+        """Parámetros de una consulta con TOP (N): N va al inicio."""
+        return (n,) + tuple(params)
+
+    # Conversión de cada fila al formato del servidor (None = ya lo es)
+    convertir_fila = None
+
+    def _ejecutar(self, consulta, params=(), usar_cursor_sondeo=False):
+        inicio = metricas.reloj()
+        try:
+            cursor = self._ejecutar_driver(consulta, self._parametros(tuple(params)), usar_cursor_sondeo)
+        except self.ERRORES as e:
+            raise ErrorFuenteDatos(str(e)) from e
+        metricas.observar_desde('bd_consulta_ms', inicio)
+        return cursor
+
+    def _filas(self, consulta, params=(), usar_cursor_sondeo=False):
+        cursor = self._ejecutar(consulta, params, usar_cursor_sondeo)
+        return CursorFuente(cursor, self.ERRORES, self.convertir_fila)
+
+    def _todas(self, consulta, params=()):
+        cursor = self._ejecutar(consulta, params)
+        try:
+            return cursor.fetchall()
+        except self.ERRORES as e:
+            raise ErrorFuenteDatos(str(e)) from e
+
+    def ventana_inicial(self, marca, n):
+        return self._filas(self.CONSULTA_VENTANA_INICIAL, _params_marca(marca) + (n,))
+
+    def sensores(self):
+        return [row[0] for row in self._todas(self.CONSULTA_SENSORES)]
+
+    def ventana_sensor(self, mac, marca, n):
+        return self._filas(self.CONSULTA_VENTANA_SENSOR, self._con_limite(n, (mac,) + _params_marca(marca)))
+
+    def posteriores(self, marca, n=None):
+        if n is None:
+            return self._filas(self.CONSULTA_TODAS, _params_marca(marca))
+        return self._filas(self.CONSULTA_ACTUALIZACIONES, self._con_limite(n, _params_marca(marca)),
+                           usar_cursor_sondeo=True)
+
+    def ids_entre(self, desde, hasta):
+        return [row[0] for row in self._todas(self.CONSULTA_IDS_RECIENTES, (desde, hasta))]
+
+    def filas_por_id(self, ids):
+        return self._filas(self.CONSULTA_FILAS_POR_ID.format(','.join('?' * len(ids))), ids)
+
+    def historico(self, mac, desde, hasta, bucket):
+        return self._todas(self.CONSULTA_HISTORICO, (bucket, mac, desde, hasta))
+
+    def rango(self, marca, hasta, n, mac=None):
+        if mac is None:
+            return self._filas(self.CONSULTA_RANGO, self._con_limite(n, _params_marca(marca) + (hasta,)))
+        return self._filas(self.CONSULTA_RANGO_SENSOR, self._con_limite(n, _params_marca(marca) + (hasta, mac)))
+
+
+def _params_marca(marca):
+    """Parámetros (fecha, fecha, identificador) del filtro por keyset."""
+    fecha, identificador = marca
+    return (fecha, fecha, identificador)
+
+
+class FuenteODBC(FuenteSQL):
+    """SQL Server por pyodbc, con una conexión persistente que se reconecta sola."""
+
+    ERRORES = (pyodbc.Error,) if pyodbc is not None else ()
+
+    def __init__(self, connection_string=CONNECTION_STRING):
+        self.connection_string = connection_string
+        self.descripcion = connection_string
+
+        # Conexión persistente (se crea en el hilo del worker al primer uso)
+        self.conn = None
+        self.cursor_sondeo = None
+        self.ultimo_uso_conexion = 0.0
+
+        # Contadores de conexión para medir el costo de conectar/reconectar
+        self.estadisticas_conexion = {
+            'conexiones': 0,      # Conexiones exitosas (incluye reconexiones)
+            'reconexiones': 0,
+            'fallos': 0,
+            'ultimo_ms': 0.0,     # Latencia de la última conexión
+            'total_ms': 0.0,      # Latencia acumulada de todas las conexiones
+        }
+
+    def _conectar(self, es_reconexion=False):
+        """Abre la conexión y registra cuánto tardó."""
+        if pyodbc is None:
+            raise ErrorFuenteDatos("pyodbc no está instalado (usar la fuente sqlite o replay)")
+        self.cerrar()
+        inicio = time.perf_counter()
+        try:
+            # autocommit: las lecturas no dejan transacciones abiertas
+            # y cada sondeo ve lo último que se confirmó
+            self.conn = pyodbc.connect(self.connection_string, autocommit=True)
+        except pyodbc.Error:
+            self.estadisticas_conexion['fallos'] += 1
+            raise
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+
+        stats = self.estadisticas_conexion
+        stats['conexiones'] += 1
+        stats['ultimo_ms'] = latencia_ms
+        stats['total_ms'] += latencia_ms
+        if es_reconexion:
+            stats['reconexiones'] += 1
+            self.avisar(f"Reconectado a la BD en {latencia_ms:.0f} ms.")
+
+        logger.info(
+            f"Fuente ODBC: Conexión {'re' if es_reconexion else ''}establecida en {latencia_ms:.1f} ms "
+            f"(conexiones={stats['conexiones']}, reconexiones={stats['reconexiones']}, "
+            f"promedio={stats['total_ms'] / stats['conexiones']:.1f} ms)"
+        )
+        self.ultimo_uso_conexion = time.monotonic()
+
+    def _conexion_sana(self):
+        """Verificación ligera de que la conexión sigue viva."""
+        try:
+            self.conn.cursor().execute("SELECT 1").fetchone()
+            return True
+        except pyodbc.Error as e:
+            logger.warning(f"Fuente ODBC: La conexión no responde: {e}")
+            return False
+
+    def _obtener_conexion(self):
+        """Devuelve la conexión persistente, verificándola si estuvo inactiva."""
+        if self.conn is None:
+            self._conectar(es_reconexion=self.estadisticas_conexion['conexiones'] > 0)
+        elif time.monotonic() - self.ultimo_uso_conexion > INTERVALO_VERIFICACION_S:
+            if not self._conexion_sana():
+                self._conectar(es_reconexion=True)
+        self.ultimo_uso_conexion = time.monotonic()
+        return self.conn
+
+    def _ejecutar_driver(self, consulta, params, usar_cursor_sondeo):
+        """
+        Ejecuta la consulta en la conexión persistente.
+        Si falla porque la conexión se cayó, reconecta y reintenta UNA vez.
+        """
+        for intento in range(2):
+            conn = self._obtener_conexion()
+            try:
+                if usar_cursor_sondeo:
+                    if self.cursor_sondeo is None:
+                        self.cursor_sondeo = conn.cursor()
+                    cursor = self.cursor_sondeo
+                else:
+                    cursor = conn.cursor()
+                cursor.execute(consulta, params)
+                return cursor
+            except pyodbc.Error:
+                # Si la conexión está bien el error es de la consulta
+                if intento > 0 or self._conexion_sana():
+                    raise
+                logger.warning("Fuente ODBC: Conexión perdida, reintentando...")
+                self._conectar(es_reconexion=True)
+
+    def duplicar(self):
+        return FuenteODBC(self.connection_string)
+
+    def cerrar(self):
+        """Cierra la conexión persistente (desde el hilo del worker)."""
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except pyodbc.Error as e:
+                logger.warning(f"Fuente ODBC: Error al cerrar la conexión: {e}")
+        self.conn = None
+        self.cursor_sondeo = None
+
+
+def _fecha_sqlite(valor):
+    if isinstance(valor, datetime.datetime):
+        return valor.isoformat(sep=' ', timespec='milliseconds')
+    return valor
+
+
+def _fila_sqlite(row):
+    return list(row[:13]) + [datetime.datetime.fromisoformat(row[13])]
+
+
+class FuenteSQLite(FuenteSQL):
+    """
+    Archivo SQLite con la misma tabla Data_sensor (ESQUEMA_SQLITE), para
+    trabajar sin SQL Server. Insert_prueba.py --sqlite lo llena desde el CSV.
+    """
+
+    ERRORES = (sqlite3.Error,)
+    CONSULTA_ACTUALIZACIONES = SQLITE_ACTUALIZACIONES
+    CONSULTA_TODAS = _a_sqlite(CONSULTA_TODAS)
+    CONSULTA_IDS_RECIENTES = _a_sqlite(CONSULTA_IDS_RECIENTES)
+    CONSULTA_FILAS_POR_ID = _a_sqlite(CONSULTA_FILAS_POR_ID)
+    CONSULTA_HISTORICO = _a_sqlite(CONSULTA_HISTORICO)
+    CONSULTA_VENTANA_INICIAL = _a_sqlite(CONSULTA_VENTANA_INICIAL)
+    CONSULTA_SENSORES = _a_sqlite(CONSULTA_SENSORES)
+    CONSULTA_VENTANA_SENSOR = SQLITE_VENTANA_SENSOR
+    CONSULTA_RANGO = SQLITE_RANGO
+    CONSULTA_RANGO_SENSOR = SQLITE_RANGO_SENSOR
+
+    convertir_fila = staticmethod(_fila_sqlite)
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.descripcion = f"sqlite:{os.path.abspath(ruta)}"
+        self.conn = None
+
+    def _abrir(self):
+        self.conn = sqlite3.connect(self.ruta)
+        self.conn.execute("PRAGMA journal_mode = WAL") # Otro proceso puede ir insertando
+        self.conn.executescript(ESQUEMA_SQLITE)
+        logger.info(f"Fuente SQLite: {self.ruta}")
+
+    def _ejecutar_driver(self, consulta, params, usar_cursor_sondeo):
+        if self.conn is None:
+            self._abrir()
+        return self.conn.execute(consulta, params)
+
+    def _parametros(self, params):
+        return tuple(_fecha_sqlite(valor) for valor in params)
+
+    def _con_limite(self, n, params):
+        return tuple(params) + (n,)
+
+    def duplicar(self):
+        return FuenteSQLite(self.ruta)
+
+    def cerrar(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Fuente SQLite: Error al cerrar: {e}")
+        self.conn = None
+
+
+def leer_captura(archivo):
+    """
+    Lee una captura CSV (las filas de 12 columnas, como Insert_prueba),
+    también comprimida (.csv.gz, como las exportaciones). Devuelve
+    (filas, marcas): las filas convertidas y las marcas de tiempo del log
+    del ESP como (índice de la siguiente fila, ms).
+    """
+    filas, marcas = [], []
+    abrir = gzip.open if archivo.lower().endswith('.gz') else open
+    with abrir(archivo, 'rt', encoding='utf-8', errors='replace', newline='') as f:
+        for linea in f:
+            marca = MARCA_LOG_ESP.match(linea)
+            if marca:
+                marcas.append((len(filas), int(marca.group(1))))
+                continue
+            row = next(csv.reader([linea]), [])
+            if len(row) != 12:
+                continue
+            try:
+                filas.append([row[0].strip(), int(row[1]), int(row[2])] + [float(v) for v in row[3:]])
+            except ValueError:
+                continue # Línea dañada en la captura
+    return filas, marcas
+
+
+def tiempos_captura(cantidad, marcas, tasa_defecto=TASA_REPLAY_DEFECTO):
+    """
+    Tiempo de captura (s desde la primera fila) de cada fila. Entre dos
+    marcas del ESP las filas se reparten parejo; antes de la primera y
+    después de la última se usa la tasa promedio. Sin marcas suficientes
+    se usa 'tasa_defecto' filas/s.
+    """
+    # Solo marcas crecientes (si el ESP se reinicia, su contador vuelve a 0)
+    validas = []
+    for indice, ms in marcas:
+        if not validas or (indice > validas[-1][0] and ms > validas[-1][1]):
+            validas.append((indice, ms))
+
+    indices = np.arange(cantidad, dtype=np.float64)
+    if len(validas) < 2:
+        return indices / tasa_defecto
+
+    xp, fp = np.array(validas, dtype=np.float64).T
+    fp = fp / 1000
+    tasa = (xp[-1] - xp[0]) / (fp[-1] - fp[0])
+    tiempos = np.interp(indices, xp, fp)
+    antes, despues = indices < xp[0], indices > xp[-1]
+    tiempos[antes] = fp[0] - (xp[0] - indices[antes]) / tasa
+    tiempos[despues] = fp[-1] + (indices[despues] - xp[-1]) / tasa
+    return tiempos - tiempos[0]
+
+
+class FuenteReplay(FuenteSQLite):
+    """
+    Reproduce una captura CSV a 'velocidad' veces su tasa real, para pruebas
+    de carga sin servidor. Las filas se van insertando en una base SQLite en
+    memoria conforme les toca según el reloj (las consultas son las mismas
+    de FuenteSQLite); la Fecha es la hora en que "llegan" y el Identificador
+    sigue creciendo. Con 'repetir' la captura vuelve a empezar al terminar.
+
+    El reloj empieza con la primera consulta (la carga inicial).
+    """
+
+    admite_cache = False # Los Identificadores empiezan de nuevo en cada corrida
+
+    def __init__(self, archivo, velocidad=1.0, repetir=True,
+                 tasa_defecto=TASA_REPLAY_DEFECTO, max_filas=MAX_FILAS_REPLAY):
+        super().__init__(':memory:')
+        if velocidad <= 0:
+            raise ValueError("La velocidad del replay debe ser positiva")
+        self.archivo = archivo
+        self.descripcion = f"replay:{os.path.abspath(archivo)}"
+        self.velocidad = velocidad
+        self.repetir = repetir
+        self.tasa_defecto = tasa_defecto
+        self.max_filas = max_filas
+
+        self.filas = None   # Filas de la captura (12 columnas)
+        self.tiempos = None # s desde la primera fila, por fila
+        self.periodo = 0.0  # Duración de una vuelta de la captura (s)
+        self.siguiente = 0  # Índice global (con vueltas) de la próxima fila a liberar
+        self.inicio = None  # time.monotonic() del inicio del replay
+        self.fecha_inicio = None
+        self.terminado = False
+
+    def _abrir(self):
+        super()._abrir()
+        filas, marcas = leer_captura(self.archivo)
+        if not filas:
+            raise ErrorFuenteDatos(f"La captura '{self.archivo}' no tiene filas de 12 columnas")
+        tiempos = tiempos_captura(len(filas), marcas, self.tasa_defecto)
+        self.filas = filas
+        self.tiempos = tiempos.tolist()
+        # Una vuelta dura lo capturado más el intervalo promedio entre filas
+        self.periodo = tiempos[-1] * len(filas) / (len(filas) - 1) if len(filas) > 1 else 1 / self.tasa_defecto
+        self.inicio = time.monotonic()
+        self.fecha_inicio = datetime.datetime.now()
+        logger.info(
+            f"Replay: {len(filas)} filas de '{self.archivo}' ({self.periodo:.0f} s de captura, "
+            f"{len(marcas)} marcas del ESP) a {self.velocidad:g}x"
+        )
+
+    def _liberar(self):
+        """Inserta las filas cuyo tiempo de captura ya pasó en el reloj del replay."""
+        transcurrido = (time.monotonic() - self.inicio) * self.velocidad
+        cantidad = len(self.filas)
+        vuelta, resto = divmod(transcurrido, self.periodo)
+        hasta = int(vuelta) * cantidad + bisect.bisect_right(self.tiempos, resto)
+        if not self.repetir:
+            hasta = min(hasta, cantidad)
+            if hasta == cantidad and not self.terminado:
+                self.terminado = True
+                logger.info("Replay: fin de la captura.")
+        if hasta <= self.siguiente:
+            return
+
+        nuevas = []
+        for k in range(self.siguiente, hasta):
+            vuelta, base = divmod(k, cantidad)
+            segundos = (vuelta * self.periodo + self.tiempos[base]) / self.velocidad
+            fecha = self.fecha_inicio + datetime.timedelta(seconds=segundos)
+            nuevas.append(self.filas[base] + [k + 1, _fecha_sqlite(fecha)])
+        self.conn.executemany(
+            "INSERT INTO [Data_sensor] ([MAC_Sensor], [Capa], [No_paquete], [Distancia_1], "
+            "[Distancia_2], [Distancia_3], [Temperatura], [Humedad], [Q1], [Q2], [Q3], [Q4], "
+            f"[Identificador], [Fecha]) VALUES ({','.join('?' * 14)})", nuevas
+        )
+        self.siguiente = hasta
+        # Tope de memoria: se olvidan las filas más viejas
+        if self.siguiente > self.max_filas * 1.1:
+            self.conn.execute("DELETE FROM [Data_sensor] WHERE [Identificador] <= ?",
+                              (self.siguiente - self.max_filas,))
+
+    def duplicar(self):
+        return None # La base es en memoria, solo existe en el hilo del worker
+
+    def _ejecutar_driver(self, consulta, params, usar_cursor_sondeo):
+        if self.conn is None:
+            self._abrir()
+        self._liberar()
+        return self.conn.execute(consulta, params)
+
+
+# Fuentes que se pueden elegir desde la línea de comandos
+FUENTES = ('odbc', 'sqlite', 'replay')
+
+
+def crear_fuente(tipo='odbc', archivo=None, velocidad=1.0, repetir=True):
+    """
+    Crea la fuente por nombre: 'odbc' (SQL Server, CONNECTION_STRING),
+    'sqlite' (archivo con Data_sensor) o 'replay' (captura CSV).
+    """
+    if tipo == 'odbc':
+        return FuenteODBC(CONNECTION_STRING)
+    if tipo == 'sqlite':
+        if not archivo:
+            raise ValueError("La fuente sqlite necesita el archivo de la base")
+        return FuenteSQLite(archivo)
+    if tipo == 'replay':
+        if not archivo:
+            raise ValueError("La fuente replay necesita el archivo CSV de la captura")
+        return FuenteReplay(archivo, velocidad, repetir)
+    raise ValueError(f"Fuente de datos desconocida: {tipo}")
@@ -1,24 +1,60 @@
-from PySide6.QtCore import QObject, Slot, QThread, QTimer
+from PySide6.QtCore import QObject, Slot, Signal, QThread, QTimer, Qt
 import logging
-import math
-from collections import deque
+import multiprocessing
+import os
+import time
 
 # Importaciones relativas correctas
 from .ConexionBD import DatabaseWorker
-from Interfaz.WidgetGrafica import GraficaWidget 
+from .CacheLocal import CacheLocal
+from .FuentesDatos import FuenteODBC
+from .BufferSensor import BufferSensor
+from .Planificador import PlanificadorRender, PlanificadorSondeo
+from .Procesamiento import agrupar_por_sensor, columnas_corregidas, COL_CAPA
+from .Directorio import DirectorioSensores
+from .MemoriaCompartida import LectorBuffer
+from .ProcesoIngesta import ejecutar_ingesta, ReceptorIngesta, ESPERA_CIERRE_S
+from .Historico import CacheHistorico, calcular_bucket, alinear_rango
+from .Metricas import metricas, LIMITES_S
+from .Exportacion import ExportadorDatos
 
 # --- Configuración ---
-MAX_MUESTRAS = 1000 
+MAX_MUESTRAS = 50000 # Por sensor; la gráfica se reduce al ancho en pixeles al dibujar
 SENSORES_POR_PAGINA = 3
+TAMANO_LOTE = 500         # Filas por lote que emite el worker (None = una señal por fila)
+TIEMPO_MAX_LOTE_S = 0.1   # Tiempo máximo que el worker retiene un lote incompleto
+FPS_MAX = 20              # Cuadros por segundo máximos al dibujar en vivo
+FPS_VISTA_GENERAL = 4     # Cuadros por segundo de la vista general (todos los sensores)
+PRESUPUESTO_VISTA_GENERAL_MS = 40 # Tiempo máximo por cuadro repintando mosaicos; el resto sigue en el siguiente
+VENTANA_CARGA_INICIAL = MAX_MUESTRAS # Filas por sensor en la carga inicial (None = tabla completa)
+TAMANO_PAGINA_SONDEO = 5000 # Filas por página (TOP N) al buscar datos nuevos
+PAGINAS_POR_SONDEO = 10     # Páginas máximas por tick; el resto se trae en el siguiente
+INTERVALO_SONDEO_MIN_MS = 250  # Espera entre sondeos mientras llegan datos
+INTERVALO_SONDEO_MAX_MS = 5000 # Tope de la espera cuando no llega nada
+# Caché local para arrancar sin esperar la carga completa del servidor
+RUTA_CACHE_LOCAL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache_sensores.sqlite3')
+MAX_MB_CACHE_LOCAL = 500
+INTERVALO_METRICAS_MS = 5000 # Cada cuánto se escribe el archivo de métricas (si está habilitado)
+# Carpeta que propone el diálogo de exportación
+CARPETA_EXPORTACION = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 class AppLogica(QObject):
     """
     manejar el estado de la aplicación.
     """
+
+    # Pide al worker el histórico agregado: MAC, desde, hasta, bucket
+    pedir_historico = Signal(str, object, object, object)
+    # Copia de un sensor para el exportador (en su hilo): MAC, columnas o None
+    enviar_sensor_exportacion = Signal(str, object)
     
-    def __init__(self, ui: 'SensorMonitorUI'):
+    def __init__(self, ui: 'SensorMonitorUI', usar_cache=True, invalidar_cache=False,
+                 sensores_por_pagina=SENSORES_POR_PAGINA, fuente=None, multiproceso=False):
         super().__init__()
         self.ui = ui
+        # Ingesta en otro proceso (buffers en memoria compartida) o en un QThread
+        self.multiproceso = multiproceso
+        self.sensores_por_pagina = sensores_por_pagina
         self.seccion_actual = "distancias" # Default
         self.pagina_actual = 0
         
@@ -27,164 +63,467 @@ class AppLogica(QObject):
         self.ultimos_valores_validos = {}
         
         #  Widgets 
-        self.widgets_graficas = {} # {mac: GraficaWidget}
-        self.lista_macs_ordenada = []
+        # Pool fijo de 'sensores_por_pagina' gráficas que se reasignan al
+        # cambiar de página; así la memoria no crece con el número de sensores
+        self.pool_graficas = self.ui.crear_pool_graficas(self.sensores_por_pagina)
+        for widget in self.pool_graficas:
+            widget.solicitar_historico.connect(self.on_solicitar_historico)
+        self.widgets_graficas = {} # {mac: widget de gráfica}, solo los de la página actual
+        # MACs ordenadas, con búsqueda y filtros (capa, actividad); las páginas salen de aquí
+        self.directorio = DirectorioSensores()
+        self.carga_inicial_lista = False
         
         self.db_thread = None
         self.db_worker = None
-        self.update_timer = None 
+        self.proceso_ingesta = None
+        self.receptor_ingesta = None
+
+        #  Exportación (en su propio hilo, una a la vez) 
+        self.exportador = None
+        self.hilo_exportacion = None
+
+        #  Histórico agregado (zoom hacia atrás) 
+        self.cache_historico = CacheHistorico()
+
+        #  Dibujo en vivo a tasa limitada 
+        self.planificador_render = PlanificadorRender(self.redibujar_sensores, FPS_MAX, self)
+
+        #  Vista general: todos los sensores en mosaicos, con su propio planificador 
+        self.vista_general_activa = False
+        self.planificador_general = PlanificadorRender(self.redibujar_vista_general, FPS_VISTA_GENERAL, self)
+        self.ui.vista_general.mosaicos_invalidos.connect(self.repintar_vista_general)
+
+        #  Sondeo adaptativo de datos nuevos 
+        self.planificador_sondeo = PlanificadorSondeo(INTERVALO_SONDEO_MIN_MS, INTERVALO_SONDEO_MAX_MS, parent=self)
+        self.planificador_sondeo.estado_actualizado.connect(self.on_estado_sondeo)
         
-        self.connection_string = (
-            r"Driver={SQL Server Native Client 11.0};"
-            r"Server=DESKTOP-J4U2VS9\sqlexpress;"
-            r"Database=Sensores;"
-            r"Trusted_Connection=yes;"
-        )
+        #  Origen de los datos (por defecto SQL Server) 
+        self.fuente = fuente if fuente is not None else FuenteODBC()
 
-    def set_update_timer(self, timer: QTimer):
-        """Recibe el QTimer desde main.py"""
-        self.update_timer = timer
-        # primero el worker debe existir
+        #  Caché local (la usa solo el worker) 
+        self.cache_local = None
+        if usar_cache and self.fuente.admite_cache:
+            self.cache_local = CacheLocal(
+                RUTA_CACHE_LOCAL, self.fuente.descripcion,
+                VENTANA_CARGA_INICIAL or MAX_MUESTRAS, MAX_MB_CACHE_LOCAL
+            )
+            if invalidar_cache:
+                self.cache_local.invalidar()
+
+    def habilitar_metricas(self, ruta):
+        """
+        Activa la instrumentación y escribe las métricas en 'ruta' (JSON si
+        termina en .json, si no texto de Prometheus) cada INTERVALO_METRICAS_MS.
+        """
+        metricas.habilitado = True
+        self.ruta_metricas = ruta
+        self.timer_metricas = QTimer(self)
+        self.timer_metricas.timeout.connect(self.exportar_metricas)
+        self.timer_metricas.start(INTERVALO_METRICAS_MS)
+        logging.info(f"Métricas habilitadas, se escriben en {ruta}")
+
+    @Slot()
+    def exportar_metricas(self):
+        """Actualiza la frescura por sensor, escribe el archivo y el resumen en la barra."""
+        ahora = time.time()
+        for mac, buffer in self.datos_sensores.items():
+            if len(buffer):
+                metricas.fijar('frescura_sensor_s', round(ahora - buffer['fecha'][-1], 3), (('mac', mac),))
+        metricas.fijar('sensores', len(self.datos_sensores))
+        metricas.fijar('cuadros_dibujados', self.planificador_render.cuadros_dibujados)
+        metricas.fijar('cuadros_saltados', self.planificador_render.cuadros_saltados)
+        metricas.fijar('intervalo_sondeo_ms', self.planificador_sondeo.intervalo_ms)
+        try:
+            metricas.escribir(self.ruta_metricas)
+        except OSError as e:
+            logging.error(f"No se pudo escribir el archivo de métricas: {e}")
+
+        self.ui.actualizar_metricas(
+            metricas.percentil('bd_consulta_ms', 50),
+            metricas.percentil('cola_senal_ms', 99),
+            metricas.percentil('dibujo_ms', 99, (('seccion', self.seccion_actual),)),
+        )
 
     def iniciar(self):
         """configurando el hilo de la BD"""
         logging.info("AppLogica iniciada.")
-        self.setup_threading()
+        self.planificador_render.iniciar()
+        if self.multiproceso:
+            self.setup_proceso()
+        else:
+            self.setup_threading()
+
+    def opciones_worker(self):
+        """Parámetros del DatabaseWorker (en este proceso o en el de ingesta)."""
+        return {
+            'tamano_lote': TAMANO_LOTE,
+            'tiempo_max_lote': TIEMPO_MAX_LOTE_S,
+            'ventana_inicial': VENTANA_CARGA_INICIAL,
+            'tamano_pagina': TAMANO_PAGINA_SONDEO,
+            'paginas_por_sondeo': PAGINAS_POR_SONDEO,
+        }
 
     def setup_threading(self):
         """Configura e inicia el QThread y el DatabaseWorker."""
         logging.info("Configurando hilo de base de datos...")
         self.db_thread = QThread()
-        self.db_worker = DatabaseWorker(self.connection_string)
+        self.db_worker = DatabaseWorker(self.fuente, cache=self.cache_local, **self.opciones_worker())
         self.db_worker.moveToThread(self.db_thread)
         # Conectar señales del worker a nuestros slots
         self.db_thread.started.connect(self.db_worker.load_initial_data)
         self.db_worker.new_data_row.connect(self.procesar_fila_datos)
+        self.db_worker.new_data_batch.connect(self.procesar_lote_datos)
         self.db_worker.initial_load_finished.connect(self.on_initial_load_finished)
         self.db_worker.status_update.connect(self.ui.statusbar.showMessage)
-        # Conectar el timer al worker 
-        if self.update_timer:
-            self.update_timer.timeout.connect(self.db_worker.check_for_updates)
+        self.db_worker.historical_data_ready.connect(self.on_historico_listo)
+        self.pedir_historico.connect(self.db_worker.consultar_historico)
+        # La fuente (conexión persistente) y la caché se cierran dentro del hilo del worker al terminar
+        self.db_thread.finished.connect(self.db_worker.cerrar, Qt.ConnectionType.DirectConnection)
+        # Sondeo: el planificador pide, el worker avisa al terminar
+        self.planificador_sondeo.sondear.connect(self.db_worker.check_for_updates)
+        self.db_worker.poll_finished.connect(self.planificador_sondeo.on_sondeo_terminado)
 
         logging.info("Iniciando hilo de base de datos...")
         self.db_thread.start()
 
+    def setup_proceso(self):
+        """
+        Modo multiproceso: la consulta, conversión, corrección y los buffers
+        (en memoria compartida) van en un proceso aparte, que usa otro
+        núcleo y no compite por el GIL con el dibujo. Aquí solo se abren
+        los buffers en modo lectura y se reciben avisos cortos ("el sensor X
+        llegó a N muestras") en un QThread.
+        """
+        logging.info("Iniciando proceso de ingesta...")
+        contexto = multiprocessing.get_context('spawn') # fork no es seguro con Qt
+        self.avisos_ingesta = contexto.Queue()
+        self.ordenes_ingesta = contexto.Queue()
+        # La fuente y la caché todavía no abrieron conexiones: se copian al proceso
+        self.proceso_ingesta = contexto.Process(
+            target=ejecutar_ingesta, name='ingesta', daemon=True,
+            args=(self.fuente, self.cache_local, MAX_MUESTRAS, self.opciones_worker(),
+                  (INTERVALO_SONDEO_MIN_MS, INTERVALO_SONDEO_MAX_MS),
+                  self.avisos_ingesta, self.ordenes_ingesta)
+        )
+        self.proceso_ingesta.start()
+
+        self.db_thread = QThread()
+        self.receptor_ingesta = ReceptorIngesta(self.avisos_ingesta)
+        self.receptor_ingesta.moveToThread(self.db_thread)
+        self.db_thread.started.connect(self.receptor_ingesta.escuchar)
+        self.receptor_ingesta.sensor_nuevo.connect(self.on_sensor_compartido)
+        self.receptor_ingesta.sensores_avanzaron.connect(self.on_sensores_avanzaron)
+        self.receptor_ingesta.initial_load_finished.connect(self.on_initial_load_finished)
+        self.receptor_ingesta.estado_sondeo.connect(self.on_estado_sondeo)
+        self.receptor_ingesta.status_update.connect(self.ui.statusbar.showMessage)
+        self.receptor_ingesta.historical_data_ready.connect(self.on_historico_listo)
+        self.pedir_historico.connect(self.enviar_pedido_historico)
+        self.db_thread.start()
+
+    @Slot()
+    def detener(self):
+        """Detiene los timers y el hilo de la BD al cerrar la aplicación."""
+        self.planificador_render.detener()
+        self.planificador_general.detener()
+        self.planificador_sondeo.detener()
+        if metricas.habilitado:
+            self.timer_metricas.stop()
+            self.exportar_metricas() # Último estado antes de salir
+        if self.db_worker:
+            self.db_worker.stop()
+        if self.exportador is not None:
+            # Se deja a medias: el archivo parcial se borra
+            exportador = self.exportador
+            exportador.cancelar()
+            self.cerrar_exportacion()
+            exportador.descartar()
+        if self.proceso_ingesta:
+            self.ordenes_ingesta.put(('detener',))
+            self.proceso_ingesta.join(ESPERA_CIERRE_S)
+            if self.proceso_ingesta.is_alive():
+                logging.warning("El proceso de ingesta no terminó a tiempo, se detiene a la fuerza.")
+                self.proceso_ingesta.terminate()
+            self.receptor_ingesta.stop()
+            self.avisos_ingesta.close()
+            self.ordenes_ingesta.close()
+        if self.db_thread:
+            self.db_thread.quit()
+            self.db_thread.wait()
+            logging.info("Hilo de base de datos detenido.")
+        if self.proceso_ingesta:
+            for datos in self.datos_sensores.values():
+                datos.cerrar()
+
     # --- Procesamiento de Datos (Recibido del Worker) ---
     @Slot(list)
     def procesar_fila_datos(self, row):
         """
         Slot que recibe cada fila de datos del DatabaseWorker.
         """
+        self.procesar_lote_datos([row])
+
+    @Slot(list, float)
+    def procesar_lote_datos(self, filas, enviado=0.0):
+        """
+        Slot que recibe un lote de filas del DatabaseWorker.
+        Agrupa las filas por MAC y agrega cada grupo a su buffer de una vez.
+        'enviado' es cuándo lo emitió el worker (time.monotonic), para medir la cola.
+        """
+        if metricas.habilitado and filas:
+            if enviado:
+                metricas.observar('cola_senal_ms', (time.monotonic() - enviado) * 1000)
+            if filas[-1][13] is not None:
+                metricas.observar('frescura_s', time.time() - filas[-1][13].timestamp(), limites=LIMITES_S)
+        inicio = metricas.reloj()
+
+        # Agrupar por sensor conservando el orden de llegada
+        filas_por_sensor = agrupar_por_sensor(filas)
+
+        hay_sensores_nuevos = False
+        for mac, filas_sensor in filas_por_sensor.items():
+            try:
+                #  Lógica de Creación Dinámica 
+                if mac not in self.datos_sensores:
+                    self.registrar_sensor(mac, filas_sensor[0][COL_CAPA])
+                    hay_sensores_nuevos = True
+
+                self.agregar_filas_sensor(mac, filas_sensor)
+
+            except Exception as e:
+                logging.error(f"Error procesando lote de {mac}: {e}")
+
+        if hay_sensores_nuevos:
+            # Los sensores que aparecen en vivo se muestran de una vez si
+            # caen en la página actual (la carga inicial ya la arma al final)
+            if self.carga_inicial_lista:
+                self.actualizar_display_graficas()
+
+        # --- Actualización en Vivo ---
+        # No se dibuja aquí: solo se marcan los sensores y el planificador
+        # redibuja los visibles en el próximo cuadro
+        self.marcar_sucios(filas_por_sensor.keys())
+
+        if metricas.habilitado and filas:
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            metricas.observar('procesamiento_lote_ms', duracion_ms)
+            metricas.observar('procesamiento_fila_ms', duracion_ms / len(filas))
+
+    def redibujar_sensores(self, macs):
+        """Llamado por el planificador: redibuja los sensores visibles de 'macs'."""
+        for mac in macs:
+            widget = self.widgets_graficas.get(mac)
+            if widget is not None and widget.isVisible():
+                widget.actualizar_grafica(self.datos_sensores[mac], self.seccion_actual)
+
+    def marcar_sucios(self, macs):
+        """Sensores con datos nuevos: se redibujan en el próximo cuadro de la vista activa."""
+        if self.vista_general_activa:
+            self.planificador_general.marcar_sucios(macs)
+        else:
+            self.planificador_render.marcar_sucios(macs)
+
+    def redibujar_vista_general(self, macs):
+        """Llamado por el planificador de la vista general: repinta los mosaicos de 'macs'."""
+        inicio = metricas.reloj()
+        faltan = self.ui.vista_general.dibujar_mosaicos(macs, PRESUPUESTO_VISTA_GENERAL_MS)
+        if faltan:
+            # Se acabó el tiempo del cuadro: quedan para el siguiente
+            self.planificador_general.marcar_sucios(faltan)
+        metricas.observar_desde('dibujo_vista_general_ms', inicio)
+
+    def registrar_sensor(self, mac, capa=None):
+        """Crea la estructura de datos para una MAC nueva."""
+        self.inicializar_estructura_datos(mac)
+        self.agregar_al_directorio(mac, capa)
+
+    def agregar_al_directorio(self, mac, capa):
+        # ¡Nuevo sensor! Lo añadimos al directorio (queda en su lugar en
+        # orden); su gráfica se asigna del pool cuando quede en la página actual
+        if capa is not None and capa not in self.directorio.capas_vistas:
+            self.ui.agregar_capa(capa)
+        self.directorio.agregar(mac, capa)
+
+    def agregar_filas_sensor(self, mac, filas):
+        """Convierte, valida y agrega las filas de UN sensor a su buffer."""
+        # Los valores 0 de todo el bloque se corrigen continuando desde el
+        # último valor válido que quedó del bloque anterior
+        datos = self.datos_sensores[mac]
+        ultima = datos['muestras'][-1] if len(datos) else None
+        columnas = columnas_corregidas(filas, self.ultimos_valores_validos[mac], ultima)
+        if len(columnas['muestras']) == 0:
+            return
+
+        # --- Buffer circular: se agrega todo el bloque de una vez ---
+        datos.agregar_lote(columnas)
+        self.directorio.visto(mac, columnas['fecha'][-1])
+
+    # --- Modo multiproceso (avisos del proceso de ingesta) ---
+
+    @Slot(str, str, object)
+    def on_sensor_compartido(self, mac, nombre, capa):
+        """El proceso de ingesta creó el buffer de un sensor nuevo: abrirlo en modo lectura."""
+        logging.info(f"Abriendo buffer compartido de {mac} ({nombre})")
         try:
-            mac = row[0]
-            
-            #  Lógica de Creación Dinámica 
-            if mac not in self.datos_sensores:
-                self.inicializar_estructura_datos(mac)
-                
-                # ¡Nuevo sensor! Lo añadimos a la lista
-                if mac not in self.widgets_graficas:
-                    self.lista_macs_ordenada.append(mac)
-                    self.lista_macs_ordenada.sort() # Mantener ordenado
-                    
-                    # Le pedimos a la UI que cree el widget real
-                    widget = self.ui.crear_grafica_real(mac)
-                    self.widgets_graficas[mac] = widget
-                    widget.hide() # Ocultarlo hasta que esté en la página correcta
-            
-            # Extraer y validar datos (índices de tu tabla)
-            d1_raw = float(row[3]) if row[3] is not None else 0.0
-            d2_raw = float(row[4]) if row[4] is not None else 0.0
-            d3_raw = float(row[5]) if row[5] is not None else 0.0
-            temp = float(row[6]) if row[6] is not None else 0.0
-            hum = float(row[7]) if row[7] is not None else 0.0
-            q1,q2,q3,q4 = [float(row[i]) if row[i] is not None else 0.0 for i in range(8, 12)]
-            identificador = int(row[12]) # Eje X
-            
-            # Corregir valores 0
-            d1 = self.validate_values(mac, d1_raw, 'D1')
-            d2 = self.validate_values(mac, d2_raw, 'D2')
-            d3 = self.validate_values(mac, d3_raw, 'D3')
-
-            # --- Lógica de Deque (Cola) ---
-            self.datos_sensores[mac]['D1'].append(d1)
-            self.datos_sensores[mac]['D2'].append(d2)
-            self.datos_sensores[mac]['D3'].append(d3)
-            self.datos_sensores[mac]['temperatura'].append(temp)
-            self.datos_sensores[mac]['humedad'].append(hum)
-            self.datos_sensores[mac]['quaterniones'].append((q1, q2, q3, q4))
-            self.datos_sensores[mac]['muestras'].append(identificador)
-            
-            # --- Actualización en Vivo ---
-            # Si el timer está activo, actualizamos la gráfica visible
-            if self.update_timer and self.update_timer.isActive():
-                if mac in self.widgets_graficas and self.widgets_graficas[mac].isVisible():
-                    datos_sensor = self.datos_sensores[mac]
-                    self.widgets_graficas[mac].actualizar_grafica(datos_sensor, self.seccion_actual)
+            self.datos_sensores[mac] = LectorBuffer(nombre)
+        except FileNotFoundError:
+            # El proceso de ingesta ya lo liberó (aviso que llegó al cerrar)
+            logging.warning(f"El buffer compartido de {mac} ya no existe.")
+            return
+        self.agregar_al_directorio(mac, capa)
+        if self.carga_inicial_lista:
+            self.actualizar_display_graficas()
 
-        except Exception as e:
-            logging.error(f"Error procesando fila {row}: {e}")
+    @Slot(dict)
+    def on_sensores_avanzaron(self, avance):
+        """
+        Esos sensores tienen muestras nuevas en la memoria compartida: leer
+        su cabecera (O(1) por sensor) y marcarlos para el próximo cuadro.
+        """
+        for mac in avance:
+            datos = self.datos_sensores.get(mac)
+            if datos is None or not datos.refrescar():
+                continue
+            if len(datos):
+                self.directorio.visto(mac, datos['fecha'][-1])
+        self.marcar_sucios(avance.keys())
+
+    @Slot(str, object, object, object)
+    def enviar_pedido_historico(self, mac, desde, hasta, bucket):
+        self.ordenes_ingesta.put(('historico', mac, desde, hasta, bucket))
+
+    # --- Histórico (zoom fuera del buffer) ---
+
+    @Slot(str, object, object, object)
+    def on_solicitar_historico(self, mac, desde, hasta, ancho_px):
+        """Un widget quiere ver un rango fuera del buffer: usar caché o pedirlo al worker."""
+        bucket = calcular_bucket(desde, hasta, ancho_px)
+        desde, hasta = alinear_rango(desde, hasta, bucket)
+        datos = self.cache_historico.obtener((mac, bucket, desde, hasta))
+        if datos is not None:
+            self.mostrar_historico(mac, datos)
+            return
+        self.ui.statusbar.showMessage(f"Consultando histórico de {mac}...")
+        self.pedir_historico.emit(mac, desde, hasta, bucket)
+
+    @Slot(str, object, object, object, object)
+    def on_historico_listo(self, mac, desde, hasta, bucket, datos):
+        """El worker terminó la consulta agregada."""
+        self.cache_historico.guardar((mac, bucket, desde, hasta), datos)
+        self.mostrar_historico(mac, datos)
+
+    def mostrar_historico(self, mac, datos):
+        widget = self.widgets_graficas.get(mac)
+        if widget is not None and widget.isVisible():
+            widget.mostrar_historico(datos)
 
     @Slot(int)
     def on_initial_load_finished(self, sensor_count):
         """Llamado cuando el worker termina la carga inicial."""
         logging.info(f"Carga inicial de BD completada. {sensor_count} sensores encontrados.")
         
-        # Ordenar la lista de MACs
-        self.lista_macs_ordenada = sorted(list(self.datos_sensores.keys()))
+        # El directorio ya está ordenado (cada MAC se insertó en su lugar)
+        self.carga_inicial_lista = True
                 
         # Mostrar la primera página
         self.actualizar_display_graficas()
-        self.ui.statusbar.showMessage(f"Mostrando {len(self.widgets_graficas)} sensores. Carga completa.")
+        self.ui.statusbar.showMessage(f"Mostrando {len(self.directorio)} sensores. Carga completa.")
         
-        # Iniciar el timer de actualizaciones en vivo (ej: cada 2 segundos)
-        if self.update_timer:
-            self.update_timer.start(2000) 
-            logging.info("Timer de actualizacion en vivo iniciado.")
+        # Iniciar el sondeo de actualizaciones en vivo (en multiproceso lo
+        # hace el proceso de ingesta)
+        if not self.multiproceso:
+            self.planificador_sondeo.iniciar()
+
+    @Slot(int, float)
+    def on_estado_sondeo(self, intervalo_ms, latencia_s):
+        """Muestra el intervalo de sondeo actual y la latencia lograda."""
+        self.ui.actualizar_estado_sondeo(intervalo_ms, latencia_s)
 
     # ---(Slots llamados por main.py) ---
 
     def actualizar_display_graficas(self):
         """
-        Muestra/Oculta los widgets de gráfica correctos según la paginación
-        y les pide que se redibujen con la sección actual.
+        Asigna las MACs de la página actual (del filtro del directorio) a
+        los widgets del pool, oculta los que sobran y les pide que se
+        redibujen con la sección actual. Solo se tocan los widgets del pool.
         """
+        if self.vista_general_activa:
+            self.actualizar_vista_general()
+            return
         logging.info(f"Actualizando display: Seccion='{self.seccion_actual}', Pagina={self.pagina_actual}")
         
-        total_sensores = len(self.lista_macs_ordenada)
-        if total_sensores == 0:
-            total_paginas = 1
-        else:
-            total_paginas = math.ceil(total_sensores / SENSORES_POR_PAGINA)
+        total_paginas = self.directorio.total_paginas(self.sensores_por_pagina)
             
         # Asegurarse que la página actual sea válida
         if self.pagina_actual >= total_paginas: self.pagina_actual = total_paginas - 1
         if self.pagina_actual < 0: self.pagina_actual = 0
-            
-        start_index = self.pagina_actual * SENSORES_POR_PAGINA
-        end_index = start_index + SENSORES_POR_PAGINA
         
-        sensores_a_mostrar = self.lista_macs_ordenada[start_index:end_index]
-        logging.info(f"Mostrando sensores (indices {start_index}-{end_index}): {sensores_a_mostrar}")
+        sensores_a_mostrar = self.directorio.pagina(self.pagina_actual, self.sensores_por_pagina)
+        logging.info(f"Mostrando sensores (página {self.pagina_actual}): {sensores_a_mostrar}")
 
-        # Ocultar todos los widgets, luego mostrar solo los de esta página
-        for mac, widget in self.widgets_graficas.items():
-            if mac in sensores_a_mostrar:
+        # Reasignar el pool: el widget i muestra el sensor i de la página
+        self.widgets_graficas = {}
+        for i, widget in enumerate(self.pool_graficas):
+            if i < len(sensores_a_mostrar):
+                mac = sensores_a_mostrar[i]
+                if widget.mac != mac:
+                    widget.asignar_sensor(mac)
+                self.widgets_graficas[mac] = widget
+                widget.show()
                 datos_del_sensor = self.datos_sensores.get(mac)
                 if datos_del_sensor:
                     widget.actualizar_grafica(datos_del_sensor, self.seccion_actual)
-                widget.show()
             else:
                 widget.hide()
+                if widget.mac is not None:
+                    widget.asignar_sensor(None)
             
         # Actualizar estado de paginación en la UI
         hay_anterior = self.pagina_actual > 0
-        hay_siguiente = end_index < total_sensores
+        hay_siguiente = self.pagina_actual < total_paginas - 1
         
         self.ui.actualizar_estado_paginacion(
             self.pagina_actual, total_paginas, hay_anterior, hay_siguiente
         )
 
+    def actualizar_vista_general(self):
+        """Arma los mosaicos con los sensores del filtro y la sección actual; se pintan por cuadros."""
+        macs = self.directorio.filtrados()
+        self.ui.vista_general.asignar(macs, self.seccion_actual, self.datos_sensores)
+        self.ui.actualizar_estado_vista_general(len(macs))
+        self.planificador_general.marcar_sucios(macs)
+
+    @Slot()
+    def repintar_vista_general(self):
+        """La vista general cambió de columnas: todos los mosaicos se vuelven a pintar."""
+        self.planificador_general.marcar_sucios(self.ui.vista_general.macs)
+
+    @Slot(bool)
+    def on_vista_general(self, activa):
+        """Slot del botón 'Vista general': cambia entre las páginas y todos los sensores."""
+        logging.info(f"Vista general {'activada' if activa else 'desactivada'}.")
+        self.vista_general_activa = activa
+        self.ui.mostrar_vista_general(activa)
+        if activa:
+            self.planificador_general.iniciar()
+        else:
+            self.planificador_general.detener()
+            # Las gráficas de la página no se redibujaron mientras tanto
+            self.planificador_render.marcar_sucios(self.widgets_graficas.keys())
+        self.actualizar_display_graficas()
+
+    @Slot(str)
+    def abrir_sensor(self, mac):
+        """Slot llamado al hacer click en un mosaico: sale de la vista general a la página del sensor."""
+        pagina = self.directorio.pagina_de(mac, self.sensores_por_pagina)
+        if pagina is None:
+            # Salió del filtro de actividad desde que se armaron los mosaicos
+            self.directorio.filtrar()
+            self.ui.limpiar_filtro()
+            pagina = self.directorio.pagina_de(mac, self.sensores_por_pagina)
+        self.pagina_actual = pagina
+        self.ui.btn_vista_general.setChecked(False) # Llama a on_vista_general(False)
+        self.ui.statusbar.showMessage(f"Sensor {mac}: página {pagina + 1}.")
+
     @Slot(QObject, bool)
     def on_radio_button_toggled(self, radio_button, checked):
         """Slot llamado cuando CUALQUIER radio button cambia."""
@@ -217,29 +556,135 @@ class AppLogica(QObject):
         self.pagina_actual -= 1
         self.actualizar_display_graficas()
 
+    @Slot()
+    def on_filtro_cambiado(self):
+        """Slot llamado al escribir en la búsqueda o cambiar capa/actividad."""
+        texto, capa, max_antiguedad_s = self.ui.obtener_filtro()
+        self.directorio.filtrar(texto, capa, max_antiguedad_s)
+        self.pagina_actual = 0
+        self.actualizar_display_graficas()
+
+    @Slot()
+    def ir_a_sensor(self):
+        """
+        Slot llamado con Enter en la búsqueda: quita el filtro de texto y
+        va a la página del mejor resultado (el primero que empieza con el
+        texto, si no el primero que lo contiene), para verlo con sus vecinos.
+        """
+        texto, capa, max_antiguedad_s = self.ui.obtener_filtro()
+        if not texto.strip():
+            self.ui.statusbar.showMessage("Falta el texto a buscar (parte de una MAC).")
+            return
+        resultados = self.directorio.buscar(texto)
+        if not resultados:
+            self.ui.statusbar.showMessage(f"Ningún sensor coincide con '{texto}'.")
+            return
+        mac = resultados[0]
+
+        self.directorio.filtrar(None, capa, max_antiguedad_s)
+        pagina = self.directorio.pagina_de(mac, self.sensores_por_pagina)
+        if pagina is None:
+            # No pasa el filtro de capa o actividad: mostrar todos
+            self.directorio.filtrar()
+            pagina = self.directorio.pagina_de(mac, self.sensores_por_pagina)
+            self.ui.limpiar_filtro()
+        else:
+            self.ui.limpiar_filtro(solo_texto=True)
+        self.pagina_actual = pagina
+        if self.vista_general_activa:
+            self.ui.btn_vista_general.setChecked(False) # Abre la página del sensor
+        else:
+            self.actualizar_display_graficas()
+        self.ui.statusbar.showMessage(f"Sensor {mac}: página {pagina + 1}.")
+
+    # --- Exportación ---
+
+    @Slot()
+    def on_exportar(self):
+        """Slot del botón 'Exportar...': pide las opciones y arranca el exportador en su hilo."""
+        if self.exportador is not None:
+            return
+        nombre = time.strftime("sensores_%Y%m%d_%H%M%S.csv.gz")
+        fuente_propia = self.fuente.duplicar()
+        valores = self.ui.pedir_exportacion(os.path.join(CARPETA_EXPORTACION, nombre), fuente_propia is not None)
+        if valores is None:
+            return
+        alcance, origen, desde, hasta, ruta = valores
+
+        macs = self.macs_a_exportar(alcance, origen)
+        if macs is not None and not macs:
+            self.ui.statusbar.showMessage("No hay sensores para exportar con esa selección.")
+            return
+
+        self.exportador = ExportadorDatos(ruta, origen, macs, desde, hasta, dict(self.directorio.capas),
+                                          fuente_propia if origen == 'servidor' else None)
+        self.hilo_exportacion = QThread()
+        self.exportador.moveToThread(self.hilo_exportacion)
+        self.hilo_exportacion.started.connect(self.exportador.iniciar)
+        self.exportador.pedir_sensor.connect(self.on_pedir_sensor_exportacion)
+        self.enviar_sensor_exportacion.connect(self.exportador.agregar_sensor)
+        self.exportador.progreso.connect(self.ui.actualizar_progreso_exportacion)
+        self.exportador.terminado.connect(self.on_exportacion_terminada)
+        self.exportador.fallo.connect(self.on_exportacion_fallida)
+        self.hilo_exportacion.start()
+        self.ui.exportacion_en_curso(True)
+        self.ui.statusbar.showMessage(f"Exportando a {ruta}...")
+
+    def macs_a_exportar(self, alcance, origen):
+        """Sensores del alcance elegido; None = toda la tabla (solo del servidor)."""
+        if alcance == 'sensor':
+            texto = self.ui.obtener_filtro()[0]
+            return self.directorio.buscar(texto)[:1] if texto.strip() else []
+        if alcance == 'pagina':
+            return self.directorio.pagina(self.pagina_actual, self.sensores_por_pagina)
+        if alcance == 'filtro':
+            return list(self.directorio.filtrados())
+        return None if origen == 'servidor' else list(self.directorio.macs)
+
+    @Slot(str, object, object)
+    def on_pedir_sensor_exportacion(self, mac, desde, hasta):
+        """El exportador pide la copia de un sensor (los buffers solo se leen en este hilo)."""
+        columnas = None
+        datos = self.datos_sensores.get(mac)
+        if datos is not None and len(datos):
+            try:
+                columnas = datos.copiar(desde, hasta)
+            except ValueError as e:
+                logging.warning(f"No se pudo copiar {mac} para exportar: {e}")
+        self.enviar_sensor_exportacion.emit(mac, columnas)
+
+    @Slot()
+    def cancelar_exportacion(self):
+        if self.exportador is not None:
+            self.exportador.cancelar()
+
+    @Slot(str, int)
+    def on_exportacion_terminada(self, ruta, filas):
+        if self.exportador is None:
+            return # Aviso que llegó después de detener
+        self.cerrar_exportacion()
+        self.ui.statusbar.showMessage(f"Exportación terminada: {filas:,} filas en {ruta}")
+
+    @Slot(str)
+    def on_exportacion_fallida(self, mensaje):
+        if self.exportador is None:
+            return
+        self.cerrar_exportacion()
+        self.ui.statusbar.showMessage(mensaje)
+
+    def cerrar_exportacion(self):
+        """Detiene el hilo del exportador y lo suelta (el siguiente se crea de nuevo)."""
+        self.enviar_sensor_exportacion.disconnect(self.exportador.agregar_sensor)
+        self.hilo_exportacion.quit()
+        self.hilo_exportacion.wait()
+        self.exportador = None
+        self.hilo_exportacion = None
+        self.ui.exportacion_en_curso(False)
+
     # --- Funciones de Ayuda (Lógica de Datos) ---
 
     def inicializar_estructura_datos(self, mac):
-        """Crea la estructura de deques (colas) para un nuevo sensor."""
+        """Crea el buffer circular (arreglos de NumPy) para un nuevo sensor."""
         logging.info(f"Inicializando estructura de datos para nueva MAC: {mac}")
-        self.datos_sensores[mac] = {
-            'muestras': deque(maxlen=MAX_MUESTRAS),  
-            'D1': deque(maxlen=MAX_MUESTRAS),
-            'D2': deque(maxlen=MAX_MUESTRAS),
-            'D3': deque(maxlen=MAX_MUESTRAS),
-            'temperatura': deque(maxlen=MAX_MUESTRAS),
-            'humedad': deque(maxlen=MAX_MUESTRAS),
-            'quaterniones': deque(maxlen=MAX_MUESTRAS) 
-        }
+        self.datos_sensores[mac] = BufferSensor(MAX_MUESTRAS)
         self.ultimos_valores_validos[mac] = {'D1': None, 'D2': None, 'D3': None}
-
-    def validate_values(self, mac, distancia_actual, tipo_distancia):
-        """Corrige valores cero (o inválidos)."""
-        if distancia_actual <= 0:
-            if self.ultimos_valores_validos[mac].get(tipo_distancia) is not None:
-                return self.ultimos_valores_validos[mac][tipo_distancia]
-            else:
-                return 0.0 # No hay valor previo, devolver 0
-        
-        self.ultimos_valores_validos[mac][tipo_distancia] = distancia_actual
-        return distancia_actual
\ No newline at end of file
@@ -0,0 +1,77 @@
+import math
+from collections import OrderedDict
+import numpy as np
+
+from .Orientacion import ANGULOS, cuaterniones_a_euler
+
+# Columnas agregadas que devuelve la consulta de histórico, en orden.
+# Cada una trae (mínimo, promedio, máximo) por bucket.
+CANALES_HISTORICO = ['D1', 'D2', 'D3', 'temperatura', 'humedad', 'Q1', 'Q2', 'Q3', 'Q4']
+
+MAX_ENTRADAS_CACHE = 64
+
+
+def clave_historico(canal, columna):
+    """Nombre en el histórico de una línea de la gráfica (canal del buffer, columna)."""
+    if canal == 'quaterniones':
+        return f'Q{columna + 1}'
+    if canal == 'orientacion':
+        return ANGULOS[columna]
+    return canal
+
+
+def calcular_bucket(inicio, fin, ancho_px):
+    """
+    Tamaño de bucket (en Identificadores) para que el rango quepa en el
+    ancho en pixeles. Se redondea a potencia de 2 para que vistas
+    parecidas caigan en el mismo bucket y aprovechen la caché.
+    """
+    bruto = max(1.0, (fin - inicio) / max(1, ancho_px))
+    return 2 ** math.ceil(math.log2(bruto))
+
+
+def alinear_rango(inicio, fin, bucket):
+    """Extiende el rango a múltiplos del bucket."""
+    return (inicio // bucket) * bucket, -(-fin // bucket) * bucket
+
+
+def filas_a_historico(filas, bucket):
+    """
+    Convierte las filas agregadas (Bucket, min, avg, max, ...) en arreglos:
+    'muestras' con el centro de cada bucket y, por canal, un arreglo (N, 3)
+    con [mínimo, promedio, máximo]. Los NULL quedan como NaN.
+
+    La orientación sale del cuaternión promedio del bucket; el mínimo y
+    máximo por componente no dan ángulos, así que su rango queda vacío
+    (mínimo = promedio = máximo).
+    """
+    datos = np.array(filas, dtype=np.float64).reshape(-1, 1 + 3 * len(CANALES_HISTORICO))
+    resultado = {'muestras': datos[:, 0] * bucket + bucket / 2}
+    for i, canal in enumerate(CANALES_HISTORICO):
+        resultado[canal] = datos[:, 1 + 3 * i:4 + 3 * i]
+
+    promedios = np.column_stack([resultado[f'Q{i}'][:, 1] for i in range(1, 5)])
+    angulos = cuaterniones_a_euler(promedios)
+    for i, angulo in enumerate(ANGULOS):
+        resultado[angulo] = np.repeat(angulos[:, i:i + 1], 3, axis=1)
+    return resultado
+
+
+class CacheHistorico:
+    """Caché LRU de consultas de histórico por (MAC, bucket, inicio, fin)."""
+
+    def __init__(self, max_entradas=MAX_ENTRADAS_CACHE):
+        self.max_entradas = max_entradas
+        self.entradas = OrderedDict()
+
+    def obtener(self, clave):
+        datos = self.entradas.get(clave)
+        if datos is not None:
+            self.entradas.move_to_end(clave) # Usado recientemente
+        return datos
+
+    def guardar(self, clave, datos):
+        self.entradas[clave] = datos
+        self.entradas.move_to_end(clave)
+        while len(self.entradas) > self.max_entradas:
+            self.entradas.popitem(last=False) # Sacar el menos usado
@@ -0,0 +1,178 @@
+import logging
+import math
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+from .BufferSensor import BufferSensor, CANALES, tamano_fisico
+from .Estadisticas import ResumenEstadisticas, CONSULTAS, CLAVES
+
+# Configurar logging para este módulo
+logger = logging.getLogger(__name__)
+
+# Cabecera (int64) al inicio de cada bloque: posiciones de los campos
+SECUENCIA, CAPACIDAD, INICIO, FIN, TOTAL = range(5)
+CAMPOS_CABECERA = 8 # Con espacio libre para no cambiar la disposición si se agrega algo
+
+# Intentos de lectura mientras el escritor está a la mitad de un lote.
+# Si se agotan (el proceso de ingesta murió escribiendo) se deja lo anterior.
+REINTENTOS_LECTURA = 1000
+
+
+def _disposicion(capacidad):
+    """
+    Partes del bloque compartido de un sensor: [(nombre, dtype, forma, offset)]
+    y el tamaño total en bytes. Todo es de 8 bytes, así que queda alineado.
+    """
+    partes = [
+        ('cabecera', np.int64, (CAMPOS_CABECERA,)),
+        ('resumen', np.float64, (len(CONSULTAS), len(CLAVES))), # EstadisticasSensor.resumen()
+    ]
+    tamano = tamano_fisico(capacidad)
+    partes += [(canal, dtype, (tamano,) + forma) for canal, (dtype, forma) in CANALES.items()]
+
+    disposicion = []
+    offset = 0
+    for nombre, dtype, forma in partes:
+        disposicion.append((nombre, dtype, forma, offset))
+        offset += math.prod(forma) * np.dtype(dtype).itemsize
+    return disposicion, offset
+
+
+def _vistas(memoria, capacidad):
+    """Arreglos de NumPy sobre el bloque compartido (sin copiar)."""
+    disposicion, _ = _disposicion(capacidad)
+    return {
+        nombre: np.ndarray(forma, dtype=dtype, buffer=memoria.buf, offset=offset)
+        for nombre, dtype, forma, offset in disposicion
+    }
+
+
+class BufferCompartido(BufferSensor):
+    """
+    BufferSensor con los arreglos en un bloque de memoria compartida
+    (multiprocessing.shared_memory). Lo escribe el proceso de ingesta; la
+    GUI lo abre con LectorBuffer usando 'nombre'.
+
+    Además de los canales, el bloque tiene una cabecera (inicio, fin y
+    total del buffer) y el resumen de las estadísticas. Cada lote se
+    escribe dentro de un seqlock: la secuencia queda impar mientras se
+    escribe y par al terminar, así el lector sabe si leyó un estado a
+    medias y vuelve a leer.
+    """
+
+    def __init__(self, capacidad):
+        self.memoria = shared_memory.SharedMemory(create=True, size=_disposicion(capacidad)[1])
+        self.vistas = _vistas(self.memoria, capacidad)
+        super().__init__(capacidad)
+        self.cabecera = self.vistas['cabecera']
+        self.cabecera[CAPACIDAD] = capacidad
+        self.vistas['resumen'][:] = math.nan
+
+    @property
+    def nombre(self):
+        return self.memoria.name
+
+    def _crear_arreglos(self):
+        return {canal: self.vistas[canal] for canal in CANALES}
+
+    def agregar_lote(self, columnas):
+        self.cabecera[SECUENCIA] += 1 # Impar: escribiendo
+        try:
+            super().agregar_lote(columnas)
+            # El resumen se calcula aquí, en el proceso de ingesta; la GUI solo lo lee
+            self.vistas['resumen'][:] = self.estadisticas.resumen()
+            self.cabecera[INICIO] = self.inicio
+            self.cabecera[FIN] = self.fin
+            self.cabecera[TOTAL] = self.total
+        finally:
+            self.cabecera[SECUENCIA] += 1
+
+    def cerrar(self):
+        """Libera el bloque (solo lo hace el proceso que lo creó)."""
+        self.arreglos = {}
+        self.vistas = {}
+        self.cabecera = None
+        try:
+            self.memoria.close()
+        except BufferError:
+            pass # Quedan vistas vivas; la memoria se libera al terminar el proceso
+        self.memoria.unlink()
+
+
+class LectorBuffer(BufferSensor):
+    """
+    Vista de solo lectura (en el proceso de la GUI) de un BufferCompartido.
+    Se usa igual que BufferSensor: datos['D1'], len(datos), datos.total,
+    datos.estadisticas; no se puede agregar.
+
+    La posición de la ventana y las estadísticas se actualizan con
+    refrescar() (al llegar el aviso de que el sensor avanzó), no en cada
+    acceso. Las vistas no se copian: si el escritor compacta el buffer
+    mientras se dibuja, ese cuadro puede salir mezclado; el siguiente ya
+    lee la posición nueva.
+    """
+
+    def __init__(self, nombre):
+        self.memoria = shared_memory.SharedMemory(name=nombre)
+        cabecera = np.ndarray((CAMPOS_CABECERA,), dtype=np.int64, buffer=self.memoria.buf)
+        capacidad = int(cabecera[CAPACIDAD])
+        del cabecera
+        self.vistas = _vistas(self.memoria, capacidad)
+        for vista in self.vistas.values():
+            vista.flags.writeable = False
+        super().__init__(capacidad)
+        self.cabecera = self.vistas['cabecera']
+        self._resumen = ResumenEstadisticas()
+        self.refrescar()
+
+    def _crear_arreglos(self):
+        return {canal: self.vistas[canal] for canal in CANALES}
+
+    @property
+    def estadisticas(self):
+        """Las que publicó el proceso de ingesta en la última lectura."""
+        return self._resumen
+
+    def refrescar(self):
+        """Lee la cabecera y el resumen publicados (reintenta si el escritor está a la mitad)."""
+        if self.cabecera is None:
+            return False # Ya se cerró (avisos que llegaron al salir)
+        for _ in range(REINTENTOS_LECTURA):
+            secuencia = int(self.cabecera[SECUENCIA])
+            if secuencia % 2 == 0:
+                inicio, fin, total = (int(v) for v in self.cabecera[INICIO:TOTAL + 1])
+                resumen = self.vistas['resumen'].copy()
+                if int(self.cabecera[SECUENCIA]) == secuencia:
+                    self.inicio, self.fin, self.total = inicio, fin, total
+                    self._resumen = ResumenEstadisticas(resumen)
+                    return True
+            time.sleep(0)
+        logger.warning(f"Memoria compartida {self.memoria.name}: el escritor no terminó el lote, se deja lo anterior.")
+        return False
+
+    def copiar(self, desde=None, hasta=None):
+        """Como BufferSensor.copiar, pero vuelve a copiar si el escritor agregó un lote mientras tanto."""
+        if self.cabecera is None:
+            raise ValueError("El buffer compartido ya se cerró")
+        for _ in range(REINTENTOS_LECTURA):
+            secuencia = int(self.cabecera[SECUENCIA])
+            if secuencia % 2 == 0 and self.refrescar():
+                copia = super().copiar(desde, hasta)
+                if int(self.cabecera[SECUENCIA]) == secuencia:
+                    return copia
+            time.sleep(0)
+        logger.warning(f"Memoria compartida {self.memoria.name}: la copia puede salir mezclada (el escritor no se detuvo).")
+        return super().copiar(desde, hasta)
+
+    def agregar_lote(self, columnas):
+        raise TypeError("LectorBuffer es de solo lectura: los datos los agrega el proceso de ingesta")
+
+    def cerrar(self):
+        self.arreglos = {}
+        self.vistas = {}
+        self.cabecera = None
+        try:
+            self.memoria.close()
+        except BufferError:
+            pass # Alguna gráfica todavía tiene vistas; se libera al salir
@@ -0,0 +1,142 @@
+import bisect
+import json
+import math
+import os
+import threading
+import time
+
+# Límites de los buckets (como los 'le' de Prometheus)
+LIMITES_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+LIMITES_S = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 300, 900, 3600)
+
+
+class Histograma:
+    """Histograma de buckets fijos: cuentas por bucket, total y suma."""
+
+    def __init__(self, limites=LIMITES_MS):
+        self.limites = tuple(limites)
+        self.cuentas = [0] * (len(self.limites) + 1) # El último es +Inf
+        self.total = 0
+        self.suma = 0.0
+
+    def observar(self, valor):
+        self.cuentas[bisect.bisect_left(self.limites, valor)] += 1
+        self.total += 1
+        self.suma += valor
+
+    def percentil(self, p):
+        """Aproximado: el límite superior del bucket donde cae el percentil."""
+        if not self.total:
+            return None
+        objetivo = p / 100 * self.total
+        acumulado = 0
+        for limite, cuenta in zip(self.limites + (math.inf,), self.cuentas):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return limite
+        return math.inf
+
+
+class Metricas:
+    """
+    Registro de métricas del proceso (una instancia global: 'metricas').
+    Deshabilitado por defecto; así cada punto de medición cuesta solo
+    revisar una bandera:
+
+        inicio = metricas.reloj()             # 0.0 si está deshabilitado
+        ...
+        metricas.observar_desde('nombre_ms', inicio)
+
+    Se puede usar desde el hilo del worker y desde el de la GUI.
+    """
+
+    def __init__(self):
+        self.habilitado = False
+        self.histogramas = {} # (nombre, etiquetas) -> Histograma
+        self.medidores = {}   # (nombre, etiquetas) -> valor
+        self.candado = threading.Lock()
+
+    def reloj(self):
+        return time.perf_counter() if self.habilitado else 0.0
+
+    def observar_desde(self, nombre, inicio, etiquetas=()):
+        """Observa el tiempo (ms) transcurrido desde 'inicio' (de reloj())."""
+        if self.habilitado:
+            self.observar(nombre, (time.perf_counter() - inicio) * 1000, etiquetas)
+
+    def observar(self, nombre, valor, etiquetas=(), limites=LIMITES_MS):
+        if not self.habilitado:
+            return
+        clave = (nombre, etiquetas)
+        with self.candado:
+            histograma = self.histogramas.get(clave)
+            if histograma is None:
+                histograma = self.histogramas[clave] = Histograma(limites)
+            histograma.observar(valor)
+
+    def fijar(self, nombre, valor, etiquetas=()):
+        """Medidor (gauge): guarda el último valor."""
+        if self.habilitado:
+            self.medidores[(nombre, etiquetas)] = valor
+
+    def percentil(self, nombre, p, etiquetas=()):
+        histograma = self.histogramas.get((nombre, etiquetas))
+        return histograma.percentil(p) if histograma else None
+
+    # --- Exportación ---
+
+    def a_dict(self):
+        with self.candado:
+            histogramas = [
+                {
+                    'nombre': nombre, 'etiquetas': dict(etiquetas),
+                    'total': h.total, 'suma': h.suma,
+                    'p50': h.percentil(50), 'p99': h.percentil(99),
+                    'buckets': dict(zip([str(l) for l in h.limites] + ['+Inf'], h.cuentas)),
+                }
+                for (nombre, etiquetas), h in sorted(self.histogramas.items())
+            ]
+        medidores = [
+            {'nombre': nombre, 'etiquetas': dict(etiquetas), 'valor': valor}
+            for (nombre, etiquetas), valor in sorted(self.medidores.items())
+        ]
+        return {'histogramas': histogramas, 'medidores': medidores}
+
+    def a_prometheus(self, prefijo='sensores_'):
+        """Formato de texto de Prometheus (node_exporter textfile)."""
+        lineas = []
+        with self.candado:
+            for (nombre, etiquetas), h in sorted(self.histogramas.items()):
+                base = _etiquetas(etiquetas)
+                acumulado = 0
+                for limite, cuenta in zip(h.limites + (math.inf,), h.cuentas):
+                    acumulado += cuenta
+                    le = '+Inf' if limite == math.inf else repr(float(limite))
+                    lineas.append(f'{prefijo}{nombre}_bucket{_etiquetas(etiquetas + (("le", le),))} {acumulado}')
+                lineas.append(f'{prefijo}{nombre}_sum{base} {h.suma}')
+                lineas.append(f'{prefijo}{nombre}_count{base} {h.total}')
+        for (nombre, etiquetas), valor in sorted(self.medidores.items()):
+            lineas.append(f'{prefijo}{nombre}{_etiquetas(etiquetas)} {valor}')
+        return '\n'.join(lineas) + '\n'
+
+    def escribir(self, ruta):
+        """Escribe el archivo (JSON si termina en .json, si no texto Prometheus)."""
+        if ruta.endswith('.json'):
+            texto = json.dumps(self.a_dict(), indent=1)
+        else:
+            texto = self.a_prometheus()
+        # Temporal + reemplazo para que quien lo lea nunca vea un archivo a medias
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(texto)
+        os.replace(temporal, ruta)
+
+
+def _etiquetas(etiquetas):
+    if not etiquetas:
+        return ''
+    return '{' + ','.join(f'{clave}="{valor}"' for clave, valor in etiquetas) + '}'
+
+
+# Instancia global del proceso
+metricas = Metricas()
@@ -0,0 +1,28 @@
+import numpy as np
+
+# Ángulos que se derivan de cada cuaternión, en orden de columna
+ANGULOS = ('roll', 'pitch', 'yaw')
+
+
+def cuaterniones_a_euler(q):
+    """
+    Convierte un bloque de cuaterniones (N, 4) en el orden de la tabla
+    (Q1=W, Q2=X, Q3=Y, Q4=Z) a ángulos (N, 3): roll, pitch y yaw en grados
+    (convención aeronáutica Z-Y-X). Todo el bloque se calcula a la vez.
+
+    Se normaliza antes de convertir; un cuaternión nulo (filas con NULL,
+    que llegan como 0) se toma como sin rotación.
+    """
+    q = np.asarray(q, dtype=np.float64).reshape(-1, 4)
+    norma = np.sqrt((q * q).sum(axis=1))
+    nulos = ~(norma > 0)
+    norma[nulos] = 1.0
+    w, x, y, z = (q / norma[:, None]).T
+    w = np.where(nulos, 1.0, w)
+
+    angulos = np.empty((len(q), 3))
+    angulos[:, 0] = np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+    # Fuera de [-1, 1] solo por redondeo (cerca de +-90°)
+    angulos[:, 1] = np.arcsin(np.clip(2 * (w * y - z * x), -1.0, 1.0))
+    angulos[:, 2] = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+    return np.degrees(angulos, out=angulos)
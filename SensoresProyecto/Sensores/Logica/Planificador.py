@@ -0,0 +1,146 @@
+from PySide6.QtCore import QObject, QTimer, Slot, Signal
+import logging
+import time
+
+from .Metricas import metricas
+
+# Configurar logging para este módulo
+logger = logging.getLogger(__name__)
+
+class PlanificadorRender(QObject):
+    """
+    Separa la ingesta de datos del dibujo.
+    La lógica solo marca sensores como "sucios" al recibir datos y un único
+    QTimer los redibuja a una tasa máxima de cuadros por segundo (fps).
+    Si un cuadro tarda más que el intervalo, se saltan los cuadros
+    siguientes para que la GUI pueda ponerse al día.
+    """
+
+    def __init__(self, dibujar, fps_max=20, parent=None):
+        """
+        dibujar: función que recibe el set de MACs sucias y las redibuja.
+        """
+        super().__init__(parent)
+        self.dibujar = dibujar
+        self.intervalo_ms = max(1, int(1000 / fps_max))
+        self.sucios = set()
+
+        self.cuadros_a_saltar = 0
+        self.cuadros_dibujados = 0
+        self.cuadros_saltados = 0
+        self.ultimo_cuadro_ms = 0.0 # Duración del último cuadro dibujado
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.on_cuadro)
+
+    def iniciar(self):
+        self.timer.start(self.intervalo_ms)
+        logger.info(f"Planificador de dibujo iniciado ({1000 / self.intervalo_ms:.0f} fps máx.)")
+
+    def detener(self):
+        self.timer.stop()
+
+    def marcar_sucio(self, mac):
+        """Pide redibujar el sensor en el próximo cuadro (no dibuja nada aquí)."""
+        self.sucios.add(mac)
+
+    def marcar_sucios(self, macs):
+        self.sucios.update(macs)
+
+    @Slot()
+    def on_cuadro(self):
+        """Un tick del timer: redibuja lo que esté sucio, si toca."""
+        if not self.sucios:
+            return
+
+        if self.cuadros_a_saltar > 0:
+            # La GUI va atrasada: dejamos pasar este cuadro
+            self.cuadros_a_saltar -= 1
+            self.cuadros_saltados += 1
+            return
+
+        pendientes = self.sucios
+        self.sucios = set()
+
+        inicio = time.perf_counter()
+        try:
+            self.dibujar(pendientes)
+        except Exception as e:
+            logger.error(f"Error al dibujar cuadro: {e}")
+        self.ultimo_cuadro_ms = (time.perf_counter() - inicio) * 1000
+        self.cuadros_dibujados += 1
+        metricas.observar('cuadro_ms', self.ultimo_cuadro_ms)
+
+        # Si el cuadro tardó más que el intervalo, saltar los que se comió
+        if self.ultimo_cuadro_ms > self.intervalo_ms:
+            self.cuadros_a_saltar = int(self.ultimo_cuadro_ms // self.intervalo_ms)
+
+
+class PlanificadorSondeo(QObject):
+    """
+    Decide cuándo buscar datos nuevos en la BD, en lugar de un QTimer fijo.
+    - Página llena (quedan filas pendientes): se vuelve a sondear enseguida.
+    - Llegaron filas: se sondea al intervalo mínimo.
+    - Sondeo vacío: el intervalo crece exponencialmente hasta el máximo.
+    Nunca hay dos sondeos a la vez: el siguiente se programa solo cuando el
+    worker avisa que terminó (poll_finished).
+    """
+
+    # Pide un sondeo al worker (conectar a check_for_updates)
+    sondear = Signal()
+    # Intervalo actual (ms) y latencia lograda (s, ahora - Fecha) tras cada sondeo
+    estado_actualizado = Signal(int, float)
+
+    def __init__(self, intervalo_min_ms=250, intervalo_max_ms=5000, factor=2.0, parent=None):
+        super().__init__(parent)
+        self.intervalo_min_ms = intervalo_min_ms
+        self.intervalo_max_ms = intervalo_max_ms
+        self.factor = factor
+
+        self.intervalo_ms = intervalo_min_ms # Espera antes del próximo sondeo
+        self.latencia_s = 0.0                # Del último sondeo que trajo filas
+        self.en_curso = False
+        self.activo = False
+        self.sondeos = 0
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.on_timeout)
+
+    def iniciar(self):
+        self.activo = True
+        self.intervalo_ms = self.intervalo_min_ms
+        if not self.en_curso:
+            self.timer.start(self.intervalo_ms)
+        logger.info(f"Planificador de sondeo iniciado ({self.intervalo_min_ms}-{self.intervalo_max_ms} ms)")
+
+    def detener(self):
+        self.activo = False
+        self.timer.stop()
+
+    @Slot()
+    def on_timeout(self):
+        if not self.activo or self.en_curso:
+            return
+        self.en_curso = True
+        self.sondeos += 1
+        self.sondear.emit()
+
+    @Slot(int, bool, float)
+    def on_sondeo_terminado(self, filas, al_dia, retraso_s):
+        """Resultado del sondeo: programa el siguiente según lo que trajo."""
+        self.en_curso = False
+        if filas > 0:
+            self.latencia_s = retraso_s
+
+        if not al_dia:
+            self.intervalo_ms = 0 # Hay rezago: seguir sin esperar
+        elif filas > 0:
+            self.intervalo_ms = self.intervalo_min_ms
+        else:
+            self.intervalo_ms = min(self.intervalo_max_ms,
+                                    max(self.intervalo_min_ms, int(self.intervalo_ms * self.factor)))
+
+        self.estado_actualizado.emit(self.intervalo_ms, self.latencia_s)
+        if self.activo:
+            self.timer.start(self.intervalo_ms)
@@ -0,0 +1,128 @@
+import logging
+import math
+import numpy as np
+
+# Configurar logging para este módulo
+logger = logging.getLogger(__name__)
+
+# Índices de las columnas en las filas de Data_sensor
+COL_MAC, COL_CAPA, COL_PAQUETE = 0, 1, 2
+COL_NUMERICAS = slice(3, 12)   # Distancia_1 .. Q4
+COL_IDENTIFICADOR, COL_FECHA = 12, 13
+
+
+def filas_a_columnas(filas):
+    """
+    Convierte una lista de filas de UN sensor en arreglos por canal
+    (los mismos canales de BufferSensor). Los valores None se toman como 0.
+    Las distancias salen sin corregir; ver corregir_ceros.
+    """
+    try:
+        return _convertir(filas)
+    except (TypeError, ValueError):
+        # Alguna fila trae datos inválidos: convertir una por una y descartarla
+        validas = []
+        for row in filas:
+            try:
+                _convertir([row])
+                validas.append(row)
+            except (TypeError, ValueError) as e:
+                logger.error(f"Error procesando fila {row}: {e}")
+        return _convertir(validas)
+
+
+def _convertir(filas):
+    bruto = np.array([row[COL_NUMERICAS] for row in filas], dtype=object).reshape(-1, 9)
+    bruto[bruto == None] = 0.0 # Comparación elemento a elemento (aquí no sirve 'is')
+    numericos = bruto.astype(np.float64)
+
+    return {
+        'muestras': np.array([int(row[COL_IDENTIFICADOR]) for row in filas], dtype=np.int64), # Eje X
+        'fecha': np.array(
+            [row[COL_FECHA].timestamp() if row[COL_FECHA] is not None else math.nan for row in filas],
+            dtype=np.float64
+        ),
+        'paquete': np.array([int(row[COL_PAQUETE] or 0) for row in filas], dtype=np.int64),
+        'D1': numericos[:, 0],
+        'D2': numericos[:, 1],
+        'D3': numericos[:, 2],
+        'temperatura': numericos[:, 3],
+        'humedad': numericos[:, 4],
+        'quaterniones': numericos[:, 5:9],
+    }
+
+
+def agrupar_por_sensor(filas):
+    """{mac: [filas]} conservando el orden de llegada."""
+    filas_por_sensor = {}
+    for row in filas:
+        filas_por_sensor.setdefault(row[COL_MAC], []).append(row)
+    return filas_por_sensor
+
+
+def columnas_corregidas(filas, ultimos, ultima_muestra=None):
+    """
+    filas_a_columnas de UN sensor con las distancias ya corregidas
+    (corregir_ceros), continuando desde 'ultimos' ({canal: último valor
+    válido} del bloque anterior, que se actualiza aquí).
+
+    Se descartan antes las filas que no van después de 'ultima_muestra'
+    (Identificador más nuevo del buffer), ver descartar_desordenadas.
+    """
+    columnas = descartar_desordenadas(filas_a_columnas(filas), ultima_muestra)
+    if len(columnas['muestras']):
+        for canal in ('D1', 'D2', 'D3'):
+            columnas[canal], ultimos[canal] = corregir_ceros(columnas[canal], ultimos[canal])
+    return columnas
+
+
+def descartar_desordenadas(columnas, ultima_muestra=None):
+    """
+    Deja solo las filas cuyo Identificador es mayor que todos los
+    anteriores (los del bloque y 'ultima_muestra'), para que 'muestras'
+    siga ordenado en el buffer: la decimación y los límites del zoom usan
+    searchsorted.
+
+    Las filas que se confirman tarde (DatabaseWorker._revisar_tardias)
+    traen un Identificador anterior al final del buffer; no se intercalan
+    en el buffer circular (movería las estadísticas y la memoria
+    compartida), se descartan de las gráficas. Siguen en la caché local
+    y en el servidor (p. ej. al exportar desde el servidor).
+    """
+    muestras = columnas['muestras']
+    if not len(muestras):
+        return columnas
+    minimo = np.iinfo(np.int64).min if ultima_muestra is None else ultima_muestra
+    anteriores = np.maximum.accumulate(np.concatenate(([minimo], muestras[:-1])))
+    en_orden = muestras > anteriores
+    if en_orden.all():
+        return columnas
+    logger.debug(f"Se descartan {int((~en_orden).sum())} filas fuera de orden (Identificador ya pasado).")
+    return {canal: valores[en_orden] for canal, valores in columnas.items()}
+
+
+def corregir_ceros(valores, ultimo_valido=None):
+    """
+    Corrige valores cero (o inválidos) de todo un bloque a la vez.
+    Cada valor <= 0 se reemplaza por el último valor válido anterior
+    (dentro del bloque o 'ultimo_valido' del bloque previo); si nunca hubo
+    uno, queda en 0. Da exactamente lo mismo que corregir fila por fila.
+
+    Devuelve (valores corregidos, nuevo último valor válido).
+    """
+    valores = np.asarray(valores, dtype=np.float64)
+    # '~(<= 0)' y no '> 0' para que NaN cuente como válido, igual que antes
+    validos = ~(valores <= 0)
+    if validos.all():
+        return valores, (float(valores[-1]) if len(valores) else ultimo_valido)
+
+    # Índice del último valor válido visto hasta cada posición (-1 = ninguno)
+    indices = np.where(validos, np.arange(len(valores)), -1)
+    np.maximum.accumulate(indices, out=indices)
+
+    semilla = 0.0 if ultimo_valido is None else ultimo_valido
+    corregidos = np.where(indices >= 0, valores[indices], semilla)
+
+    if indices[-1] >= 0:
+        ultimo_valido = float(valores[indices[-1]])
+    return corregidos, ultimo_valido
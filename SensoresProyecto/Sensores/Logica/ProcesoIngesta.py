@@ -0,0 +1,230 @@
+import logging
+import multiprocessing
+import queue
+from PySide6.QtCore import QCoreApplication, QObject, QThread, QTimer, Signal, Slot, Qt
+
+from .ConexionBD import DatabaseWorker
+from .MemoriaCompartida import BufferCompartido
+from .Planificador import PlanificadorSondeo
+from .Procesamiento import agrupar_por_sensor, columnas_corregidas, COL_CAPA
+
+# Configurar logging para este módulo
+logger = logging.getLogger(__name__)
+
+INTERVALO_ORDENES_MS = 50 # Cada cuánto revisa el proceso de ingesta si la GUI pidió algo
+ESPERA_AVISOS_S = 0.2     # Espera máxima del receptor por un aviso (para poder detenerse)
+ESPERA_CIERRE_S = 5.0     # Tiempo para que el proceso termine solo antes de forzarlo
+MAX_AVISOS_JUNTOS = 100   # Avisos que el receptor toma de la cola de una vez
+
+# Mensajes entre procesos (tuplas; el primer elemento es el tipo)
+# Ingesta -> GUI:
+#   ('sensor', mac, nombre del bloque, capa)   sensor nuevo, abrir su LectorBuffer
+#   ('avance', {mac: total})                   esos sensores avanzaron hasta 'total' muestras
+#   ('carga_inicial', sensores)                terminó la carga inicial
+#   ('sondeo', intervalo_ms, latencia_s)       estado del sondeo adaptativo
+#   ('estado', texto)                          mensaje para la barra de estado
+#   ('historico', mac, desde, hasta, bucket, datos)
+# GUI -> Ingesta:
+#   ('historico', mac, desde, hasta, bucket)
+#   ('detener',)
+
+
+class ProcesoIngesta(QObject):
+    """
+    Corre en el proceso de ingesta (ver ejecutar_ingesta). Usa el mismo
+    DatabaseWorker (en su QThread) y PlanificadorSondeo que el modo de un
+    solo proceso, pero las filas se convierten, se corrigen y se agregan
+    aquí a buffers en memoria compartida (BufferCompartido), junto con sus
+    estadísticas. A la GUI solo le llegan avisos cortos por 'avisos'.
+    """
+
+    # Pide al worker el histórico agregado: MAC, desde, hasta, bucket
+    pedir_historico = Signal(str, object, object, object)
+
+    def __init__(self, fuente, cache, capacidad, opciones_worker, intervalos_sondeo, avisos, ordenes):
+        super().__init__()
+        self.capacidad = capacidad
+        self.avisos = avisos
+        self.ordenes = ordenes
+        self.buffers = {}                 # {mac: BufferCompartido}
+        self.ultimos_valores_validos = {} # {mac: {canal: último válido}}
+
+        self.hilo = QThread()
+        self.worker = DatabaseWorker(fuente, cache=cache, **opciones_worker)
+        self.worker.moveToThread(self.hilo)
+        self.hilo.started.connect(self.worker.load_initial_data)
+        self.hilo.finished.connect(self.worker.cerrar, Qt.ConnectionType.DirectConnection)
+        self.pedir_historico.connect(self.worker.consultar_historico)
+        self.worker.new_data_row.connect(self.procesar_fila)
+        self.worker.new_data_batch.connect(self.procesar_lote)
+        self.worker.initial_load_finished.connect(self.on_initial_load_finished)
+        self.worker.status_update.connect(self.avisar_estado)
+        self.worker.historical_data_ready.connect(self.on_historico_listo)
+
+        self.planificador_sondeo = PlanificadorSondeo(*intervalos_sondeo, parent=self)
+        self.planificador_sondeo.sondear.connect(self.worker.check_for_updates)
+        self.worker.poll_finished.connect(self.planificador_sondeo.on_sondeo_terminado)
+        self.planificador_sondeo.estado_actualizado.connect(self.on_estado_sondeo)
+
+        self.timer_ordenes = QTimer(self)
+        self.timer_ordenes.timeout.connect(self.revisar_ordenes)
+
+    def iniciar(self):
+        self.timer_ordenes.start(INTERVALO_ORDENES_MS)
+        self.hilo.start()
+
+    @Slot(list)
+    def procesar_fila(self, row):
+        self.procesar_lote([row])
+
+    @Slot(list, float)
+    def procesar_lote(self, filas, enviado=0.0):
+        """Convierte, corrige y agrega el lote a los buffers; avisa hasta dónde llegó cada sensor."""
+        avance = {}
+        for mac, filas_sensor in agrupar_por_sensor(filas).items():
+            try:
+                if mac not in self.buffers:
+                    self.registrar_sensor(mac, filas_sensor[0][COL_CAPA])
+                buffer = self.buffers[mac]
+                ultima = buffer['muestras'][-1] if len(buffer) else None
+                columnas = columnas_corregidas(filas_sensor, self.ultimos_valores_validos[mac], ultima)
+                if len(columnas['muestras']):
+                    buffer.agregar_lote(columnas)
+                    avance[mac] = buffer.total
+            except Exception as e:
+                logger.error(f"Error procesando lote de {mac}: {e}")
+        if avance:
+            self.avisos.put(('avance', avance))
+
+    def registrar_sensor(self, mac, capa):
+        buffer = BufferCompartido(self.capacidad)
+        self.buffers[mac] = buffer
+        self.ultimos_valores_validos[mac] = {'D1': None, 'D2': None, 'D3': None}
+        # El aviso va antes que el primer avance del sensor (la cola respeta el orden)
+        self.avisos.put(('sensor', mac, buffer.nombre, capa))
+
+    @Slot(int)
+    def on_initial_load_finished(self, sensores):
+        self.avisos.put(('carga_inicial', sensores))
+        self.planificador_sondeo.iniciar()
+
+    @Slot(str)
+    def avisar_estado(self, texto):
+        self.avisos.put(('estado', texto))
+
+    @Slot(int, float)
+    def on_estado_sondeo(self, intervalo_ms, latencia_s):
+        self.avisos.put(('sondeo', intervalo_ms, latencia_s))
+
+    @Slot(str, object, object, object, object)
+    def on_historico_listo(self, mac, desde, hasta, bucket, datos):
+        self.avisos.put(('historico', mac, desde, hasta, bucket, datos))
+
+    @Slot()
+    def revisar_ordenes(self):
+        """Atiende lo que pidió la GUI desde la última revisión."""
+        padre = multiprocessing.parent_process()
+        if padre is not None and not padre.is_alive():
+            logger.warning("La GUI terminó sin avisar; se detiene la ingesta.")
+            self.detener()
+            return
+        while True:
+            try:
+                orden = self.ordenes.get_nowait()
+            except queue.Empty:
+                return
+            if orden[0] == 'historico':
+                self.pedir_historico.emit(*orden[1:])
+            elif orden[0] == 'detener':
+                self.detener()
+                return
+
+    def detener(self):
+        self.timer_ordenes.stop()
+        self.planificador_sondeo.detener()
+        self.worker.stop() # Termina en la siguiente página de la consulta en curso
+        self.hilo.quit()
+        self.hilo.wait()
+        for buffer in self.buffers.values():
+            buffer.cerrar()
+        QCoreApplication.quit()
+
+
+def ejecutar_ingesta(fuente, cache, capacidad, opciones_worker, intervalos_sondeo, avisos, ordenes):
+    """
+    Punto de entrada del proceso de ingesta (multiprocessing con 'spawn').
+    La fuente y la caché llegan sin abrir: se conectan aquí al primer uso.
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    app = QCoreApplication([])
+    ingesta = ProcesoIngesta(fuente, cache, capacidad, opciones_worker, intervalos_sondeo, avisos, ordenes)
+    ingesta.iniciar()
+    app.exec()
+    logger.info("Proceso de ingesta terminado.")
+
+
+class ReceptorIngesta(QObject):
+    """
+    Corre en un QThread del proceso de la GUI: espera los avisos del
+    proceso de ingesta y los convierte en señales (que llegan al hilo
+    principal como cualquier señal del DatabaseWorker).
+    """
+
+    sensor_nuevo = Signal(str, str, object)   # MAC, nombre del bloque compartido, capa
+    sensores_avanzaron = Signal(dict)         # {mac: total}
+    initial_load_finished = Signal(int)
+    estado_sondeo = Signal(int, float)
+    status_update = Signal(str)
+    historical_data_ready = Signal(str, object, object, object, object)
+
+    def __init__(self, avisos):
+        super().__init__()
+        self.avisos = avisos
+        self.running = True
+
+    @Slot()
+    def escuchar(self):
+        while self.running:
+            try:
+                pendientes = [self.avisos.get(timeout=ESPERA_AVISOS_S)]
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break # El proceso de ingesta terminó y cerró la cola
+            # Tomar los que ya estén en la cola para juntar sus avances
+            while len(pendientes) < MAX_AVISOS_JUNTOS:
+                try:
+                    pendientes.append(self.avisos.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Los avances seguidos se juntan en una sola señal; sin cambiar
+            # el orden respecto a los demás avisos (un sensor nuevo llega
+            # antes que su primer avance)
+            avance = {}
+            for aviso in pendientes:
+                if aviso[0] == 'avance':
+                    avance.update(aviso[1])
+                    continue
+                if avance:
+                    self.sensores_avanzaron.emit(avance)
+                    avance = {}
+                self._emitir(aviso)
+            if avance:
+                self.sensores_avanzaron.emit(avance)
+
+    def _emitir(self, aviso):
+        tipo = aviso[0]
+        if tipo == 'sensor':
+            self.sensor_nuevo.emit(*aviso[1:])
+        elif tipo == 'carga_inicial':
+            self.initial_load_finished.emit(aviso[1])
+        elif tipo == 'sondeo':
+            self.estado_sondeo.emit(*aviso[1:])
+        elif tipo == 'estado':
+            self.status_update.emit(aviso[1])
+        elif tipo == 'historico':
+            self.historical_data_ready.emit(*aviso[1:])
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,215 @@
+"""
+Benchmark sin ventana (QT_QPA_PLATFORM=offscreen) y sin SQL Server.
+
+Alimenta AppLogica y las gráficas con filas sintéticas (mismo formato que
+Data_sensor) y mide:
+- carga inicial: tiempo de entregar la ventana de cada sensor en lotes
+  hasta mostrar la primera página
+- ingesta: filas/s por procesar_fila_datos (fila por fila) y por lotes
+- redibujado: p50/p99 por sección de la página visible
+- memoria por sensor: buffers y lo asignado por Python/NumPy (tracemalloc)
+
+Uso:
+    python benchmark.py --sensores 20 --ventana 50000 --filas-por-seg 2000
+    python benchmark.py --render qt --por-pagina 24 --salida resultados.json
+
+El resultado es JSON para poder comparar entre versiones.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+import subprocess
+import tracemalloc
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from PySide6.QtWidgets import QApplication
+import matplotlib
+
+from Interfaz.Graficasui import SensorMonitorUI, RENDERIZADORES
+from Interfaz.GraficaBase import SECCIONES
+import Logica.Graficaslogica as graficaslogica
+from Logica.Graficaslogica import AppLogica, TAMANO_LOTE, FPS_MAX
+
+
+def generar_filas(sensores, cantidad, inicio=1, fecha_inicio=None, filas_por_seg=1000, semilla=0):
+    """
+    Filas sintéticas en el formato de Data_sensor, repartidas entre los
+    sensores en orden de Fecha. Ondas con ruido y algunos ceros en las
+    distancias (para que la corrección de ceros trabaje).
+    """
+    rng = np.random.default_rng(semilla + inicio)
+    fecha_inicio = fecha_inicio or datetime.datetime(2024, 1, 1)
+    ids = np.arange(inicio, inicio + cantidad)
+    t = ids / 200.0
+    ruido = rng.normal(0, 0.05, (cantidad, 5))
+    distancias = np.stack([2 + np.sin(t + k) for k in range(3)], axis=1) + ruido[:, :3]
+    distancias[rng.random((cantidad, 3)) < 0.01] = 0 # Lecturas fallidas
+    temperatura = 22 + np.sin(t / 10) + ruido[:, 3]
+    humedad = 50 + 5 * np.cos(t / 10) + ruido[:, 4]
+    q = np.stack([np.cos(t / 20), np.sin(t / 20), np.full(cantidad, 0.1), np.full(cantidad, -0.1)], axis=1)
+
+    filas = []
+    for i, identificador in enumerate(ids.tolist()):
+        filas.append([
+            f'AA:BB:CC:DD:{(identificador % sensores) // 256:02X}:{identificador % sensores % 256:02X}',
+            1, identificador,
+            *distancias[i].tolist(), float(temperatura[i]), float(humedad[i]), *q[i].tolist(),
+            identificador, fecha_inicio + datetime.timedelta(seconds=identificador / filas_por_seg),
+        ])
+    return filas
+
+
+def percentiles(tiempos_ms):
+    arr = np.asarray(tiempos_ms)
+    if not len(arr):
+        return {'n': 0}
+    return {
+        'n': len(arr),
+        'p50_ms': round(float(np.percentile(arr, 50)), 3),
+        'p99_ms': round(float(np.percentile(arr, 99)), 3),
+        'max_ms': round(float(arr.max()), 3),
+    }
+
+
+def version_codigo():
+    """Commit actual (si es un repo de git), para comparar resultados."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def medir_carga_inicial(app, logica, args):
+    """Entrega la ventana de todos los sensores en lotes y muestra la primera página."""
+    filas = generar_filas(args.sensores, args.sensores * args.ventana, filas_por_seg=args.filas_por_seg)
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    for i in range(0, len(filas), TAMANO_LOTE):
+        logica.procesar_lote_datos(filas[i:i + TAMANO_LOTE])
+    ingesta_s = time.perf_counter() - inicio
+    memoria_python = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del filas
+
+    logica.on_initial_load_finished(args.sensores)
+    app.processEvents() # Que se pinte la primera página
+    total_s = time.perf_counter() - inicio
+
+    buffers = sum(buffer.nbytes for buffer in logica.datos_sensores.values())
+    return {
+        'filas': args.sensores * args.ventana,
+        'ingesta_s': round(ingesta_s, 3),
+        'total_s': round(total_s, 3),
+        'filas_por_s': round(args.sensores * args.ventana / ingesta_s),
+    }, {
+        'buffers_bytes_por_sensor': buffers // max(1, len(logica.datos_sensores)),
+        'asignado_bytes_por_sensor': memoria_python // max(1, len(logica.datos_sensores)),
+    }
+
+
+def medir_ingesta(logica, args, inicio_id):
+    """Filas/s fila por fila (procesar_fila_datos) y por lotes."""
+    cantidad = args.filas_ingesta
+    resultado = {}
+    for modo in ('por_fila', 'por_lote'):
+        filas = generar_filas(args.sensores, cantidad, inicio=inicio_id, filas_por_seg=args.filas_por_seg)
+        inicio_id += cantidad
+        inicio = time.perf_counter()
+        if modo == 'por_fila':
+            for row in filas:
+                logica.procesar_fila_datos(row)
+        else:
+            for i in range(0, len(filas), TAMANO_LOTE):
+                logica.procesar_lote_datos(filas[i:i + TAMANO_LOTE])
+        resultado[modo] = {'filas': cantidad, 'filas_por_s': round(cantidad / (time.perf_counter() - inicio))}
+    logica.planificador_render.sucios.clear() # No interesa dibujar lo de esta fase
+    return resultado, inicio_id
+
+
+def medir_redibujado(app, logica, args, inicio_id):
+    """
+    Por sección: simula 'cuadros' cuadros en vivo. En cada uno llega lo que
+    corresponde a filas_por_seg en un cuadro (a FPS_MAX) y se mide el
+    redibujado de la página visible hasta que Qt termina de pintar.
+    """
+    por_cuadro = max(1, args.filas_por_seg // FPS_MAX)
+    resultado = {}
+    for seccion in SECCIONES:
+        logica.seccion_actual = seccion
+        logica.actualizar_display_graficas()
+        app.processEvents()
+
+        tiempos = []
+        for _ in range(args.cuadros):
+            filas = generar_filas(args.sensores, por_cuadro, inicio=inicio_id, filas_por_seg=args.filas_por_seg)
+            inicio_id += por_cuadro
+            logica.procesar_lote_datos(filas)
+            sucios = logica.planificador_render.sucios
+            logica.planificador_render.sucios = set()
+
+            inicio = time.perf_counter()
+            logica.redibujar_sensores(sucios)
+            app.processEvents() # Incluye el pintado real de los widgets
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        resultado[seccion] = percentiles(tiempos)
+    return resultado, inicio_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sin ventana de ingesta, modelo y dibujo")
+    parser.add_argument('--sensores', type=int, default=20)
+    parser.add_argument('--ventana', type=int, default=graficaslogica.MAX_MUESTRAS,
+                        help="muestras por sensor (buffer y carga inicial)")
+    parser.add_argument('--filas-por-seg', type=int, default=2000, help="tasa de llegada simulada en vivo")
+    parser.add_argument('--filas-ingesta', type=int, default=50000, help="filas para medir la ingesta")
+    parser.add_argument('--cuadros', type=int, default=100, help="cuadros por sección al medir el redibujado")
+    parser.add_argument('--render', choices=sorted(RENDERIZADORES), default='matplotlib')
+    parser.add_argument('--por-pagina', type=int, default=graficaslogica.SENSORES_POR_PAGINA)
+    parser.add_argument('--salida', help="archivo JSON (por defecto se imprime)")
+    args = parser.parse_args()
+
+    # La ventana del benchmark define el tamaño de los buffers
+    graficaslogica.MAX_MUESTRAS = args.ventana
+
+    app = QApplication(sys.argv[:1])
+    ui = SensorMonitorUI(args.render, args.por_pagina)
+    ui.resize(1200, 900)
+    ui.show()
+    logica = AppLogica(ui, usar_cache=False, sensores_por_pagina=args.por_pagina)
+
+    carga, memoria = medir_carga_inicial(app, logica, args)
+    ingesta, siguiente_id = medir_ingesta(logica, args, args.sensores * args.ventana + 1)
+    redibujado, _ = medir_redibujado(app, logica, args, siguiente_id)
+
+    resultado = {
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'version': version_codigo(),
+        'entorno': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'plataforma': platform.platform(),
+        },
+        'config': vars(args),
+        'carga_inicial': carga,
+        'ingesta': ingesta,
+        'redibujado': redibujado,
+        'memoria': memoria,
+    }
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto + '\n')
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
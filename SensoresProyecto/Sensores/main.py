@@ -1,21 +1,54 @@
 import sys
+import argparse
 from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import QTimer
 import logging
 
 # Importamos las clases de nuestros módulos
-from Interfaz.Graficasui import SensorMonitorUI
-from Logica.Graficaslogica import AppLogica
+from Interfaz.Graficasui import SensorMonitorUI, RENDERIZADORES
+from Logica.Graficaslogica import AppLogica, SENSORES_POR_PAGINA
+from Logica.FuentesDatos import FUENTES, crear_fuente
 
 # Configurar logging básico para ver los eventos en la terminal
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 
 def main():
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(description="Monitor de sensores")
+    parser.add_argument('--sin-cache', action='store_true',
+                        help="no usar la caché local, cargar todo del servidor")
+    parser.add_argument('--invalidar-cache', action='store_true',
+                        help="borrar la caché local antes de iniciar")
+    parser.add_argument('--render', choices=sorted(RENDERIZADORES), default='matplotlib',
+                        help="backend de dibujo: matplotlib (con zoom e histórico) o qt (ligero)")
+    parser.add_argument('--por-pagina', type=int, default=SENSORES_POR_PAGINA,
+                        help="sensores por página")
+    parser.add_argument('--metricas', metavar='ARCHIVO',
+                        help="habilitar métricas y escribirlas en ARCHIVO (.json o texto Prometheus)")
+    parser.add_argument('--fuente', choices=FUENTES, default='odbc',
+                        help="origen de los datos: odbc (SQL Server), sqlite o replay de una captura CSV")
+    parser.add_argument('--archivo',
+                        help="base SQLite (--fuente sqlite) o captura CSV (--fuente replay)")
+    parser.add_argument('--velocidad', type=float, default=1.0,
+                        help="replay: veces la tasa real de la captura (ej. 1, 10, 100)")
+    parser.add_argument('--sin-repetir', action='store_true',
+                        help="replay: detenerse al final de la captura en lugar de volver a empezar")
+    parser.add_argument('--multiproceso', action='store_true',
+                        help="consultar y procesar los datos en otro proceso (buffers en memoria compartida)")
+    # Los argumentos que no son nuestros se le dejan a Qt
+    args, argv_qt = parser.parse_known_args()
+    try:
+        fuente = crear_fuente(args.fuente, args.archivo, args.velocidad, not args.sin_repetir)
+    except ValueError as e:
+        parser.error(str(e))
+
+    app = QApplication(sys.argv[:1] + argv_qt)
     # 1. Crear la Ventana de la Interfaz
-    ventana_ui = SensorMonitorUI()
+    ventana_ui = SensorMonitorUI(args.render, args.por_pagina)
     # 2. inicis lógica de la aplicación
-    logica = AppLogica(ventana_ui)
+    logica = AppLogica(ventana_ui, usar_cache=not args.sin_cache, invalidar_cache=args.invalidar_cache,
+                       sensores_por_pagina=args.por_pagina, fuente=fuente,
+                       multiproceso=args.multiproceso)
+    if args.metricas:
+        logica.habilitar_metricas(args.metricas)
     
     # 3.Conectar elementos Señales y Slots
     #  Conectar Paginación 
@@ -26,17 +59,23 @@ def main():
     # Conectamos el QButtonGroup. Pasará el botón presionado y (bool)checked
     ventana_ui.grupo_radios_seccion.buttonToggled.connect(logica.on_radio_button_toggled)
 
-    # Configurar el Timer para actualizaciones en vivo 
-    # QTimer en el hilo principal
-    auto_update_timer = QTimer()
-    # Conectamos su 'timeout' al slot 'check_for_updates' del *worker*
-    # (La lógica se encarga de obtener la referencia al worker)
-    # Le pasamos el timer a la lógica para que lo gestione
-    logica.set_update_timer(auto_update_timer)
+    # Conectar Búsqueda y filtros de sensores
+    ventana_ui.campo_busqueda.textChanged.connect(logica.on_filtro_cambiado)
+    ventana_ui.campo_busqueda.returnPressed.connect(logica.ir_a_sensor)
+    ventana_ui.combo_capa.currentIndexChanged.connect(logica.on_filtro_cambiado)
+    ventana_ui.combo_actividad.currentIndexChanged.connect(logica.on_filtro_cambiado)
+    # Vista general: todos los sensores en mosaicos; click en uno abre su página
+    ventana_ui.btn_vista_general.toggled.connect(logica.on_vista_general)
+    ventana_ui.vista_general.sensor_elegido.connect(logica.abrir_sensor)
+    # Exportación en segundo plano
+    ventana_ui.btn_exportar.clicked.connect(logica.on_exportar)
+    ventana_ui.btn_cancelar_exportacion.clicked.connect(logica.cancelar_exportacion)
 
     # 4. Iniciar la lógica de la aplicación
     # (Esto iniciará el hilo de la BD para la carga inicial)
     logica.iniciar()
+    # Al salir se detiene el hilo y se cierra la conexión persistente
+    app.aboutToQuit.connect(logica.detener)
 
     # 5. Mostrar la ventana y ejecutar la aplicación
     ventana_ui.show()